@@ -97,8 +97,10 @@ with st.expander("ℹ️ How to Use This Dashboard: A Detailed Guide", expanded=
             * **Analysis Mode:**
                 - **Synergy (Best Pairs):** Finds duos with the highest win rates when on the same team.
                 - **Anti-Synergy (Worst Pairs):** Finds duos with the lowest win rates.
+                - **Trios & Cores:** Finds the three-, four- and five-hero combinations teams play together most, with their win rates.
                 - **Counters:** Allows you to select a single hero and see which heroes they are statistically strong against (`Counters`) and weak against (`Countered By`).
             * **Filters:** Use the filters for **Team** and **Minimum Games Played** to refine the results and ensure statistical significance.
+            * **Rank Pairs By:** Switch from raw win rate to the **Wilson confidence bound** or a **Bayesian-shrunk win rate** to push low-sample pairs down the list without raising the minimum games.
             * **Trending Tabs:** The **"Trending Up 📈"** and **"Trending Down 📉"** tabs are unique; they compare a duo's performance in the last week versus the week before, highlighting pairs that are rising or falling in the current meta.
 
         #### `🔮 Playoff Qualification Odds`
@@ -137,7 +139,11 @@ else:
     st.success(f"**Data Loaded:** Analyzing **{len(st.session_state['parsed_matches'])}** matches from **{len(st.session_state['selected_tournaments'])}** tournament(s).")
     st.header("Meta Snapshot")
 
-    df_stats = calculate_hero_stats_for_team(pooled_matches, "All Teams")
+    match_stats = st.session_state.get('match_stats')
+    if match_stats is not None:
+        df_stats = match_stats.hero_stats_df()
+    else:
+        df_stats = calculate_hero_stats_for_team(pooled_matches, "All Teams")
 
     if not df_stats.empty:
         # Key Metrics
@@ -0,0 +1,260 @@
+# backtest_model.py
+
+import argparse
+import json
+from collections import Counter
+import numpy as np
+from utils.hero_data import HERO_PROFILES
+from utils.drafting_ai import load_prediction_assets, build_training_matrix, candidate_pick_matrix, get_tag_tables, predict_win_probs, predict_draft_outcome, ROLES
+from utils.draft_search import DRAFT_SEQUENCE
+from utils.match_store import build_game_table, game_keys, select_games, games_after_mark, orient_by_side
+from utils.model_tuning import classification_metrics
+from train_model import load_local_matches
+
+DEFAULT_TOP_K = (1, 3, 5, 10)
+# Feature rows per model call when ranking candidates for many games at once
+CANDIDATE_BATCH_ROWS = 20000
+# Games checked against predict_draft_outcome, and the largest difference accepted
+PARITY_SAMPLE_GAMES = 25
+PARITY_TOLERANCE = 1e-5
+PICK_ORDER_NOTE = ("The match data stores picks per role, not in pick order, so only draft states without "
+                   "partial picks are replayed: before the draft, after the first ban phase and the complete draft. "
+                   "Suggestion hit rates cover first-phase bans only.")
+
+# --- DRAFT REPLAY ---
+# The replay runs on tables oriented by side (orient_by_side): the blue team is in the team 1 slots
+def draft_counts(step):
+    """(blue bans, red bans, blue picks, red picks) made before DRAFT_SEQUENCE[step]."""
+    done = DRAFT_SEQUENCE[:step]
+    return tuple(done.count(action) for action in (("BAN", "blue"), ("BAN", "red"), ("PICK", "blue"), ("PICK", "red")))
+
+def draft_phases():
+    """[(name, end step)] for every run of bans or picks in DRAFT_SEQUENCE, e.g. ("Ban phase 1", 6)."""
+    phases, seen = [], Counter()
+    for step, (action, _) in enumerate(DRAFT_SEQUENCE):
+        if step + 1 == len(DRAFT_SEQUENCE) or DRAFT_SEQUENCE[step + 1][0] != action:
+            seen[action] += 1
+            phases.append((f"{action.title()} phase {seen[action]}", step + 1))
+    return phases
+
+def is_replayable(step):
+    """True if the draft before `step` can be rebuilt from role-ordered picks: each side has no picks or all five."""
+    _, _, blue_picks, red_picks = draft_counts(step)
+    return blue_picks in (0, 5) and red_picks in (0, 5)
+
+def phase_of_step(step):
+    return next(name for name, end in draft_phases() if step < end)
+
+def partial_game_table(game_table, step):
+    """The game table as every draft stood before `step`: later picks and bans are blanked (-1)."""
+    blue_bans, red_bans, blue_picks, red_picks = draft_counts(step)
+    slots = np.arange(5)
+    keep_bans = np.concatenate([slots < blue_bans, slots < red_bans])
+    keep_picks = np.concatenate([slots < blue_picks, slots < red_picks])
+    return {
+        **game_table,
+        'bans': np.where(keep_bans, game_table['bans'], -1).astype(game_table['bans'].dtype),
+        'picks': np.where(keep_picks, game_table['picks'], -1).astype(game_table['picks'].dtype),
+    }
+
+# --- OUTCOME METRICS ---
+def evaluate_phase_outcomes(game_table, model_assets):
+    """
+    Scores every game as it stood at the end of each replayable draft phase (and before the draft)
+    in one batched call per phase, against the actual winner.
+    """
+    results = []
+    for name, step in [("Before draft", 0)] + draft_phases():
+        if not is_replayable(step):
+            continue
+        if step == len(DRAFT_SEQUENCE):
+            name = "Complete draft"
+        X, y = build_training_matrix(partial_game_table(game_table, step), model_assets, HERO_PROFILES, skip_unknown_teams=False)
+        probs = np.asarray(predict_win_probs(model_assets, X), dtype=float)
+        metrics = classification_metrics(y, probs)
+        metrics['accuracy'] = float(np.mean((probs >= 0.5) == (y == 1)))
+        results.append({'phase': name, 'step': step, **metrics})
+    return results
+
+# --- SUGGESTION HIT RATE ---
+def evaluate_suggestion_hits(game_table, model_assets, top_k=DEFAULT_TOP_K):
+    """
+    Replays every ban whose draft state is known (see is_replayable) and ranks all heroes still
+    available the way the Drafting Assistant does, by the threat (the opponent's win probability if
+    they picked the hero). Counts how often the hero actually banned was in the top k. Picks are not
+    replayed since their order is not recorded. All games of a step are ranked together, in chunks
+    of CANDIDATE_BATCH_ROWS feature rows.
+    """
+    tables = get_tag_tables(model_assets, HERO_PROFILES)
+    unknown = len(tables['frontline']) - 1
+    model_heroes = set(model_assets['all_heroes'])
+    cand_rows = np.array([tables['hero_to_row'][h] for h in model_assets['all_heroes']], dtype=np.int64)
+    cand_index = np.full(unknown + 1, -1, dtype=np.int64)
+    cand_index[cand_rows] = np.arange(len(cand_rows))
+    rows_by_code = np.array([tables['hero_to_row'][h] if h in model_heroes else unknown for h in game_table['heroes'].tolist()] + [unknown], dtype=np.int64)
+    chunk = max(1, CANDIDATE_BATCH_ROWS // max(1, len(cand_rows)))
+
+    totals = {}
+    for step, (action, side) in enumerate(DRAFT_SEQUENCE):
+        if action != "BAN" or not is_replayable(step):
+            continue
+        counts = dict(zip((("BAN", "blue"), ("BAN", "red"), ("PICK", "blue"), ("PICK", "red")), draft_counts(step)))
+        other = "red" if side == "blue" else "blue"
+        # Bans are ranked by how much the opponent would gain from picking the hero
+        scorer = side if action == "PICK" else other
+        role_slot = counts[("PICK", scorer)]
+        if role_slot >= 5:
+            continue
+        offset = 0 if side == "blue" else 5
+        column = 'picks' if action == "PICK" else 'bans'
+        actual = cand_index[rows_by_code[game_table[column][:, offset + counts[(action, side)]]]]
+        valid = actual >= 0
+        if not valid.any():
+            continue
+
+        table = partial_game_table(select_games(game_table, valid), step)
+        X, _ = build_training_matrix(table, model_assets, HERO_PROFILES, skip_unknown_teams=False)
+        scorer_offset = 0 if scorer == "blue" else 5
+        team_rows = rows_by_code[table['picks'][:, scorer_offset:scorer_offset + 5]]
+        drafted = cand_index[rows_by_code[np.concatenate([table['picks'], table['bans']], axis=1)]]
+        actual = actual[valid]
+
+        ranks = np.empty(len(actual), dtype=np.int64)
+        for start in range(0, len(actual), chunk):
+            end = min(start + chunk, len(actual))
+            probs = predict_win_probs(model_assets, candidate_pick_matrix(X[start:end], team_rows[start:end], cand_rows, role_slot, scorer, tables))
+            scores = np.asarray(probs, dtype=float).reshape(end - start, len(cand_rows))
+            if scorer == "red":
+                scores = 1 - scores
+            # Heroes already picked or banned in that game are not available
+            games, heroes = np.nonzero(drafted[start:end] >= 0)
+            scores[games, drafted[start:end][games, heroes]] = -np.inf
+            actual_scores = scores[np.arange(end - start), actual[start:end]]
+            ranks[start:end] = (scores > actual_scores[:, np.newaxis]).sum(axis=1) + 1
+
+        for group in (phase_of_step(step), f"All {action.lower()}s"):
+            entry = totals.setdefault(group, {'events': 0, 'rank_sum': 0, 'hits': Counter()})
+            entry['events'] += len(ranks)
+            entry['rank_sum'] += int(ranks.sum())
+            for k in top_k:
+                entry['hits'][k] += int((ranks <= k).sum())
+
+    group_order = [name for name, _ in draft_phases()] + ["All bans", "All picks"]
+    return [
+        {
+            'group': group, 'events': t['events'], 'mean_rank': t['rank_sum'] / t['events'],
+            **{f"top_{k}": t['hits'][k] / t['events'] for k in top_k},
+        }
+        for group, t in sorted(totals.items(), key=lambda item: group_order.index(item[0]))
+    ]
+
+# --- PARITY CHECK ---
+def check_batch_parity(game_table, model_assets, n_games=PARITY_SAMPLE_GAMES, seed=0):
+    """
+    Scores a random sample of complete drafts with predict_draft_outcome, the Drafting Assistant's
+    per-draft path, and compares them with the batched probabilities the backtest uses.
+    """
+    rng = np.random.default_rng(seed)
+    sample = np.zeros(len(game_table['winner']), dtype=bool)
+    sample[rng.choice(len(sample), size=min(n_games, len(sample)), replace=False)] = True
+    table = select_games(game_table, sample)
+    X, _ = build_training_matrix(table, model_assets, HERO_PROFILES, skip_unknown_teams=False)
+    batch = np.asarray(predict_win_probs(model_assets, X), dtype=float)
+
+    def name(vocab, code):
+        return vocab[code] if code >= 0 else None
+    single = []
+    for g in range(len(batch)):
+        picks = [name(table['heroes'], c) for c in table['picks'][g].tolist()]
+        bans = [name(table['heroes'], c) for c in table['bans'][g].tolist()]
+        blue_picks = {role: hero for role, hero in zip(ROLES, picks[:5]) if hero}
+        red_picks = {role: hero for role, hero in zip(ROLES, picks[5:]) if hero}
+        prob, _ = predict_draft_outcome(
+            blue_picks, red_picks, [h for h in bans[:5] if h], [h for h in bans[5:] if h],
+            name(table['teams'], int(table['team1'][g])), name(table['teams'], int(table['team2'][g])),
+            model_assets, HERO_PROFILES
+        )
+        single.append(float(prob))
+    max_diff = float(np.abs(batch - np.array(single)).max()) if single else 0.0
+    return {'games': len(single), 'max_abs_diff': max_diff, 'passed': max_diff <= PARITY_TOLERANCE}
+
+def run_backtest(game_table, model_assets, top_k=DEFAULT_TOP_K):
+    game_table = orient_by_side(game_table)
+    return {
+        'games': int(len(game_table['winner'])),
+        'model_version': model_assets.get('model_version'),
+        'inference_backend': model_assets.get('inference_backend'),
+        'note': PICK_ORDER_NOTE,
+        'parity': check_batch_parity(game_table, model_assets),
+        'phases': evaluate_phase_outcomes(game_table, model_assets),
+        'suggestions': evaluate_suggestion_hits(game_table, model_assets, top_k),
+    }
+
+# --- REPORT ---
+def print_report(report, top_k):
+    print(f"\nBacktest on {report['games']} games (model {report['model_version']}, {report['inference_backend']} backend)")
+    parity = report['parity']
+    status = "OK" if parity['passed'] else "MISMATCH"
+    print(f"Batch vs. predict_draft_outcome on {parity['games']} games: max difference {parity['max_abs_diff']:.2e} ({status})")
+    print(f"Note: {report['note']}\n")
+    print(f"{'Phase':<14} {'Games':>6} {'Acc':>6} {'LogLoss':>8} {'Brier':>6} {'ECE':>6} {'AUC':>6}")
+    for r in report['phases']:
+        auc = f"{r['auc']:.3f}" if r['auc'] is not None else "-"
+        print(f"{r['phase']:<14} {r['games']:>6} {r['accuracy']:>6.3f} {r['log_loss']:>8.4f} {r['brier']:>6.3f} {r['ece']:>6.3f} {auc:>6}")
+
+    header = " ".join(f"{f'Top-{k}':>6}" for k in top_k)
+    print(f"\n{'Suggestions':<14} {'Events':>6} {'Rank':>6} {header}")
+    for r in report['suggestions']:
+        hits = " ".join(f"{r[f'top_{k}']:>6.3f}" for k in top_k)
+        print(f"{r['group']:<14} {r['events']:>6} {r['mean_rank']:>6.1f} {hits}")
+
+
+def main():
+    """Replays historical drafts against the saved model and prints per-phase metrics."""
+    parser = argparse.ArgumentParser(description="Backtest the draft prediction model on historical drafts.")
+    parser.add_argument("--data-dir", default="data", help="Directory with match JSON files (as for train_model.py)")
+    parser.add_argument("--model", default="draft_predictor.json")
+    parser.add_argument("--assets", default="draft_assets.json")
+    parser.add_argument("--top-k", default=",".join(map(str, DEFAULT_TOP_K)), help="Comma-separated k values for the suggestion hit rate")
+    parser.add_argument("--since", help="Only replay games on or after this date (YYYY-MM-DD)")
+    parser.add_argument("--exclude-trained", action="store_true", help="Skip games the model was trained on")
+    parser.add_argument("--output", help="Also write the report to this JSON file")
+    args = parser.parse_args()
+    top_k = tuple(sorted({int(k) for k in args.top_k.split(",") if k.strip()}))
+
+    model_assets = load_prediction_assets(args.model, args.assets)
+    if model_assets is None:
+        print(f"Error: could not load '{args.model}' / '{args.assets}'.")
+        return
+    all_matches = load_local_matches(args.data_dir)
+    if not all_matches:
+        print("No match data found to backtest on.")
+        return
+
+    game_table = build_game_table(all_matches)
+    mask = np.ones(len(game_table['winner']), dtype=bool)
+    if args.since:
+        mask &= game_table['date'] >= args.since
+    if args.exclude_trained:
+        if 'trained_through' in model_assets:
+            mask &= games_after_mark(game_table, model_assets['trained_through'])
+        elif 'trained_games' in model_assets:
+            trained = set(model_assets['trained_games'])
+            mask &= np.array([key not in trained for key in game_keys(game_table)], dtype=bool)
+        else:
+            print("Warning: the assets do not record their training games; replaying all games.")
+    game_table = select_games(game_table, mask)
+    if len(game_table['winner']) == 0:
+        print("No games left to replay after filtering.")
+        return
+
+    print(f"Replaying {len(game_table['winner'])} games...")
+    report = run_backtest(game_table, model_assets, top_k)
+    print_report(report, top_k)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport saved to '{args.output}'")
+
+if __name__ == "__main__":
+    main()
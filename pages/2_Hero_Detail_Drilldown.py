@@ -42,11 +42,16 @@ def get_drilldown_data(_all_matches, stage_filter):
     # 2. Process the correctly filtered list of matches
     return process_hero_drilldown_data(matches_to_analyze)
 
-# Load data by passing the full dataset and the filter string to the cached function
-all_heroes, hero_stats_map = get_drilldown_data(
-    _all_matches=tuple(parsed_matches),
-    stage_filter=selected_stage
-)
+# The unfiltered view comes straight from the running counters kept by the sidebar
+match_stats = st.session_state.get('match_stats')
+if selected_stage == "All Stages" and match_stats is not None:
+    all_heroes, hero_stats_map = match_stats.hero_drilldown_data()
+else:
+    # Load data by passing the full dataset and the filter string to the cached function
+    all_heroes, hero_stats_map = get_drilldown_data(
+        _all_matches=tuple(parsed_matches),
+        stage_filter=selected_stage
+    )
 # --- MODIFICATION END ---
 
 selected_hero = st.selectbox(
@@ -1,6 +1,6 @@
 import streamlit as st
 import pandas as pd
-from utils.analysis_functions import process_head_to_head_teams, process_head_to_head_heroes
+from utils.analysis_functions import process_head_to_head_teams, process_head_to_head_heroes, build_head_to_head_index
 from utils.sidebar import build_sidebar
 
 st.set_page_config(layout="wide", page_title="Head-to-Head")
@@ -59,6 +59,17 @@ matches_to_analyze = get_filtered_matches(
     _all_matches=tuple(parsed_matches),
     stage_filter=selected_stage
 )
+
+@st.cache_resource(max_entries=8)
+def get_head_to_head_index(_matches, stage_filter, data_version):
+    """Builds the team/hero posting lists once per data version and stage, shared across reruns."""
+    return build_head_to_head_index(_matches)
+
+h2h_index = get_head_to_head_index(
+    matches_to_analyze,
+    stage_filter=selected_stage,
+    data_version=st.session_state.get('data_version')
+)
 # --- MODIFICATION END ---
 
 
@@ -87,7 +98,7 @@ if mode == "Team vs. Team":
     else:
         st.header(f"{team1} vs {team2}")
         # Process data using the filtered match list
-        h2h_data = process_head_to_head_teams(team1, team2, matches_to_analyze)
+        h2h_data = process_head_to_head_teams(team1, team2, matches_to_analyze, h2h_index=h2h_index)
         
         h2h_tab, overall_tab = st.tabs(["Head-to-Head Stats", "Overall Stats (vs Everyone)"])
         
@@ -147,7 +158,7 @@ else: # Hero vs. Hero mode
     else:
         st.header(f"{hero1} vs {hero2}")
         # Process data using the filtered match list
-        h2h_data = process_head_to_head_heroes(hero1, hero2, matches_to_analyze)
+        h2h_data = process_head_to_head_heroes(hero1, hero2, matches_to_analyze, h2h_index=h2h_index)
         if h2h_data["total_games"] == 0:
             st.warning("No matches found where these heroes played on opposing teams.")
         else:
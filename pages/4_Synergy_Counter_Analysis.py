@@ -1,6 +1,6 @@
 import streamlit as st
 import pandas as pd
-from utils.analysis_functions import analyze_synergy_combos, analyze_counter_combos, analyze_trending_synergies, analyze_synergy_combos_enhanced_with_duo, analyze_hero_counters
+from utils.analysis_functions import analyze_synergy_combos, analyze_counter_combos, analyze_trending_synergies, analyze_synergy_combos_enhanced_with_duo, compute_hero_counter_matrix, hero_counters_from_matrix, counter_matrix_to_long_df, sort_by_ranking, mine_frequent_hero_sets
 from utils.plotting import plot_synergy_bar_chart, plot_counter_heatmap, plot_synergy_bar_chart_interactive, create_counter_bars
 from utils.sidebar import build_sidebar
 
@@ -100,6 +100,16 @@ matches_to_analyze = get_filtered_matches(
     _all_matches=tuple(parsed_matches),
     stage_filter=selected_stage
 )
+
+@st.cache_resource(max_entries=16)
+def get_counter_matrix(_matches, stage_filter, team_filter, data_version):
+    """Computes the all-heroes counter matrix once per stage, team and data version."""
+    return compute_hero_counter_matrix(_matches, team_filter)
+
+@st.cache_data(max_entries=16)
+def get_frequent_hero_sets(_matches, stage_filter, team_filter, min_support, data_version):
+    """Mines frequent trios, cores and full lineups once per filter combination; ranking is applied afterwards."""
+    return mine_frequent_hero_sets(_matches, team_filter, min_support=min_support, min_size=3, max_size=5)
 # --- MODIFICATION END ---
 
 
@@ -115,7 +125,17 @@ st.subheader("Analysis Controls")
 col1, col2, col3, col4 = st.columns(4)
 
 with col1:
-    analysis_mode = st.radio("Select Analysis Mode:", ["Synergy (Best Pairs)", "Anti-Synergy (Worst Pairs)", "Counters"])
+    analysis_mode = st.radio("Select Analysis Mode:", ["Synergy (Best Pairs)", "Anti-Synergy (Worst Pairs)", "Trios & Cores", "Counters"])
+    rank_options = {
+        "Raw Win Rate": "win_rate",
+        "Confidence (Wilson Bound)": "lower_bound",
+        "Bayesian-Shrunk Win Rate": "shrunk",
+    }
+    rank_by = rank_options[st.selectbox(
+        "Rank Pairs By:",
+        list(rank_options.keys()),
+        help="Confidence-based rankings keep low-sample pairs from dominating the top, so a low minimum-games threshold still gives trustworthy results."
+    )]
 with col2:
     team_filter = st.selectbox("Filter by Team:", ["All Teams"] + all_teams)
 with col3:
@@ -159,7 +179,7 @@ if analysis_mode in ["Synergy (Best Pairs)", "Anti-Synergy (Worst Pairs)"]:
     
     df_results = analyze_synergy_combos_enhanced_with_duo(
         matches_to_analyze, team_filter, min_games, top_n, find_anti, 
-        focus_hero1, focus_hero2
+        focus_hero1, focus_hero2, rank_by=rank_by
     )
     
     if df_results.empty:
@@ -224,6 +244,27 @@ if analysis_mode in ["Synergy (Best Pairs)", "Anti-Synergy (Worst Pairs)"]:
                 if fig:
                     st.plotly_chart(fig, use_container_width=True, key="trending_down_chart", config=config)
 
+elif analysis_mode == "Trios & Cores":
+    st.subheader("Frequent Hero Cores")
+    core_size = st.radio("Core Size:", ["Trios (3)", "Cores (4)", "Full Lineups (5)"], horizontal=True)
+    size = {"Trios (3)": 3, "Cores (4)": 4, "Full Lineups (5)": 5}[core_size]
+
+    all_sets_df = get_frequent_hero_sets(
+        matches_to_analyze,
+        stage_filter=selected_stage,
+        team_filter=team_filter,
+        min_support=min_games,
+        data_version=st.session_state.get('data_version')
+    )
+    df_sets = all_sets_df[all_sets_df["Size"] == size] if not all_sets_df.empty else all_sets_df
+
+    if df_sets.empty:
+        st.warning(f"No hero sets of size {size} were played together at least {min_games} times. Try lowering the minimum games requirement.")
+    else:
+        df_display = sort_by_ranking(df_sets, rank_by).head(top_n).drop(columns=["Size"]).reset_index(drop=True)
+        df_display.index += 1
+        st.dataframe(df_display, use_container_width=True)
+
 elif analysis_mode == "Counters":
     st.subheader("Hero Matchup Analysis")
     
@@ -241,15 +282,17 @@ elif analysis_mode == "Counters":
         if team_filter != "All Teams":
             st.caption(f"Filtered for team: {team_filter}")
     
-    counter_data = analyze_hero_counters(
-        matches_to_analyze, 
-        selected_hero, 
-        min_games, 
-        team_filter
+    # One pass builds the matchup matrix for every hero; switching heroes only slices it
+    counter_matrix = get_counter_matrix(
+        matches_to_analyze,
+        stage_filter=selected_stage,
+        team_filter=team_filter,
+        data_version=st.session_state.get('data_version')
     )
+    counter_data = hero_counters_from_matrix(counter_matrix, selected_hero, min_games)
     
-    counters_df = counter_data['counters']
-    countered_by_df = counter_data['countered_by']
+    counters_df = sort_by_ranking(counter_data['counters'], rank_by)
+    countered_by_df = sort_by_ranking(counter_data['countered_by'], rank_by)
     
     if counters_df.empty and countered_by_df.empty:
         st.warning(f"No significant matchup data found for {selected_hero}. Try lowering the minimum games requirement.")
@@ -261,7 +304,7 @@ elif analysis_mode == "Counters":
             st.caption("Heroes that this hero performs well against (>55% win rate)")
             
             if not counters_df.empty:
-                display_df = counters_df[['Enemy Hero', 'Win Rate (%)', 'Games Against']].head(10)
+                display_df = counters_df[['Enemy Hero', 'Win Rate (%)', 'WR Lower Bound (%)', 'Games Against']].head(10)
                 display_df = display_df.rename(columns={'Games Against': 'Games'})
                 st.dataframe(
                     display_df,
@@ -285,7 +328,7 @@ elif analysis_mode == "Counters":
             st.caption("Heroes that perform well against this hero (>55% win rate)")
             
             if not countered_by_df.empty:
-                display_df = countered_by_df[['Enemy Hero', 'Win Rate (%)', 'Games Against']].head(10)
+                display_df = countered_by_df[['Enemy Hero', 'Win Rate (%)', 'WR Lower Bound (%)', 'Games Against']].head(10)
                 display_df = display_df.rename(columns={'Games Against': 'Games'})
                 st.dataframe(
                     display_df,
@@ -303,3 +346,12 @@ elif analysis_mode == "Counters":
                     st.plotly_chart(fig, use_container_width=True, key="countered_by_chart")
             else:
                 st.info(f"No heroes have a strong advantage (>55% win rate) against {selected_hero} with {min_games}+ games")
+
+    matrix_csv = counter_matrix_to_long_df(counter_matrix, min_games).to_csv(index=False).encode('utf-8')
+    st.download_button(
+        label="📥 Download Full Counter Matrix (CSV)",
+        data=matrix_csv,
+        file_name=f"counter_matrix_{team_filter.replace(' ', '_')}.csv",
+        mime="text/csv",
+        help=f"Every hero-vs-hero matchup with at least {min_games} games, for offline analysis."
+    )
@@ -1,10 +1,11 @@
 import streamlit as st
 from collections import defaultdict
-from utils.drafting_ai import load_prediction_assets, predict_draft_outcome, get_ai_suggestions, generate_prediction_explanation
+from utils.drafting_ai import load_prediction_assets, cached_predict_draft_outcome, cached_ai_suggestions, generate_prediction_explanation
+from utils.draft_search import DRAFT_SEQUENCE, next_draft_step_index, cached_search_draft
 from utils.simulation import calculate_series_score_probs
 from utils.hero_data import HERO_PROFILES, HERO_DAMAGE_TYPE
 from utils.sidebar import build_sidebar
-import pandas as pd
+from utils.analysis_functions import build_game_catalog, filter_game_catalog
 
 st.set_page_config(layout="wide", page_title="Drafting Assistant")
 build_sidebar()
@@ -77,33 +78,14 @@ ALL_HEROES = model_assets['all_heroes']
 ROLES = ["EXP", "Jungle", "Mid", "Gold", "Roam"]
 pooled_matches = st.session_state['pooled_matches']
 
-# Extract teams that have played matches
-def get_teams_with_played_matches(pooled_matches):
-    """Extract unique teams that have played at least one game"""
-    teams_with_games = set()
-    
-    for match in pooled_matches:
-        opps = match.get('match2opponents', [])
-        if len(opps) < 2:
-            continue
-            
-        # Check if this match has any played games
-        has_played_games = False
-        for game in match.get('match2games', []):
-            if game.get('extradata') and game.get('winner') in ['1', '2']:
-                has_played_games = True
-                break
-        
-        # Only add teams if they've played
-        if has_played_games:
-            for opp in opps:
-                team_name = opp.get('name', '').strip()
-                if team_name:
-                    teams_with_games.add(team_name)
-    
-    return sorted(list(teams_with_games))
+@st.cache_resource(max_entries=4)
+def get_game_catalog(_matches, data_version):
+    """Past-game catalog (drafts already extracted, team/date lookups) built once per data version."""
+    return build_game_catalog(_matches, roles=ROLES)
+
+game_catalog = get_game_catalog(pooled_matches, data_version=st.session_state.get('data_version'))
 
-TOURNAMENT_TEAMS = [None] + get_teams_with_played_matches(pooled_matches)
+TOURNAMENT_TEAMS = [None] + game_catalog['played_teams']
 ALL_TEAMS_FROM_MODEL = model_assets['all_teams']  # Keep this for model compatibility
 
 # Check if we have any teams with played matches
@@ -126,35 +108,8 @@ if 'selected_past_game' not in st.session_state:
 st.title("🎯 Professional Drafting Assistant")
 
 with st.expander("Review a Past Game"):
-    # First, extract all unique teams and dates from PLAYED matches
-    all_teams = set()
-    all_dates = set()
-    
-    for match in pooled_matches:
-        opps = match.get('match2opponents', [])
-        if len(opps) >= 2:
-            # Check if match has been played by looking for games with extradata
-            has_played_games = any(
-                game.get('extradata') and game.get('winner') in ['1', '2']
-                for game in match.get('match2games', [])
-            )
-            
-            if has_played_games:
-                all_teams.add(opps[0].get('name', ''))
-                all_teams.add(opps[1].get('name', ''))
-                
-                # Extract date from the match
-                match_date = match.get('date') or match.get('datetime') or match.get('timestamp')
-                if match_date:
-                    try:
-                        date_obj = pd.to_datetime(match_date)
-                        all_dates.add(date_obj.strftime('%Y-%m-%d'))
-                    except:
-                        pass
-    
-    # Sort teams and dates
-    sorted_teams = ['Any Team'] + sorted([t for t in all_teams if t])
-    sorted_dates = ['Any Date'] + sorted([d for d in all_dates if d], reverse=True)  # Most recent first
+    sorted_teams = ['Any Team'] + game_catalog['played_teams']
+    sorted_dates = ['Any Date'] + game_catalog['dates']  # Most recent first
     
     # Filter controls
     col1, col2, col3 = st.columns([2, 2, 2])
@@ -168,74 +123,16 @@ with st.expander("Review a Past Game"):
     with col3:
         filter_date = st.selectbox("Date:", sorted_dates, key="filter_date")
     
-    # Build filtered games list
-    filtered_games = []
-    
-    for match_idx, match in enumerate(pooled_matches):
-        opps = match.get('match2opponents', [])
-        if len(opps) < 2:
-            continue
-        
-        team1_name = opps[0].get('name', '')
-        team2_name = opps[1].get('name', '')
-        
-        # Apply team filters
-        if filter_team1 != 'Any Team' and filter_team2 != 'Any Team':
-            # Both teams specified - check exact match (order doesn't matter)
-            if not ((team1_name == filter_team1 and team2_name == filter_team2) or 
-                    (team1_name == filter_team2 and team2_name == filter_team1)):
-                continue
-        elif filter_team1 != 'Any Team':
-            # Only team 1 specified
-            if filter_team1 not in [team1_name, team2_name]:
-                continue
-        elif filter_team2 != 'Any Team':
-            # Only team 2 specified
-            if filter_team2 not in [team1_name, team2_name]:
-                continue
-        
-        # Apply date filter
-        if filter_date != 'Any Date':
-            match_date = match.get('date') or match.get('datetime') or match.get('timestamp')
-            if match_date:
-                try:
-                    date_obj = pd.to_datetime(match_date)
-                    if date_obj.strftime('%Y-%m-%d') != filter_date:
-                        continue
-                except:
-                    continue
-            else:
-                continue
-        
-        # Add ONLY PLAYED games from this match
-        for game_idx, game in enumerate(match.get('match2games', [])):
-            extradata = game.get('extradata')
-            winner = game.get('winner')
-            
-            # Check if game was actually played
-            if extradata and winner in ['1', '2']:
-                # Verify it has actual draft data
-                has_draft_data = any(
-                    extradata.get(f'team1champion{i}') or extradata.get(f'team2champion{i}')
-                    for i in range(1, 6)
-                )
-                
-                if has_draft_data:
-                    # Format the date for display
-                    match_date = match.get('date') or match.get('datetime') or match.get('timestamp')
-                    date_str = ""
-                    if match_date:
-                        try:
-                            date_obj = pd.to_datetime(match_date)
-                            date_str = date_obj.strftime('%Y-%m-%d')
-                        except:
-                            pass
-                    
-                    label = f"{team1_name} vs {team2_name} - Game {game_idx + 1}"
-                    if date_str:
-                        label += f" ({date_str})"
-                    
-                    filtered_games.append((label, match_idx, game_idx))
+    # Filtered games are lookups into the prebuilt catalog
+    filtered_games = [
+        game_catalog['games'][row]['game_id']
+        for row in filter_game_catalog(
+            game_catalog,
+            team1=None if filter_team1 == 'Any Team' else filter_team1,
+            team2=None if filter_team2 == 'Any Team' else filter_team2,
+            date=None if filter_date == 'Any Date' else filter_date,
+        )
+    ]
     
     # Game selector
     if filtered_games:
@@ -250,7 +147,7 @@ with st.expander("Review a Past Game"):
             "Select a game:", 
             game_options, 
             index=current_selection_index,
-            format_func=lambda x: x[0] if x else "Select a game...", 
+            format_func=lambda x: game_catalog['games'][game_catalog['by_id'][x]]['label'] if x else "Select a game...", 
             key="filtered_game_selector"
         )
 
@@ -266,40 +163,17 @@ with st.expander("Review a Past Game"):
     if load_button and selected_game:
         st.session_state.selected_past_game = selected_game
         
-        _, match_idx, game_idx = selected_game
-        match_data = pooled_matches[match_idx]
-        game_data = match_data['match2games'][game_idx]
-        extradata = game_data['extradata']
-        
-        # Correctly assign teams AND drafts based on side data
-        team1_name = match_data['match2opponents'][0].get('name', '').strip()
-        team2_name = match_data['match2opponents'][1].get('name', '').strip()
-        team1_side = extradata.get('team1side', 'blue')
-
-        if team1_side == 'blue':
-            blue_team_name = team1_name
-            red_team_name = team2_name
-            for i in range(5):
-                st.session_state.draft['blue_bans'][i] = extradata.get(f'team1ban{i+1}')
-                st.session_state.draft['red_bans'][i] = extradata.get(f'team2ban{i+1}')
-                st.session_state.draft['blue_picks'][ROLES[i]] = extradata.get(f'team1champion{i+1}')
-                st.session_state.draft['red_picks'][ROLES[i]] = extradata.get(f'team2champion{i+1}')
-        else: # team1_side is 'red'
-            blue_team_name = team2_name
-            red_team_name = team1_name
-            for i in range(5):
-                st.session_state.draft['blue_bans'][i] = extradata.get(f'team2ban{i+1}')
-                st.session_state.draft['red_bans'][i] = extradata.get(f'team1ban{i+1}')
-                st.session_state.draft['blue_picks'][ROLES[i]] = extradata.get(f'team2champion{i+1}')
-                st.session_state.draft['red_picks'][ROLES[i]] = extradata.get(f'team1champion{i+1}')
-            
-        st.session_state.draft['blue_team'] = blue_team_name
-        st.session_state.draft['red_team'] = red_team_name
-        st.session_state.blue_team_select = blue_team_name
-        st.session_state.red_team_select = red_team_name
+        game = game_catalog['games'][game_catalog['by_id'][selected_game]]
+        st.session_state.draft['blue_bans'] = list(game['blue_bans'])
+        st.session_state.draft['red_bans'] = list(game['red_bans'])
+        st.session_state.draft['blue_picks'] = dict(game['blue_picks'])
+        st.session_state.draft['red_picks'] = dict(game['red_picks'])
+        st.session_state.draft['blue_team'] = game['blue_team']
+        st.session_state.draft['red_team'] = game['red_team']
+        st.session_state.blue_team_select = game['blue_team']
+        st.session_state.red_team_select = game['red_team']
         
-        # Determine winner name based on the now-correct team assignments
-        winner_name = blue_team_name if str(game_data.get('winner')) == '1' else red_team_name
+        winner_name = game['winner_team']
         st.success(f"✅ **Game Loaded!** Actual Winner: **{winner_name}**")
         
         st.rerun()
@@ -365,7 +239,7 @@ red_p = {k: v for k, v in draft['red_picks'].items() if v}
 blue_b = [v for v in draft['blue_bans'] if v]
 red_b = [v for v in draft['red_bans'] if v]
 
-prob_overall, prob_draft_only = predict_draft_outcome(blue_p, red_p, blue_b, red_b, draft['blue_team'], draft['red_team'], model_assets, HERO_PROFILES)
+prob_overall, prob_draft_only = cached_predict_draft_outcome(blue_p, red_p, blue_b, red_b, draft['blue_team'], draft['red_team'], model_assets, HERO_PROFILES)
 
 with prob_placeholder.container():
     st.subheader("Live Win Probability")
@@ -500,10 +374,10 @@ with red_col:
 # --- Turn Logic ---
 total_bans, total_picks = len(blue_b) + len(red_b), len(blue_p) + len(red_p)
 turn, phase = None, "DRAFT COMPLETE"
-if total_bans < 6: phase, turn = "BAN", ['B', 'R', 'B', 'R', 'B', 'R'][total_bans]
-elif total_picks < 6: phase, turn = "PICK", ['B', 'R', 'R', 'B', 'B', 'R'][total_picks]
-elif total_bans < 10: phase, turn = "BAN", ['R', 'B', 'R', 'B'][total_bans - 6]
-elif total_picks < 10: phase, turn = "PICK", ['R', 'B', 'B', 'R'][total_picks - 6]
+step_idx = next_draft_step_index(total_bans, total_picks)
+if step_idx < len(DRAFT_SEQUENCE):
+    phase, side = DRAFT_SEQUENCE[step_idx]
+    turn = 'B' if side == 'blue' else 'R'
 
 # --- MODIFICATION START ---
 # Turn display is now back at the top
@@ -540,16 +414,35 @@ if st.session_state.get('show_ai_suggestions', False):
         with suggestion_placeholder.container():
             st.subheader("AI Suggestions")
             is_blue_turn = (turn == 'B')
-            suggestions = get_ai_suggestions(
-                [h for h in ALL_HEROES if h not in taken_heroes],
-                blue_p, red_p, blue_b, red_b,
-                draft['blue_team'], draft['red_team'],
-                model_assets, HERO_PROFILES, is_blue_turn, phase
+            # "Your" side is the team on turn
+            your_p, enemy_p = (blue_p, red_p) if is_blue_turn else (red_p, blue_p)
+            your_b, enemy_b = (blue_b, red_b) if is_blue_turn else (red_b, blue_b)
+            your_t, enemy_t = (draft['blue_team'], draft['red_team']) if is_blue_turn else (draft['red_team'], draft['blue_team'])
+            available_heroes = [h for h in ALL_HEROES if h not in taken_heroes]
+            lookahead = st.select_slider(
+                "Lookahead (turns)", options=[1, 2, 3, 4], value=1, key='ai_lookahead',
+                help="1 scores each hero on its own. Higher values search the next turns of the pick/ban order and rank heroes by the win rate left after the opponent's best replies."
             )
+            if lookahead > 1:
+                search_result = cached_search_draft(
+                    blue_p, red_p, blue_b, red_b,
+                    draft['blue_team'], draft['red_team'], available_heroes,
+                    model_assets, HERO_PROFILES, max_depth=lookahead
+                )
+                suggestions = search_result['suggestions']
+            else:
+                suggestions = cached_ai_suggestions(
+                    available_heroes,
+                    your_p, enemy_p, your_b, enemy_b,
+                    your_t, enemy_t,
+                    model_assets, HERO_PROFILES, is_blue_turn, phase
+                )
             
             turn_color = "🔷" if is_blue_turn else "🔶"
             team_name = blue_team_name if is_blue_turn else red_team_name
             st.markdown(f"{turn_color} **{team_name}'s {phase}**")
+            if lookahead > 1:
+                st.caption(f"Searched {search_result['depth']} turn(s) ahead, {search_result['nodes']} drafts evaluated. Scores are {team_name}'s win rate after the best replies.")
             
             for idx, (hero, score) in enumerate(suggestions[:5]):
                 hero_role = ""
@@ -557,7 +450,7 @@ if st.session_state.get('show_ai_suggestions', False):
                     primary_role = HERO_PROFILES[hero][0].get('primary_role', '')
                     hero_role = f" ({primary_role})"
                 
-                label = f"{hero}{hero_role} - {'Threat' if phase == 'BAN' else 'Win Rate'}: {score:.1%}"
+                label = f"{hero}{hero_role} - {'Threat' if phase == 'BAN' and lookahead == 1 else 'Win Rate'}: {score:.1%}"
                 
                 st.button(
                     label, 
@@ -1,9 +1,10 @@
 import streamlit as st
-import time
 from utils.drafting_ai_tasks import train_ai_model_task
+from utils.match_store import publish_game_table
 from celery.result import AsyncResult
 from celery_config import app as celery_app
 from utils.sidebar import build_sidebar
+from utils.task_status import watch_task
 import os
 import json
 import zipfile
@@ -54,9 +55,21 @@ if check_password():
     else:
         st.success(f"**{len(st.session_state['pooled_matches'])}** matches are loaded and ready for training.")
 
+        incremental = st.checkbox(
+            "Incremental update (only train on new games)", value=False,
+            help="Continues the existing model on games it has not seen yet, instead of retraining from scratch. Falls back to a full retrain if the worker has no previous model."
+        )
+        tune = st.checkbox(
+            "Tune hyperparameters (slower)", value=False, disabled=incremental,
+            help="Runs a time-ordered cross-validated search with early stopping before the full retrain and saves a metrics report next to the model."
+        )
         if st.button("Train New AI Model (in Background)", type="primary"):
             try:
-                task = train_ai_model_task.delay(st.session_state['pooled_matches'])
+                # Only a dataset reference goes through the broker; the worker reads the match store
+                data_version = st.session_state['data_version']
+                publish_game_table(data_version, st.session_state['parsed_matches'])
+                dataset = {'tournaments': st.session_state['selected_tournaments'], 'data_version': data_version}
+                task = train_ai_model_task.delay(dataset, incremental=incremental, tune=tune and not incremental)
                 st.session_state['monitoring_task_id'] = task.id
                 # Immediately rerun to start the monitoring process below
                 st.rerun()
@@ -95,6 +108,9 @@ if check_password():
                             st.link_button("📥 Download draft_predictor.json", model_url)
                         with col2:
                             st.link_button("📥 Download draft_assets.json", assets_url)
+                        report_url = task_result['download_urls'].get('report_url')
+                        if report_url:
+                            st.link_button("📊 Download draft_model_report.json", report_url)
                     else:
                         st.error("Could not retrieve download URLs from the task result.")
             else:
@@ -106,10 +122,8 @@ if check_password():
             st.session_state['monitoring_task_id'] = None
         
         else:
-            # Task is still running, show a spinner and schedule a rerun
-            with st.spinner(f"Task {task_id} is {result.state}... Auto-refreshing in 10 seconds."):
-                time.sleep(10)
-            st.rerun()
+            # Task is still running; the watcher re-runs the page as soon as it finishes
+            watch_task(task_id, celery_app, lambda state, info: st.info(f"Task {task_id} is {state}... This view updates automatically when it finishes."))
 
     else:
         st.info("No active task is being monitored. Start a new training job to begin monitoring.")
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+import xgboost as xgb
+
+import utils.draft_inference as draft_inference
+from utils.draft_inference import compile_tree_arrays, predict_tree_arrays, make_predictor, PARITY_TOLERANCE
+
+N_FEATURES = 40
+
+
+@pytest.fixture(scope="module")
+def model():
+    """Small draft-like model: sparse ±1 pick/ban columns and a few small tag counts."""
+    rng = np.random.default_rng(7)
+    X = np.zeros((400, N_FEATURES), dtype=np.float32)
+    for row in X:
+        cols = rng.choice(N_FEATURES - 5, size=10, replace=False)
+        row[cols] = rng.choice([-1, 1], size=10)
+    X[:, -5:] = rng.integers(0, 4, size=(400, 5))
+    y = (X[:, :5].sum(axis=1) + X[:, -1] + rng.normal(0, 1, 400) > 1).astype(int)
+    clf = xgb.XGBClassifier(n_estimators=30, max_depth=4, learning_rate=0.1, eval_metric="logloss")
+    clf.fit(X, y)
+    return clf
+
+
+@pytest.fixture(scope="module")
+def rows():
+    return draft_inference._reference_inputs(N_FEATURES, n_rows=64, seed=3)
+
+
+@pytest.mark.parametrize("n_rows", [1, 8, 64])
+def test_backends_match_predict_proba(model, rows, n_rows):
+    X = rows[:n_rows]
+    expected = model.predict_proba(X)[:, 1]
+    booster = model.get_booster().inplace_predict(X.astype(np.float32))
+    arrays = compile_tree_arrays(model.get_booster())
+    assert arrays is not None
+    numpy_probs = predict_tree_arrays(arrays, X)
+    np.testing.assert_allclose(booster, expected, atol=PARITY_TOLERANCE)
+    np.testing.assert_allclose(numpy_probs, expected, atol=PARITY_TOLERANCE)
+
+
+@pytest.mark.parametrize("backend", ["sklearn", "booster", "numpy", "auto"])
+def test_make_predictor_keeps_requested_backend(model, rows, backend):
+    predict_fn, name = make_predictor(model, N_FEATURES, backend=backend)
+    assert name == backend
+    np.testing.assert_allclose(predict_fn(rows), model.predict_proba(rows)[:, 1], atol=PARITY_TOLERANCE)
+
+
+def test_unknown_backend_uses_sklearn(model):
+    assert make_predictor(model, N_FEATURES, backend="gpu")[1] == "sklearn"
+
+
+def test_auto_without_compiled_trees_uses_booster(model, monkeypatch):
+    monkeypatch.setattr(draft_inference, "compile_tree_arrays", lambda booster: None)
+    assert make_predictor(model, N_FEATURES, backend="auto")[1] == "booster"
+    assert make_predictor(model, N_FEATURES, backend="numpy")[1] == "sklearn"
+
+
+def test_auto_fallback_still_runs_parity_check(model, monkeypatch):
+    monkeypatch.setattr(draft_inference, "compile_tree_arrays", lambda booster: None)
+    monkeypatch.setattr(draft_inference, "PARITY_TOLERANCE", -1.0)
+    assert make_predictor(model, N_FEATURES, backend="auto")[1] == "sklearn"
@@ -1,9 +1,66 @@
 import pandas as pd
+import numpy as np
 from collections import defaultdict, Counter
 import itertools
 from datetime import datetime, timedelta
 import streamlit as st
 
+# --- Confidence scoring for win rates ---
+RANKING_COLUMNS = {
+    "win_rate": "Win Rate (%)",
+    "lower_bound": "WR Lower Bound (%)",
+    "shrunk": "Shrunk Win Rate (%)",
+}
+
+def wilson_interval(wins, games, z=1.96):
+    """
+    Wilson score interval for win rates, vectorized over arrays of any shape.
+    Entries with zero games get the uninformative interval [0, 1].
+    """
+    wins = np.asarray(wins, dtype=float)
+    games = np.asarray(games, dtype=float)
+    safe_games = np.where(games > 0, games, 1.0)
+    p = wins / safe_games
+    z2 = z * z
+    denom = 1 + z2 / safe_games
+    center = (p + z2 / (2 * safe_games)) / denom
+    margin = z * np.sqrt(p * (1 - p) / safe_games + z2 / (4 * safe_games ** 2)) / denom
+    low = np.where(games > 0, center - margin, 0.0)
+    high = np.where(games > 0, center + margin, 1.0)
+    return np.clip(low, 0.0, 1.0), np.clip(high, 0.0, 1.0)
+
+def shrunk_win_rate(wins, games, prior_mean=None, prior_games=10):
+    """Bayesian (beta prior) win rate, pulling low-sample entries towards prior_mean (default: the pooled win rate)."""
+    wins = np.asarray(wins, dtype=float)
+    games = np.asarray(games, dtype=float)
+    if prior_mean is None:
+        total_games = games.sum()
+        prior_mean = wins.sum() / total_games if total_games > 0 else 0.5
+    return (wins + prior_mean * prior_games) / (games + prior_games)
+
+def add_confidence_columns(df, games_col, wins_col, prior_mean=None, prior_games=10, z=1.96):
+    """Adds Wilson bounds and a shrunk win rate (all in %) for every row at once."""
+    if df.empty:
+        return df
+    low, high = wilson_interval(df[wins_col].to_numpy(), df[games_col].to_numpy(), z)
+    df["WR Lower Bound (%)"] = np.round(low * 100, 2)
+    df["WR Upper Bound (%)"] = np.round(high * 100, 2)
+    df["Shrunk Win Rate (%)"] = np.round(shrunk_win_rate(df[wins_col].to_numpy(), df[games_col].to_numpy(), prior_mean, prior_games) * 100, 2)
+    return df
+
+def sort_by_ranking(df, rank_by="win_rate", find_worst=False):
+    """
+    Sorts a pair table by raw win rate, Wilson bound or shrunk win rate.
+    For the worst pairs the Wilson upper bound is used, so only confidently bad pairs rank first.
+    """
+    if rank_by == "lower_bound" and find_worst:
+        column = "WR Upper Bound (%)"
+    else:
+        column = RANKING_COLUMNS.get(rank_by, "Win Rate (%)")
+    if column not in df.columns:
+        column = "Win Rate (%)"
+    return df.sort_values(column, ascending=find_worst)
+
 def calculate_hero_stats_for_team(matches_to_analyze, team_filter="All Teams"):
     """
     Calculates hero statistics for a specific team or all teams from a given pool of matches.
@@ -125,7 +182,130 @@ def process_hero_drilldown_data(matches_to_analyze):
         hero_stats_map[hero] = {"per_team_df": pd.DataFrame(team_stats_rows).sort_values("Games", ascending=False), "matchups_df": pd.DataFrame(matchup_rows)}
     return sorted(list(all_heroes)), hero_stats_map
 
-def process_head_to_head_teams(t1_norm, t2_norm, matches_to_analyze):
+def build_head_to_head_index(matches_to_analyze):
+    """
+    Builds posting lists over a match pool so head-to-head queries become set intersections:
+    team -> match indices, team pair -> match indices, and hero -> {(match idx, game idx): side idx}.
+    """
+    matches = list(matches_to_analyze)
+    team_matches, pair_matches = defaultdict(set), defaultdict(set)
+    hero_games, game_winners = defaultdict(dict), {}
+
+    for m_idx, match in enumerate(matches):
+        opps = [opp.get("name", "") for opp in match.get("match2opponents", [])]
+        for team in set(opps):
+            team_matches[team].add(m_idx)
+        for t1, t2 in itertools.combinations(sorted(set(opps)), 2):
+            pair_matches[(t1, t2)].add(m_idx)
+
+        for g_idx, game in enumerate(match.get("match2games", [])):
+            opponents = game.get("opponents", [])
+            if len(opponents) != 2: continue
+            game_winners[(m_idx, g_idx)] = str(game.get("winner", ""))
+            for side_idx, opp in enumerate(opponents):
+                for p in opp.get("players", []):
+                    if isinstance(p, dict) and "champion" in p:
+                        hero_games[p["champion"]][(m_idx, g_idx)] = side_idx
+
+    return {
+        "matches": matches,
+        "team_matches": dict(team_matches),
+        "pair_matches": dict(pair_matches),
+        "hero_games": dict(hero_games),
+        "game_winners": game_winners,
+    }
+
+def _match_date_key(match):
+    """Parsed match date as 'YYYY-MM-DD' (display) and the full timestamp string (sorting); empty if unknown."""
+    raw = match.get("date") or match.get("datetime") or match.get("timestamp")
+    if not raw: return "", ""
+    try:
+        ts = pd.to_datetime(raw)
+    except (ValueError, TypeError, OverflowError):
+        return "", ""
+    if pd.isna(ts): return "", ""
+    return ts.strftime("%Y-%m-%d"), ts.isoformat()
+
+def build_game_catalog(matches, roles=("EXP", "Jungle", "Mid", "Gold", "Roam")):
+    """
+    Flattens a match pool into one catalog row per played game that has a draft, with the draft
+    already extracted by side (team1side decides which team is blue), plus lookup tables:
+    team -> row indices, date -> row indices, and the sorted team and date lists for the filters.
+    Rows keep the pool order; 'game_id' is "<match idx>:<game idx>" within `matches`.
+    """
+    games, played_teams = [], set()
+    by_team, by_date = defaultdict(list), defaultdict(list)
+
+    for m_idx, match in enumerate(matches):
+        opps = match.get("match2opponents", [])
+        if len(opps) < 2: continue
+        team1, team2 = opps[0].get("name", "").strip(), opps[1].get("name", "").strip()
+        date_str, sort_date = None, None
+
+        for g_idx, game in enumerate(match.get("match2games", [])):
+            extradata, winner = game.get("extradata"), game.get("winner")
+            if not extradata or winner not in ["1", "2"]: continue
+            played_teams.update(t for t in (team1, team2) if t)
+            if not any(extradata.get(f"team1champion{i}") or extradata.get(f"team2champion{i}") for i in range(1, 6)):
+                continue
+            if date_str is None:
+                date_str, sort_date = _match_date_key(match)
+
+            blue, red = ("1", "2") if extradata.get("team1side", "blue") == "blue" else ("2", "1")
+            teams = {"1": team1, "2": team2}
+            label = f"{team1} vs {team2} - Game {g_idx + 1}" + (f" ({date_str})" if date_str else "")
+            row = len(games)
+            games.append({
+                "game_id": f"{m_idx}:{g_idx}", "match_idx": m_idx, "game_idx": g_idx,
+                "team1": team1, "team2": team2, "date": date_str, "sort_key": (sort_date, m_idx, g_idx),
+                "stage": match.get("stage_type"), "label": label,
+                "blue_team": teams[blue], "red_team": teams[red], "winner_team": teams[winner],
+                "blue_bans": [extradata.get(f"team{blue}ban{i}") for i in range(1, 6)],
+                "red_bans": [extradata.get(f"team{red}ban{i}") for i in range(1, 6)],
+                "blue_picks": {role: extradata.get(f"team{blue}champion{i}") for i, role in enumerate(roles, 1)},
+                "red_picks": {role: extradata.get(f"team{red}champion{i}") for i, role in enumerate(roles, 1)},
+            })
+            for team in {team1, team2}:
+                by_team[team].append(row)
+            if date_str:
+                by_date[date_str].append(row)
+
+    return {
+        "games": games,
+        "by_id": {g["game_id"]: i for i, g in enumerate(games)},
+        "by_team": dict(by_team),
+        "by_date": dict(by_date),
+        "teams": sorted(t for t in by_team if t),
+        "played_teams": sorted(played_teams),
+        "dates": sorted(by_date, reverse=True),
+    }
+
+def filter_game_catalog(catalog, team1=None, team2=None, date=None):
+    """Row indices of catalog games matching the filters (None = any); the team filters are order-insensitive."""
+    rows = None
+    for team in (team1, team2):
+        if team is not None:
+            matched = set(catalog["by_team"].get(team, []))
+            rows = matched if rows is None else rows & matched
+    if date is not None:
+        matched = set(catalog["by_date"].get(date, []))
+        rows = matched if rows is None else rows & matched
+    return list(range(len(catalog["games"]))) if rows is None else sorted(rows)
+
+def process_head_to_head_teams(t1_norm, t2_norm, matches_to_analyze, h2h_index=None):
+    """
+    Head-to-head and overall pick/ban comparison of two teams.
+    With an index from build_head_to_head_index, only the two teams' matches are visited for the
+    overall counts, and the head-to-head matches come straight from the team-pair posting list.
+    """
+    if h2h_index is not None:
+        relevant = h2h_index["team_matches"].get(t1_norm, set()) | h2h_index["team_matches"].get(t2_norm, set())
+        h2h_ids = h2h_index["pair_matches"].get(tuple(sorted((t1_norm, t2_norm))), set())
+        matches_to_analyze = [h2h_index["matches"][i] for i in sorted(relevant)]
+        h2h_matches = [h2h_index["matches"][i] for i in sorted(h2h_ids)]
+    else:
+        h2h_matches = [m for m in matches_to_analyze if {t1_norm, t2_norm}.issubset({opp.get("name", "") for opp in m.get("match2opponents", [])})]
+
     win_counts = {t1_norm: 0, t2_norm: 0}
     t1_h2h_heroes, t2_h2h_heroes = Counter(), Counter()
     t1_h2h_bans, t2_h2h_bans = Counter(), Counter()
@@ -156,26 +336,24 @@ def process_head_to_head_teams(t1_norm, t2_norm, matches_to_analyze):
                     if ban_hero:
                         (t1_overall_bans if current_team == t1_norm else t2_overall_bans).update([ban_hero])
 
-        if {t1_norm, t2_norm}.issubset(set(opps)):
-            try:
-                idx1 = opps.index(t1_norm)
-            except ValueError:
-                continue
-            for game in match.get("match2games", []):
-                winner = str(game.get("winner", ""))
-                if winner.isdigit():
-                    total_games += 1
-                    winner_team = opps[int(winner) - 1]
-                    if winner_team in win_counts: win_counts[winner_team] += 1
+    for match in h2h_matches:
+        opps = [opp.get("name", "") for opp in match.get("match2opponents", [])]
+        idx1 = opps.index(t1_norm)
+        for game in match.get("match2games", []):
+            winner = str(game.get("winner", ""))
+            if winner.isdigit():
+                total_games += 1
+                winner_team = opps[int(winner) - 1]
+                if winner_team in win_counts: win_counts[winner_team] += 1
 
-                extrad = game.get("extradata", {})
-                for i, opp_game in enumerate(game.get("opponents", [])):
-                    hero_set = {p["champion"] for p in opp_game.get("players", []) if isinstance(p, dict) and "champion" in p}
-                    (t1_h2h_heroes if i == idx1 else t2_h2h_heroes).update(hero_set)
-                    for ban_n in range(1, 6):
-                        ban_hero = extrad.get(f"team{i+1}ban{ban_n}")
-                        if ban_hero:
-                            (t1_h2h_bans if i == idx1 else t2_h2h_bans).update([ban_hero])
+            extrad = game.get("extradata", {})
+            for i, opp_game in enumerate(game.get("opponents", [])):
+                hero_set = {p["champion"] for p in opp_game.get("players", []) if isinstance(p, dict) and "champion" in p}
+                (t1_h2h_heroes if i == idx1 else t2_h2h_heroes).update(hero_set)
+                for ban_n in range(1, 6):
+                    ban_hero = extrad.get(f"team{i+1}ban{ban_n}")
+                    if ban_hero:
+                        (t1_h2h_bans if i == idx1 else t2_h2h_bans).update([ban_hero])
     
     return {
         "win_counts": win_counts, 
@@ -190,7 +368,23 @@ def process_head_to_head_teams(t1_norm, t2_norm, matches_to_analyze):
         "t2_overall_bans_df": pd.DataFrame(t2_overall_bans.most_common(8), columns=['Hero', 'Bans'])
     }
 
-def process_head_to_head_heroes(h1, h2, matches_to_analyze):
+def process_head_to_head_heroes(h1, h2, matches_to_analyze, h2h_index=None):
+    """
+    Counts games where two heroes faced each other and how often each side won.
+    With an index from build_head_to_head_index, this is an intersection of the two heroes' posting lists.
+    """
+    if h2h_index is not None:
+        games1, games2 = h2h_index["hero_games"].get(h1, {}), h2h_index["hero_games"].get(h2, {})
+        games_with_both, win_h1, win_h2 = 0, 0, 0
+        for game_key in games1.keys() & games2.keys():
+            side1, side2 = games1[game_key], games2[game_key]
+            if side1 == side2: continue
+            games_with_both += 1
+            winner = h2h_index["game_winners"][game_key]
+            if winner == str(side1 + 1): win_h1 += 1
+            if winner == str(side2 + 1): win_h2 += 1
+        return {"total_games": games_with_both, "h1_wins": win_h1, "h2_wins": win_h2}
+
     games_with_both, win_h1, win_h2 = 0, 0, 0
     for match in matches_to_analyze:
         for game in match.get("match2games", []):
@@ -204,7 +398,7 @@ def process_head_to_head_heroes(h1, h2, matches_to_analyze):
                 if (h2 in side1 and winner == "1") or (h2 in side2 and winner == "2"): win_h2 += 1
     return {"total_games": games_with_both, "h1_wins": win_h1, "h2_wins": win_h2}
 
-def analyze_synergy_combos(pooled_matches, team_filter, min_games, top_n, find_anti_synergy=False, focus_hero=None):
+def analyze_synergy_combos(pooled_matches, team_filter, min_games, top_n, find_anti_synergy=False, focus_hero=None, rank_by="win_rate"):
     duo_counter = defaultdict(lambda: {"games": 0, "wins": 0})
     for match in pooled_matches:
         teams_names = [opp.get("name", "").strip() for opp in match.get("match2opponents", [])]
@@ -223,9 +417,13 @@ def analyze_synergy_combos(pooled_matches, team_filter, min_games, top_n, find_a
             if focus_hero and focus_hero not in [h1, h2]: continue
             rows.append({"Hero 1": h1, "Hero 2": h2, "Games Together": stats["games"], "Wins": stats["wins"], "Win Rate (%)": round(stats["wins"] / stats["games"] * 100, 2)})
     df = pd.DataFrame(rows)
-    return df if df.empty else df.sort_values("Win Rate (%)", ascending=find_anti_synergy).head(top_n)
+    if df.empty:
+        return df
+    prior_mean = sum(s["wins"] for s in duo_counter.values()) / max(sum(s["games"] for s in duo_counter.values()), 1)
+    df = add_confidence_columns(df, "Games Together", "Wins", prior_mean=prior_mean)
+    return sort_by_ranking(df, rank_by, find_anti_synergy).head(top_n)
 
-def analyze_counter_combos(pooled_matches, min_games, top_n, team_filter, focus_on_team_picks):
+def analyze_counter_combos(pooled_matches, min_games, top_n, team_filter, focus_on_team_picks, rank_by="win_rate"):
     counter_stats = defaultdict(lambda: {"games": 0, "wins": 0})
     for match in pooled_matches:
         teams_names = [opp.get("name", "").strip() for opp in match.get("match2opponents", [])]
@@ -254,7 +452,10 @@ def analyze_counter_combos(pooled_matches, min_games, top_n, team_filter, focus_
         if stats["games"] >= min_games:
             rows.append({"Ally Hero": ally, "Enemy Hero": enemy, "Games Against": stats["games"], "Wins": stats["wins"], "Win Rate (%)": round(stats["wins"] / stats["games"] * 100, 2)})
     df = pd.DataFrame(rows)
-    return df if df.empty else df.sort_values("Win Rate (%)", ascending=False).head(top_n)
+    if df.empty:
+        return df
+    df = add_confidence_columns(df, "Games Against", "Wins", prior_mean=0.5)
+    return sort_by_ranking(df, rank_by).head(top_n)
 
 # --- NEW FUNCTION ---
 def calculate_standings(played_matches):
@@ -667,12 +868,185 @@ def analyze_hero_counters(pooled_matches, selected_hero, min_games, team_filter=
         "countered_by": countered_by_df
     }
 
+def compute_hero_counter_matrix(pooled_matches, team_filter="All Teams"):
+    """
+    Builds the all-heroes matchup matrix in a single pass over the games.
+    games[i, j] counts games where hero i (on the filtered team) faced hero j, and wins[i, j] how many of them hero i won.
+
+    Returns:
+        dict with 'heroes' (sorted names), 'hero_to_idx', 'games' and 'wins' (square int arrays)
+    """
+    ally_names, enemy_names, outcomes = [], [], []
+    for match in pooled_matches:
+        teams_names = [opp.get("name", "").strip() for opp in match.get("match2opponents", [])]
+        for game in match.get("match2games", []):
+            winner = str(game.get("winner", ""))
+            opponents = game.get("opponents", [])
+            if len(opponents) != 2 or not winner.isdigit():
+                continue
+            side_heroes = [
+                {p["champion"] for p in opp.get("players", []) if isinstance(p, dict) and "champion" in p}
+                for opp in opponents
+            ]
+            for idx in range(2):
+                team_name = teams_names[idx] if idx < len(teams_names) else ""
+                if team_filter != "All Teams" and team_name != team_filter:
+                    continue
+                won = int(winner == str(idx + 1))
+                for ally in side_heroes[idx]:
+                    for enemy in side_heroes[1 - idx]:
+                        ally_names.append(ally)
+                        enemy_names.append(enemy)
+                        outcomes.append(won)
+
+    heroes = sorted(set(ally_names) | set(enemy_names))
+    hero_to_idx = {hero: i for i, hero in enumerate(heroes)}
+    games = np.zeros((len(heroes), len(heroes)), dtype=np.int64)
+    wins = np.zeros_like(games)
+    if ally_names:
+        rows = np.fromiter((hero_to_idx[h] for h in ally_names), dtype=np.int64, count=len(ally_names))
+        cols = np.fromiter((hero_to_idx[h] for h in enemy_names), dtype=np.int64, count=len(enemy_names))
+        np.add.at(games, (rows, cols), 1)
+        np.add.at(wins, (rows, cols), np.asarray(outcomes, dtype=np.int64))
+    # Confidence scores for every matchup at once
+    wr_low, wr_high = wilson_interval(wins, games)
+    wr_shrunk = shrunk_win_rate(wins, games, prior_mean=0.5)
+    return {"heroes": heroes, "hero_to_idx": hero_to_idx, "games": games, "wins": wins,
+            "wr_low": wr_low, "wr_high": wr_high, "wr_shrunk": wr_shrunk}
+
+def hero_counters_from_matrix(counter_matrix, selected_hero, min_games):
+    """
+    Slices the 'counters' and 'countered_by' tables for one hero out of a precomputed counter matrix.
+    Returns the same structure as analyze_hero_counters.
+    """
+    columns = ["Enemy Hero", "Games Against", "Wins", "Losses", "Win Rate (%)"]
+    hero_idx = counter_matrix["hero_to_idx"].get(selected_hero)
+    if hero_idx is None:
+        return {"counters": pd.DataFrame(columns=columns), "countered_by": pd.DataFrame(columns=columns)}
+
+    games = counter_matrix["games"][hero_idx]
+    wins = counter_matrix["wins"][hero_idx]
+    df = pd.DataFrame({
+        "Enemy Hero": counter_matrix["heroes"],
+        "Games Against": games,
+        "Wins": wins,
+        "Losses": games - wins,
+        "WR Lower Bound (%)": np.round(counter_matrix["wr_low"][hero_idx] * 100, 2),
+        "WR Upper Bound (%)": np.round(counter_matrix["wr_high"][hero_idx] * 100, 2),
+        "Shrunk Win Rate (%)": np.round(counter_matrix["wr_shrunk"][hero_idx] * 100, 2),
+    })
+    df = df[(df["Games Against"] >= min_games) & (df["Games Against"] > 0)]
+    df.insert(4, "Win Rate (%)", (df["Wins"] / df["Games Against"] * 100).round(2))
+
+    counters_df = df[df["Win Rate (%)"] > 55].sort_values("Win Rate (%)", ascending=False)
+    # "Countered by" is the enemy's perspective: its win rate and bounds are the complement of ours
+    countered_by_df = df[df["Win Rate (%)"] < 45].copy()
+    countered_by_df["Win Rate (%)"] = (100 - countered_by_df["Win Rate (%)"]).round(2)
+    countered_by_df["Shrunk Win Rate (%)"] = (100 - countered_by_df["Shrunk Win Rate (%)"]).round(2)
+    low, high = countered_by_df["WR Lower Bound (%)"].copy(), countered_by_df["WR Upper Bound (%)"].copy()
+    countered_by_df["WR Lower Bound (%)"], countered_by_df["WR Upper Bound (%)"] = (100 - high).round(2), (100 - low).round(2)
+    countered_by_df = countered_by_df.sort_values("Win Rate (%)", ascending=False)
+    return {"counters": counters_df.reset_index(drop=True), "countered_by": countered_by_df.reset_index(drop=True)}
+
+def counter_matrix_to_long_df(counter_matrix, min_games=1):
+    """Flattens a counter matrix into one row per (hero, enemy) pair, for CSV export."""
+    games, wins = counter_matrix["games"], counter_matrix["wins"]
+    rows, cols = np.nonzero(games >= max(min_games, 1))
+    heroes = np.asarray(counter_matrix["heroes"], dtype=object)
+    return pd.DataFrame({
+        "Hero": heroes[rows],
+        "Enemy Hero": heroes[cols],
+        "Games Against": games[rows, cols],
+        "Wins": wins[rows, cols],
+        "Win Rate (%)": np.round(wins[rows, cols] / games[rows, cols] * 100, 2),
+        "WR Lower Bound (%)": np.round(counter_matrix["wr_low"][rows, cols] * 100, 2),
+        "WR Upper Bound (%)": np.round(counter_matrix["wr_high"][rows, cols] * 100, 2),
+        "Shrunk Win Rate (%)": np.round(counter_matrix["wr_shrunk"][rows, cols] * 100, 2),
+    })
+
+def extract_side_lineups(pooled_matches, team_filter="All Teams"):
+    """
+    Extracts one (sorted heroes, won) lineup per team per game, using the same pick data and
+    team filter as the synergy functions.
+    """
+    lineups = []
+    for match in pooled_matches:
+        teams_names = [opp.get("name", "").strip() for opp in match.get("match2opponents", [])]
+        for game in match.get("match2games", []):
+            winner = str(game.get("winner", ""))
+            for idx, opp in enumerate(game.get("opponents", [])):
+                team_name = teams_names[idx] if idx < len(teams_names) else ""
+                if team_filter != "All Teams" and team_name != team_filter: continue
+                players = sorted({p["champion"] for p in opp.get("players", []) if isinstance(p, dict) and "champion" in p})
+                if players:
+                    lineups.append((tuple(players), str(idx + 1) == winner))
+    return lineups
+
+def mine_frequent_hero_sets(pooled_matches, team_filter="All Teams", min_support=3, min_size=3, max_size=5, top_n=None, rank_by="win_rate"):
+    """
+    Apriori-style frequent itemset mining over per-side lineups (trios, four-hero cores, full compositions).
+    Each hero keeps a bitset of the lineups it appears in, so the support of a candidate set is the popcount
+    of an AND over its heroes' bitsets, and candidates with an infrequent subset are pruned before counting.
+    """
+    lineups = extract_side_lineups(pooled_matches, team_filter)
+    columns = ["Heroes", "Size", "Games Together", "Wins", "Win Rate (%)"]
+    if not lineups:
+        return pd.DataFrame(columns=columns)
+
+    hero_bits = defaultdict(int)
+    win_bits = 0
+    for t_idx, (heroes, won) in enumerate(lineups):
+        bit = 1 << t_idx
+        for hero in heroes:
+            hero_bits[hero] |= bit
+        if won:
+            win_bits |= bit
+
+    # Level 1: frequent single heroes
+    level = {(hero,): bits for hero, bits in hero_bits.items() if bits.bit_count() >= min_support}
+    found = []
+    size = 1
+    while level and size < max_size:
+        size += 1
+        prev_keys = sorted(level)
+        next_level = {}
+        # Join (k-1)-sets sharing the same (k-2)-prefix
+        for i, a in enumerate(prev_keys):
+            for b in prev_keys[i + 1:]:
+                if a[:-1] != b[:-1]:
+                    break
+                candidate = a + (b[-1],)
+                if any(candidate[:j] + candidate[j + 1:] not in level for j in range(size - 2)):
+                    continue
+                bits = level[a] & hero_bits[b[-1]]
+                if bits.bit_count() >= min_support:
+                    next_level[candidate] = bits
+        level = next_level
+        if size >= min_size:
+            found.extend(level.items())
+
+    rows = []
+    for heroes, bits in found:
+        games = bits.bit_count()
+        wins = (bits & win_bits).bit_count()
+        rows.append({"Heroes": " + ".join(heroes), "Size": len(heroes), "Games Together": games, "Wins": wins,
+                     "Win Rate (%)": round(wins / games * 100, 2)})
+    df = pd.DataFrame(rows, columns=columns)
+    if df.empty:
+        return df
+    prior_mean = sum(won for _, won in lineups) / len(lineups)
+    df = add_confidence_columns(df, "Games Together", "Wins", prior_mean=prior_mean)
+    df = sort_by_ranking(df, rank_by)
+    return df.head(top_n) if top_n else df
+
 def analyze_synergy_combos_enhanced_with_duo(pooled_matches, team_filter, min_games, top_n, 
-                                            find_anti_synergy=False, focus_hero1=None, focus_hero2=None):
+                                            find_anti_synergy=False, focus_hero1=None, focus_hero2=None,
+                                            rank_by="win_rate"):
     """
     Enhanced version that can filter for specific hero duos.
     If both focus_hero1 and focus_hero2 are specified, only shows that specific pair.
     If only one is specified, shows all pairs containing that hero.
+    rank_by selects the sort key: 'win_rate', 'lower_bound' (Wilson) or 'shrunk' (Bayesian).
     """
     from datetime import datetime
     
@@ -803,5 +1177,8 @@ def analyze_synergy_combos_enhanced_with_duo(pooled_matches, team_filter, min_ga
     if df.empty:
         return df
     
-    # Sort by win rate
-    return df.sort_values("Win Rate (%)", ascending=find_anti_synergy).head(top_n)
+    # Score every pair at once, then rank by the requested column
+    total_games = sum(s["games"] for s in duo_counter.values())
+    prior_mean = sum(s["wins"] for s in duo_counter.values()) / total_games if total_games else 0.5
+    df = add_confidence_columns(df, "Games Together", "Wins", prior_mean=prior_mean)
+    return sort_by_ranking(df, rank_by, find_anti_synergy).head(top_n)
@@ -49,6 +49,19 @@ def fetch_from_api(tournament_path):
     except Exception as e:
         return {'error': str(e)}
 
+def get_tournament_data_version(tournament_name):
+    """
+    Returns the modification time of a tournament's local data file, which changes whenever the
+    file is rewritten. Live tournaments are always refetched, so they have no version (None).
+    """
+    if ALL_TOURNAMENTS[tournament_name].get('live', False):
+        return None
+    filepath = os.path.join("data", f"{tournament_name.replace(' ', '_').replace('/', '_')}.json")
+    try:
+        return os.path.getmtime(filepath)
+    except OSError:
+        return None
+
 def load_tournament_data(tournament_name):
     """Loads data from local file or fetches from API."""
     tournament_info = ALL_TOURNAMENTS[tournament_name]
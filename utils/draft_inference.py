@@ -0,0 +1,116 @@
+import os
+import json
+import numpy as np
+
+# --- CONFIGURATION ---
+# "sklearn": XGBClassifier.predict_proba (reference), "booster": Booster.inplace_predict,
+# "numpy": the trees flattened into arrays and walked with numpy, "auto": numpy for small batches, booster otherwise
+INFERENCE_BACKENDS = ("sklearn", "booster", "numpy", "auto")
+DEFAULT_INFERENCE_BACKEND = os.environ.get("DRAFT_INFERENCE_BACKEND", "auto")
+AUTO_NUMPY_MAX_ROWS = 8
+PARITY_TOLERANCE = 1e-5
+
+# --- FLATTENED TREES ---
+def compile_tree_arrays(booster):
+    """
+    Flattens a binary:logistic gbtree booster into padded (trees x nodes) arrays.
+    Leaves point to themselves, so every row can be walked for `depth` steps without branching.
+    Returns None for models this evaluator does not cover (other objectives, categorical splits).
+    """
+    learner = json.loads(booster.save_raw("json"))["learner"]
+    if learner["objective"]["name"] != "binary:logistic" or learner["gradient_booster"]["name"] != "gbtree":
+        return None
+    trees = learner["gradient_booster"]["model"]["trees"]
+    if not trees or any(any(t.get("split_type", [])) for t in trees):
+        return None
+
+    n_trees, max_nodes = len(trees), max(len(t["left_children"]) for t in trees)
+    feature = np.zeros((n_trees, max_nodes), dtype=np.int64)
+    threshold = np.zeros((n_trees, max_nodes), dtype=np.float32)
+    left = np.zeros((n_trees, max_nodes), dtype=np.int64)
+    right = np.zeros((n_trees, max_nodes), dtype=np.int64)
+    leaf_value = np.zeros((n_trees, max_nodes), dtype=np.float32)
+    depth = 0
+    for i, tree in enumerate(trees):
+        left_children, right_children = np.array(tree["left_children"]), np.array(tree["right_children"])
+        conditions = np.array(tree["split_conditions"], dtype=np.float32)
+        n_nodes = len(left_children)
+        is_leaf, nodes = left_children == -1, np.arange(n_nodes)
+        feature[i, :n_nodes] = tree["split_indices"]
+        threshold[i, :n_nodes] = conditions
+        left[i, :n_nodes] = np.where(is_leaf, nodes, left_children)
+        right[i, :n_nodes] = np.where(is_leaf, nodes, right_children)
+        # For leaves, split_conditions holds the leaf weight
+        leaf_value[i, :n_nodes] = np.where(is_leaf, conditions, 0)
+        node_depth = np.zeros(n_nodes, dtype=np.int64)
+        for node in range(n_nodes):
+            if not is_leaf[node]:
+                node_depth[left_children[node]] = node_depth[right_children[node]] = node_depth[node] + 1
+        depth = max(depth, int(node_depth.max()))
+
+    base_score = learner["learner_model_param"]["base_score"]
+    base_score = float(base_score.strip("[]")) if isinstance(base_score, str) else float(base_score)
+    return {
+        "feature": feature, "threshold": threshold, "left": left, "right": right, "leaf_value": leaf_value,
+        "depth": depth, "base_margin": np.float32(np.log(base_score / (1 - base_score))),
+    }
+
+def predict_tree_arrays(arrays, X):
+    """Blue win probability for each row of X using the flattened trees (no missing values expected)."""
+    X = np.asarray(X, dtype=np.float32)
+    if X.ndim == 1:
+        X = X[np.newaxis, :]
+    trees = np.arange(arrays["feature"].shape[0])
+    rows = np.arange(len(X))[:, np.newaxis]
+    node = np.zeros((len(X), len(trees)), dtype=np.int64)
+    for _ in range(arrays["depth"]):
+        go_left = X[rows, arrays["feature"][trees, node]] < arrays["threshold"][trees, node]
+        node = np.where(go_left, arrays["left"][trees, node], arrays["right"][trees, node])
+    margin = arrays["leaf_value"][trees, node].sum(axis=1, dtype=np.float32) + arrays["base_margin"]
+    return (1.0 / (1.0 + np.exp(-margin))).astype(np.float32)
+
+# --- BACKEND SELECTION ---
+def _reference_inputs(num_features, n_rows=32, seed=0):
+    """Draft-like rows (mostly zeros, a few ±1 and small counts) for the parity check."""
+    rng = np.random.default_rng(seed)
+    X = np.zeros((n_rows, num_features))
+    for row in range(n_rows):
+        cols = rng.choice(num_features, size=min(num_features, 25), replace=False)
+        X[row, cols] = rng.choice([-1, 1, 2, 3], size=len(cols))
+    return X
+
+def make_predictor(model, num_features, backend=None):
+    """
+    Builds the win-probability function for `model` with the configured backend.
+    The backend's output is compared with predict_proba on reference rows at load time; if it
+    differs by more than PARITY_TOLERANCE (or cannot be built), the sklearn path is used instead.
+    Returns (predict_fn, backend_name).
+    """
+    backend = backend or DEFAULT_INFERENCE_BACKEND
+    def reference(X):
+        return model.predict_proba(X)[:, 1]
+    if backend not in INFERENCE_BACKENDS or backend == "sklearn":
+        return reference, "sklearn"
+
+    booster = model.get_booster()
+    def booster_predict(X):
+        return booster.inplace_predict(np.asarray(X, dtype=np.float32))
+    arrays = compile_tree_arrays(booster) if backend in ("numpy", "auto") else None
+    if backend == "booster":
+        predict_fn = booster_predict
+    elif arrays is None:
+        if backend != "auto":
+            return reference, "sklearn"
+        # Trees this evaluator cannot compile: auto uses the booster, which still has to pass the check
+        predict_fn, backend = booster_predict, "booster"
+    elif backend == "numpy":
+        predict_fn = lambda X: predict_tree_arrays(arrays, X)
+    else:
+        predict_fn = lambda X: predict_tree_arrays(arrays, X) if len(X) <= AUTO_NUMPY_MAX_ROWS else booster_predict(X)
+
+    X = _reference_inputs(num_features)
+    expected = reference(X)
+    for batch in (X[:1], X[:AUTO_NUMPY_MAX_ROWS], X):
+        if np.abs(predict_fn(batch) - expected[:len(batch)]).max() > PARITY_TOLERANCE:
+            return reference, "sklearn"
+    return predict_fn, backend
@@ -0,0 +1,135 @@
+import time
+import numpy as np
+import streamlit as st
+from utils.drafting_ai import ROLES, draft_state_key, predict_draft_outcome, score_candidate_picks, score_candidate_bans
+
+# --- DRAFT ORDER ---
+# Tournament pick/ban order: 3 ban rounds, 6 picks, 2 ban rounds, 4 picks
+DRAFT_SEQUENCE = (
+    [("BAN", "blue"), ("BAN", "red")] * 3
+    + [("PICK", "blue"), ("PICK", "red"), ("PICK", "red"), ("PICK", "blue"), ("PICK", "blue"), ("PICK", "red")]
+    + [("BAN", "red"), ("BAN", "blue")] * 2
+    + [("PICK", "red"), ("PICK", "blue"), ("PICK", "blue"), ("PICK", "red")]
+)
+
+def next_draft_step_index(total_bans, total_picks):
+    """Index into DRAFT_SEQUENCE of the next action, or len(DRAFT_SEQUENCE) once the draft is complete."""
+    if total_bans < 6: return total_bans
+    if total_picks < 6: return 6 + total_picks
+    if total_bans < 10: return 12 + total_bans - 6
+    if total_picks < 10: return 16 + total_picks - 6
+    return len(DRAFT_SEQUENCE)
+
+class _SearchTimeout(Exception):
+    pass
+
+# --- SEARCH ---
+def search_draft(blue_picks, red_picks, blue_bans, red_bans, blue_team, red_team, available_heroes, model_assets, HERO_PROFILES, max_depth=3, beam_width=6, time_budget=2.0):
+    """
+    Depth-limited minimax with a beam over the remaining pick/ban order.
+    Blue maximises and red minimises blue's win probability. At every node only the `beam_width` best
+    moves by one-step score are expanded, and all children of a frontier node are evaluated in one
+    batched model call. Evaluated partial drafts are kept in a transposition table, and iterative
+    deepening stops at the deepest depth finished within `time_budget` seconds.
+
+    Returns a dict with 'suggestions' (hero, win probability for the side to move after the best
+    replies), 'depth' reached and 'nodes' evaluated.
+    """
+    step_idx = next_draft_step_index(len(blue_bans) + len(red_bans), len(blue_picks) + len(red_picks))
+    result = {'suggestions': [], 'depth': 0, 'nodes': 0}
+    if step_idx >= len(DRAFT_SEQUENCE) or not available_heroes:
+        return result
+
+    deadline = time.monotonic() + time_budget
+    transpositions = {}
+
+    def apply_move(state, phase, side, hero):
+        bp, rp, bb, rb = state
+        if phase == "PICK":
+            picks = bp if side == "blue" else rp
+            role = next(r for r in ROLES if r not in picks)
+            new_picks = {**picks, role: hero}
+            return (new_picks, rp, bb, rb) if side == "blue" else (bp, new_picks, bb, rb)
+        return (bp, rp, bb + [hero], rb) if side == "blue" else (bp, rp, bb, rb + [hero])
+
+    def child_values(state, phase, side, candidates):
+        # Blue win probability of every child state, scored in one batch
+        scorer = score_candidate_picks if phase == "PICK" else score_candidate_bans
+        result['nodes'] += len(candidates)
+        return scorer(*state, blue_team, red_team, candidates, side, model_assets, HERO_PROFILES)
+
+    def ordered_moves(state, phase, side, available):
+        """Returns the beam of moves and, for picks, their already computed child values."""
+        if phase == "PICK":
+            values = child_values(state, phase, side, available)
+            if values is None:
+                return [], None
+            keys = values if side == "blue" else 1 - values
+        else:
+            # Ban the heroes the opponent would gain the most from picking
+            opponent = "red" if side == "blue" else "blue"
+            threat = score_candidate_picks(*state, blue_team, red_team, available, opponent, model_assets, HERO_PROFILES)
+            if threat is None:
+                threat = child_values(state, phase, opponent, available)
+            values = None
+            keys = 1 - threat if side == "blue" else threat
+        order = np.argsort(-keys, kind="stable")[:beam_width]
+        moves = [available[i] for i in order]
+        return moves, (values[order] if values is not None else None)
+
+    def evaluate_moves(state, idx, available, depth):
+        """Blue win probability after each beam move at step `idx`, searched `depth` plies deep."""
+        phase, side = DRAFT_SEQUENCE[idx]
+        moves, values = ordered_moves(state, phase, side, available)
+        if not moves:
+            return [], []
+        if depth <= 1 or idx + 1 >= len(DRAFT_SEQUENCE):
+            if values is None:
+                values = child_values(state, phase, side, moves)
+            return moves, [float(v) for v in values]
+        return moves, [
+            node_value(apply_move(state, phase, side, hero), idx + 1, [h for h in available if h != hero], depth - 1)
+            for hero in moves
+        ]
+
+    def node_value(state, idx, available, depth):
+        key = (draft_state_key(*state, blue_team, red_team), depth)
+        if key in transpositions:
+            return transpositions[key]
+        if time.monotonic() > deadline:
+            raise _SearchTimeout
+        moves, values = evaluate_moves(state, idx, available, depth)
+        if not moves:
+            # Nothing left to do for this side (e.g. no open role); fall back to a static evaluation
+            value = float(predict_draft_outcome(*state, blue_team, red_team, model_assets, HERO_PROFILES)[0])
+        else:
+            value = max(values) if DRAFT_SEQUENCE[idx][1] == "blue" else min(values)
+        transpositions[key] = value
+        return value
+
+    root_state = (dict(blue_picks), dict(red_picks), list(blue_bans), list(red_bans))
+    available = list(available_heroes)
+    is_blue_turn = DRAFT_SEQUENCE[step_idx][1] == "blue"
+    for depth in range(1, max(1, max_depth) + 1):
+        try:
+            moves, values = evaluate_moves(root_state, step_idx, available, depth)
+        except _SearchTimeout:
+            break
+        scored = [(hero, v if is_blue_turn else 1 - v) for hero, v in zip(moves, values)]
+        result['suggestions'] = sorted(scored, key=lambda x: x[1], reverse=True)
+        result['depth'] = depth
+        if step_idx + depth >= len(DRAFT_SEQUENCE) or time.monotonic() > deadline:
+            break
+    return result
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def _cached_draft_search(state_key, available_heroes, max_depth, beam_width, time_budget, model_version, _model_assets, _hero_profiles):
+    blue_p, red_p, blue_b, red_b, blue_t, red_t = state_key
+    return search_draft(dict(blue_p), dict(red_p), list(blue_b), list(red_b), blue_t, red_t, list(available_heroes),
+                        _model_assets, _hero_profiles, max_depth=max_depth, beam_width=beam_width, time_budget=time_budget)
+
+def cached_search_draft(blue_picks, red_picks, blue_bans, red_bans, blue_team, red_team, available_heroes, model_assets, HERO_PROFILES, max_depth=3, beam_width=6, time_budget=2.0):
+    """search_draft behind a shared cache keyed on the canonical draft state and the model version."""
+    state_key = draft_state_key(blue_picks, red_picks, blue_bans, red_bans, blue_team, red_team)
+    return _cached_draft_search(state_key, tuple(sorted(available_heroes)), max_depth, beam_width, time_budget,
+                                model_assets.get('model_version'), model_assets, HERO_PROFILES)
@@ -4,143 +4,462 @@ import numpy as np
 import xgboost as xgb
 import json
 import joblib
-from collections import defaultdict, Counter
 import itertools
-import math
+import hashlib
 import io
+import os
+import threading
+from utils.hero_data import HERO_PROFILES
+from utils.match_store import build_game_table, game_keys, select_games, drafted_heroes, table_teams, training_mark, games_after_mark
+from utils.draft_inference import make_predictor
+from utils.model_tuning import BASE_MODEL_PARAMS, DEFAULT_MODEL_PARAMS, time_ordered_folds, tune_model_params
 
 # --- MODEL LOADING (FOR PREDICTION) ---
-@st.cache_resource
+def _read_prediction_assets(model_path, assets_path):
+    """
+    Loads the trained model from its native JSON format and the assets from their JSON file,
+    precomputes the inference lookup tables and runs one warm-up prediction.
+    """
+    with open(assets_path, 'r') as f:
+        assets = json.load(f)
+    
+    model = xgb.XGBClassifier()
+    model.load_model(model_path)
+    
+    assets['model'] = model
+    with open(model_path, 'rb') as f:
+        assets['model_version'] = hashlib.md5(f.read()).hexdigest()[:16]
+    assets['tag_tables'] = build_tag_tables(assets, HERO_PROFILES)
+    # Fails early if the model and assets files do not belong together
+    model.predict_proba(np.zeros((1, len(assets['feature_to_idx']))))
+    assets['predict_fn'], assets['inference_backend'] = make_predictor(model, len(assets['feature_to_idx']))
+    return assets
+
+def predict_win_probs(model_assets, X):
+    """Blue win probability for each row of X, through the inference backend chosen at load time."""
+    predict_fn = model_assets.get('predict_fn')
+    if predict_fn is None:
+        return model_assets['model'].predict_proba(X)[:, 1]
+    return predict_fn(X)
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded prediction assets, shared by every session.
+    Entries are keyed by the files' mtime and size; when a new model is written, the next lookup
+    loads it and swaps the entry in one assignment, so readers see either the old or the new model.
+    A half-written or mismatched pair keeps the previous model in service until it loads cleanly.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _stamp(paths):
+        stats = [os.stat(path) for path in paths]
+        return tuple((stat.st_mtime_ns, stat.st_size) for stat in stats)
+
+    def get(self, model_path, assets_path):
+        key = (model_path, assets_path)
+        try:
+            stamp = self._stamp(key)
+        except FileNotFoundError:
+            entry = self._entries.get(key)
+            return entry[1] if entry else None
+        entry = self._entries.get(key)
+        if entry and entry[0] == stamp:
+            return entry[1]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == stamp:
+                return entry[1]
+            try:
+                assets = _read_prediction_assets(model_path, assets_path)
+            except Exception:
+                return entry[1] if entry else None
+            self._entries[key] = (stamp, assets)
+            return assets
+
+MODEL_REGISTRY = ModelRegistry()
+
 def load_prediction_assets(model_path='draft_predictor.json', assets_path='draft_assets.json'):
     """
-    Loads the trained model from its native JSON format and the assets from their JSON file.
+    Returns the loaded model and assets from the process-wide registry.
+    Returns None if the files haven't been created yet; the app page shows an informative error.
     """
-    try:
-        with open(assets_path, 'r') as f:
-            assets = json.load(f)
-        
-        model = xgb.XGBClassifier()
-        model.load_model(model_path)
-        
-        assets['model'] = model
-        return assets
-    except FileNotFoundError:
-        # This is expected if the files haven't been created yet.
-        # The app page will handle showing an informative error to the user.
-        return None
+    return MODEL_REGISTRY.get(model_path, assets_path)
+
+def save_model_files(model, model_assets, model_filename, assets_filename):
+    """Writes the model and its assets through temporary files, so readers never see a partial file."""
+    model.save_model(model_filename + ".tmp.json")
+    with open(assets_filename + ".tmp", 'w') as f:
+        json.dump(model_assets, f)
+    os.replace(model_filename + ".tmp.json", model_filename)
+    os.replace(assets_filename + ".tmp", assets_filename)
 
 # --- MODEL TRAINING ---
+def build_feature_index(all_heroes, all_teams, all_tags, roles=("EXP", "Jungle", "Mid", "Gold", "Roam")):
+    """Feature layout of the draft predictor: hero/role picks, bans, teams, then blue and red tag counts."""
+    feature_list = []
+    for hero in all_heroes:
+        for role in roles: feature_list.append(f"{hero}_{role}")
+    for hero in all_heroes: feature_list.append(f"{hero}_Ban")
+    feature_list.extend(all_teams)
+    for tag in all_tags: feature_list.append(f"blue_{tag}_count")
+    for tag in all_tags: feature_list.append(f"red_{tag}_count")
+    return {feature: i for i, feature in enumerate(feature_list)}
+
+def build_training_matrix(game_table, model_assets, hero_profiles, skip_unknown_teams=True, return_keep=False):
+    """
+    Builds the draft predictor's design matrix from a game table (see utils.match_store) in one pass.
+    Games are mapped to hero rows and team columns through the table's vocabularies, then all features
+    are written with array indexing into a preallocated int8 matrix. Games whose teams are not in the
+    feature index are skipped, or kept without team features if `skip_unknown_teams` is False.
+    Returns (X, y), plus the mask of kept table rows if `return_keep`; X is empty if no game qualified.
+    """
+    feature_to_idx = model_assets['feature_to_idx']
+    tables = build_tag_tables(model_assets, hero_profiles)
+    model_heroes = set(model_assets['all_heroes'])
+    unknown = len(tables['frontline']) - 1
+
+    # Vocabulary code -> table row / feature column; the extra last entry serves code -1
+    rows_by_code = np.array([tables['hero_to_row'][h] if h in model_heroes else unknown for h in game_table['heroes'].tolist()] + [unknown], dtype=np.int64)
+    team_cols_by_code = np.array([feature_to_idx.get(t, -1) for t in game_table['teams'].tolist()] + [-1], dtype=np.int64)
+    team1_cols, team2_cols = team_cols_by_code[game_table['team1']], team_cols_by_code[game_table['team2']]
+    keep = (team1_cols >= 0) & (team2_cols >= 0) if skip_unknown_teams else np.ones(len(team1_cols), dtype=bool)
+    picks = rows_by_code[game_table['picks'][keep]].reshape(-1, 2, 5)
+    bans = rows_by_code[game_table['bans'][keep]].reshape(-1, 2, 5)
+    teams = np.stack([team1_cols[keep], team2_cols[keep]], axis=1)
+    y = (game_table['winner'][keep] == 1).astype(np.int8)
+
+    X = np.zeros((len(y), len(feature_to_idx)), dtype=np.int8)
+    if len(y) == 0:
+        return (X, y, keep) if return_keep else (X, y)
+    games = np.arange(len(y))
+
+    def write(cols, value):
+        valid = cols >= 0
+        X[games[valid], cols[valid]] = value
+
+    # Same write order as the per-game vector, so clashing entries resolve identically
+    for r in range(5):
+        write(tables['pick_cols'][picks[:, 0, r], r], 1)
+        write(tables['pick_cols'][picks[:, 1, r], r], -1)
+    for i in range(5):
+        write(tables['ban_cols'][bans[:, 0, i]], 1)
+        write(tables['ban_cols'][bans[:, 1, i]], -1)
+    for side, side_picks in (('blue', picks[:, 0]), ('red', picks[:, 1])):
+        has_frontline = tables['frontline'][side_picks].any(axis=1)
+        counts = np.where(
+            has_frontline[:, np.newaxis],
+            tables['default_tags'][side_picks].sum(axis=1),
+            tables['no_frontline_tags'][side_picks].sum(axis=1),
+        )
+        tag_cols = tables['tag_cols'][side]
+        X[:, tag_cols[tag_cols >= 0]] = counts[:, tag_cols >= 0]
+    write(teams[:, 0], 1)
+    write(teams[:, 1], -1)
+    return (X, y, keep) if return_keep else (X, y)
+
 def train_and_save_prediction_model(matches, hero_profiles, model_filename='draft_predictor.json', assets_filename='draft_assets.json'):
     """
     Trains an XGBoost model and saves it to a native JSON format, with assets in a separate JSON file.
     """
     all_heroes = sorted(list(set(p['champion'] for m in matches for g in m.get('match2games', []) for o in g.get('opponents', []) for p in o.get('players', []) if 'champion' in p)))
     all_teams = sorted(list(set(o['name'] for m in matches for o in m.get('match2opponents', []) if 'name' in o)))
+    return train_model_from_game_table(build_game_table(matches), hero_profiles, model_filename, assets_filename, all_heroes, all_teams)
+
+def train_model_from_game_table(game_table, hero_profiles, model_filename='draft_predictor.json', assets_filename='draft_assets.json', all_heroes=None, all_teams=None, tune=False, report_filename='draft_model_report.json'):
+    """
+    Full training on a game table. Heroes and teams default to those appearing in the table.
+    With tune=True the hyperparameters come from a time-ordered cross-validated search
+    (utils.model_tuning) and its metrics report is saved next to the assets file.
+    """
+    all_heroes = sorted(all_heroes if all_heroes is not None else drafted_heroes(game_table))
+    all_teams = sorted(all_teams if all_teams is not None else table_teams(game_table))
     roles = ["EXP", "Jungle", "Mid", "Gold", "Roam"]
     all_tags = sorted(list(set(tag for profiles in hero_profiles.values() for profile in profiles for tag in profile['tags'])))
     
-    feature_list = []
-    for hero in all_heroes:
-        for role in roles: feature_list.append(f"{hero}_{role}")
-    for hero in all_heroes: feature_list.append(f"{hero}_Ban")
-    feature_list.extend(all_teams)
-    for tag in all_tags: feature_list.append(f"blue_{tag}_count")
-    for tag in all_tags: feature_list.append(f"red_{tag}_count")
+    feature_to_idx = build_feature_index(all_heroes, all_teams, all_tags, roles)
+    X, y, keep = build_training_matrix(game_table, {'feature_to_idx': feature_to_idx, 'all_heroes': all_heroes, 'all_tags': all_tags}, hero_profiles, return_keep=True)
     
-    feature_to_idx = {feature: i for i, feature in enumerate(feature_list)}
-    
-    X, y = [], []
-    for match in matches:
-        match_teams = [o.get('name') for o in match.get('match2opponents', [])]
-        if len(match_teams) != 2 or not all(t in feature_to_idx for t in match_teams): continue
-        for game in match.get('match2games', []):
-            extradata = game.get('extradata', {})
-            if len(game.get('opponents', [])) != 2 or game.get('winner') not in ['1', '2'] or not extradata: continue
-            vector = np.zeros(len(feature_list))
-            blue_picks_list, red_picks_list = [], []
-            for i, role in enumerate(roles, 1):
-                blue_hero, red_hero = extradata.get(f'team1champion{i}'), extradata.get(f'team2champion{i}')
-                if blue_hero in all_heroes: vector[feature_to_idx[f"{blue_hero}_{role}"]] = 1; blue_picks_list.append(blue_hero)
-                if red_hero in all_heroes: vector[feature_to_idx[f"{red_hero}_{role}"]] = -1; red_picks_list.append(red_hero)
-            for i in range(1, 6):
-                blue_ban, red_ban = extradata.get(f'team1ban{i}'), extradata.get(f'team2ban{i}')
-                if blue_ban in all_heroes: vector[feature_to_idx[f"{blue_ban}_Ban"]] = 1
-                if red_ban in all_heroes: vector[feature_to_idx[f"{red_ban}_Ban"]] = -1
-            def get_tags_for_team(team_picks):
-                team_tags = defaultdict(int)
-                team_has_frontline = any('Front-line' in p['tags'] for h in team_picks if h in hero_profiles for p in hero_profiles[h])
-                for hero in team_picks:
-                    profiles = hero_profiles.get(hero)
-                    if profiles:
-                        chosen_build = profiles[0]
-                        if len(profiles) > 1 and not team_has_frontline and any('Tank' in p['build_name'] for p in profiles):
-                            chosen_build = next((p for p in profiles if 'Tank' in p['build_name']), profiles[0])
-                        for tag in chosen_build['tags']: team_tags[tag] += 1
-                return team_tags
-            blue_tags, red_tags = get_tags_for_team(blue_picks_list), get_tags_for_team(red_picks_list)
-            for tag, count in blue_tags.items():
-                if f"blue_{tag}_count" in feature_to_idx: vector[feature_to_idx[f"blue_{tag}_count"]] = count
-            for tag, count in red_tags.items():
-                if f"red_{tag}_count" in feature_to_idx: vector[feature_to_idx[f"red_{tag}_count"]] = count
-            vector[feature_to_idx[match_teams[0]]] = 1
-            vector[feature_to_idx[match_teams[1]]] = -1
-            X.append(vector)
-            y.append(1 if game['winner'] == '1' else 0)
-    
-    if not X:
+    if len(y) == 0:
         raise ValueError("Could not generate any training samples from the provided match data.")
     
-    model = xgb.XGBClassifier(use_label_encoder=False, eval_metric='logloss', n_estimators=200, max_depth=6, learning_rate=0.05, colsample_bytree=0.8)
-    model.fit(np.array(X), np.array(y))
+    model_params, report = dict(DEFAULT_MODEL_PARAMS), None
+    if tune:
+        # Folds over the kept rows only, so their indices line up with X
+        folds = time_ordered_folds(select_games(game_table, keep))
+        folds = [fold for fold in folds if len(np.unique(y[fold[0]])) == 2]
+        if folds:
+            model_params, report = tune_model_params(X, y, folds)
+    model = xgb.XGBClassifier(**BASE_MODEL_PARAMS, **model_params)
+    model.fit(X, y)
     
-    model.save_model(model_filename)
     model_assets = {
         'feature_to_idx': feature_to_idx, 'roles': roles, 'all_heroes': all_heroes, 
-        'all_tags': all_tags, 'all_teams': all_teams
+        'all_tags': all_tags, 'all_teams': all_teams, 'trained_through': training_mark(game_table),
+        'model_params': model_params
     }
-    with open(assets_filename, 'w') as f:
-        json.dump(model_assets, f)
+    save_model_files(model, model_assets, model_filename, assets_filename)
 
+    if report is not None:
+        report_path = os.path.join(os.path.dirname(assets_filename), report_filename)
+        with open(report_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        best = report['candidates'][0]
+        return (f"✅ Model saved to '{model_filename}' and assets saved to '{assets_filename}'. "
+                f"Tuned {model_params} (CV log-loss {best['mean_log_loss']:.4f}); report saved to '{report_path}'")
+    if tune:
+        return (f"✅ Model saved to '{model_filename}' and assets saved to '{assets_filename}'. "
+                f"Tuning was skipped: {len(y)} games are too few for time-ordered folds with both outcomes, so the default parameters were used")
     return f"✅ Model saved to '{model_filename}' and assets saved to '{assets_filename}'"
 
+# --- INCREMENTAL TRAINING ---
+def extend_feature_index(feature_to_idx, all_heroes, all_teams, all_tags, roles=("EXP", "Jungle", "Mid", "Gold", "Roam")):
+    """Append-only version of build_feature_index: existing features keep their column, new ones go at the end."""
+    extended = dict(feature_to_idx)
+    for feature in build_feature_index(all_heroes, all_teams, all_tags, roles):
+        if feature not in extended:
+            extended[feature] = len(extended)
+    return extended
+
+def load_booster_with_width(model_filename, num_features):
+    """Loads a saved model as a Booster that accepts `num_features` columns. Existing trees never use the added columns."""
+    with open(model_filename, 'r') as f:
+        model_json = json.load(f)
+    model_json['learner']['learner_model_param']['num_feature'] = str(num_features)
+    booster = xgb.Booster()
+    booster.load_model(bytearray(json.dumps(model_json).encode('utf-8')))
+    return booster
+
+def update_prediction_model(matches, hero_profiles, model_filename='draft_predictor.json', assets_filename='draft_assets.json', n_rounds=25):
+    """Incremental counterpart of train_and_save_prediction_model; see update_model_from_game_table."""
+    return update_model_from_game_table(build_game_table(matches), hero_profiles, model_filename, assets_filename, n_rounds)
+
+def update_model_from_game_table(game_table, hero_profiles, model_filename='draft_predictor.json', assets_filename='draft_assets.json', n_rounds=25):
+    """
+    Continues boosting the saved model for `n_rounds` on games it has not been trained on yet.
+    The assets keep a training mark (latest match date plus the game keys on that date) instead of a
+    list of every game, so later matches and games added to a running series on that date count as new.
+    New heroes, teams or tags are appended to the feature index so existing columns keep their meaning.
+    Falls back to a full retrain when no previous model (or no record of its training games) exists.
+    """
+    try:
+        with open(assets_filename, 'r') as f:
+            assets = json.load(f)
+    except FileNotFoundError:
+        assets = None
+    if not assets or not os.path.exists(model_filename):
+        return train_model_from_game_table(game_table, hero_profiles, model_filename, assets_filename)
+    if 'trained_through' not in assets:
+        if 'trained_games' not in assets:
+            return train_model_from_game_table(game_table, hero_profiles, model_filename, assets_filename)
+        # Older assets list every training game; convert them to a mark over the known games
+        legacy_games = set(assets.pop('trained_games'))
+        assets['trained_through'] = training_mark(select_games(game_table, [key in legacy_games for key in game_keys(game_table)]))
+
+    new_table = select_games(game_table, games_after_mark(game_table, assets['trained_through']))
+    if len(new_table['winner']) == 0:
+        return "✅ Model is already up to date; no new games to train on."
+
+    all_heroes = sorted(set(assets['all_heroes']) | set(drafted_heroes(new_table)))
+    all_teams = sorted(set(assets['all_teams']) | set(table_teams(new_table)))
+    all_tags = assets['all_tags'] + sorted(set(tag for profiles in hero_profiles.values() for profile in profiles for tag in profile['tags']) - set(assets['all_tags']))
+    feature_to_idx = extend_feature_index(assets['feature_to_idx'], all_heroes, all_teams, all_tags, assets['roles'])
+    added_features = len(feature_to_idx) - len(assets['feature_to_idx'])
+
+    X, y = build_training_matrix(new_table, {'feature_to_idx': feature_to_idx, 'all_heroes': all_heroes, 'all_tags': all_tags}, hero_profiles)
+    if len(y) == 0:
+        return "✅ Model is already up to date; no new games to train on."
+
+    booster = load_booster_with_width(model_filename, len(feature_to_idx))
+    # Keep the tree shape of the existing model; only the number of added rounds differs
+    model_params = {**DEFAULT_MODEL_PARAMS, **assets.get('model_params', {}), 'n_estimators': n_rounds}
+    model = xgb.XGBClassifier(**BASE_MODEL_PARAMS, **model_params)
+    model.fit(X, y, xgb_model=booster)
+
+    assets.update({
+        'feature_to_idx': feature_to_idx, 'all_heroes': all_heroes, 'all_tags': all_tags,
+        'all_teams': all_teams, 'trained_through': training_mark(new_table, assets['trained_through'])
+    })
+    save_model_files(model, assets, model_filename, assets_filename)
+
+    return f"✅ Model updated on {len(y)} new games ({added_features} new features) and saved to '{model_filename}'"
+
 # --- PREDICTION & SUGGESTION LOGIC ---
-def predict_draft_outcome(blue_picks, red_picks, blue_bans, red_bans, blue_team, red_team, model_assets, HERO_PROFILES):
-    model, feature_to_idx = model_assets['model'], model_assets['feature_to_idx']
-    all_heroes, all_teams, all_tags = model_assets['all_heroes'], model_assets['all_teams'], model_assets['all_tags']
+ROLES = ["EXP", "Jungle", "Mid", "Gold", "Roam"]
+
+def build_tag_tables(model_assets, HERO_PROFILES):
+    """
+    Precomputes everything needed to turn picks into feature columns with array lookups.
+    Rows are heroes (plus a trailing all-zero row for unknown heroes); tag matrices hold the
+    tag counts of each hero's default build and of the build used when a team has no front-line.
+    """
+    feature_to_idx, all_tags = model_assets['feature_to_idx'], model_assets['all_tags']
+    heroes = sorted(set(HERO_PROFILES) | set(model_assets['all_heroes']))
+    hero_to_row = {hero: i for i, hero in enumerate(heroes)}
+    tag_to_col = {tag: i for i, tag in enumerate(all_tags)}
+    n_rows = len(heroes) + 1
+
+    default_tags = np.zeros((n_rows, len(all_tags)), dtype=np.int16)
+    no_frontline_tags = np.zeros((n_rows, len(all_tags)), dtype=np.int16)
+    frontline = np.zeros(n_rows, dtype=bool)
+    for hero, profiles in HERO_PROFILES.items():
+        if not profiles: continue
+        row = hero_to_row[hero]
+        fallback_build = profiles[0]
+        if len(profiles) > 1 and any('Tank' in p['build_name'] for p in profiles):
+            fallback_build = next(p for p in profiles if 'Tank' in p['build_name'])
+        for tag in profiles[0]['tags']:
+            if tag in tag_to_col: default_tags[row, tag_to_col[tag]] += 1
+        for tag in fallback_build['tags']:
+            if tag in tag_to_col: no_frontline_tags[row, tag_to_col[tag]] += 1
+        frontline[row] = any('Front-line' in p['tags'] for p in profiles)
+
+    # Feature columns, -1 where the model has no such feature
+    model_heroes = set(model_assets['all_heroes'])
+    pick_cols = np.full((n_rows, len(ROLES)), -1, dtype=np.int64)
+    ban_cols = np.full(n_rows, -1, dtype=np.int64)
+    for hero, row in hero_to_row.items():
+        if hero not in model_heroes: continue
+        for r, role in enumerate(ROLES):
+            pick_cols[row, r] = feature_to_idx.get(f"{hero}_{role}", -1)
+        ban_cols[row] = feature_to_idx.get(f"{hero}_Ban", -1)
+    tag_cols = {side: np.array([feature_to_idx.get(f"{side}_{tag}_count", -1) for tag in all_tags], dtype=np.int64) for side in ('blue', 'red')}
+
+    return {
+        'hero_to_row': hero_to_row, 'role_to_col': {role: i for i, role in enumerate(ROLES)},
+        'default_tags': default_tags, 'no_frontline_tags': no_frontline_tags, 'frontline': frontline,
+        'pick_cols': pick_cols, 'ban_cols': ban_cols, 'tag_cols': tag_cols,
+    }
+
+def get_tag_tables(model_assets, HERO_PROFILES):
+    """Returns the lookup tables for these assets, building them on first use."""
+    if 'tag_tables' not in model_assets:
+        model_assets['tag_tables'] = build_tag_tables(model_assets, HERO_PROFILES)
+    return model_assets['tag_tables']
+
+def hero_rows(heroes, tables):
+    """Maps hero names to table rows; unknown heroes map to the trailing zero row."""
+    unknown = len(tables['frontline']) - 1
+    return np.array([tables['hero_to_row'].get(h, unknown) for h in heroes], dtype=np.int64)
+
+def team_tag_counts(rows, tables):
+    """Tag counts of a team given its hero rows; flex heroes switch builds when the team lacks a front-line."""
+    tags = tables['default_tags'] if tables['frontline'][rows].any() else tables['no_frontline_tags']
+    return tags[rows].sum(axis=0)
+
+def set_feature_cols(vector, cols, values):
+    """Writes values into the given feature columns, skipping columns the model does not have (-1)."""
+    mask = cols >= 0
+    vector[cols[mask]] = values[mask] if np.ndim(values) else values
+
+def build_draft_vector(blue_picks, red_picks, blue_bans, red_bans, blue_team, red_team, model_assets, HERO_PROFILES):
+    """Builds the model's feature vector for a (possibly partial) draft, including the team features."""
+    tables = get_tag_tables(model_assets, HERO_PROFILES)
+    feature_to_idx, all_teams = model_assets['feature_to_idx'], model_assets['all_teams']
     vector = np.zeros(len(feature_to_idx))
-    for role, hero in blue_picks.items():
-        if hero in all_heroes and f"{hero}_{role}" in feature_to_idx: vector[feature_to_idx[f"{hero}_{role}"]] = 1
-    for role, hero in red_picks.items():
-        if hero in all_heroes and f"{hero}_{role}" in feature_to_idx: vector[feature_to_idx[f"{hero}_{role}"]] = -1
-    for hero in blue_bans:
-        if hero in all_heroes and f"{hero}_Ban" in feature_to_idx: vector[feature_to_idx[f"{hero}_Ban"]] = 1
-    for hero in red_bans:
-        if hero in all_heroes and f"{hero}_Ban" in feature_to_idx: vector[feature_to_idx[f"{hero}_Ban"]] = -1
-    def get_tags_for_team(team_picks_dict):
-        team_tags, team_picks_list = defaultdict(int), list(team_picks_dict.values())
-        team_has_frontline = any('Front-line' in p['tags'] for h in team_picks_list if h in HERO_PROFILES for p in HERO_PROFILES[h])
-        for hero in team_picks_list:
-            profiles = HERO_PROFILES.get(hero)
-            if profiles:
-                chosen_build = profiles[0]
-                if len(profiles) > 1 and not team_has_frontline and any('Tank' in p['build_name'] for p in profiles):
-                    chosen_build = next((p for p in profiles if 'Tank' in p['build_name']), profiles[0])
-                for tag in chosen_build['tags']:
-                    if tag in all_tags: team_tags[tag] += 1
-        return team_tags
-    blue_tags, red_tags = get_tags_for_team(blue_picks), get_tags_for_team(red_picks)
-    for tag, count in blue_tags.items():
-        if f"blue_{tag}_count" in feature_to_idx: vector[feature_to_idx[f"blue_{tag}_count"]] = count
-    for tag, count in red_tags.items():
-        if f"red_{tag}_count" in feature_to_idx: vector[feature_to_idx[f"red_{tag}_count"]] = count
+    for picks, sign, side in ((blue_picks, 1, 'blue'), (red_picks, -1, 'red')):
+        rows = hero_rows(picks.values(), tables)
+        role_cols = np.array([tables['role_to_col'].get(role, -1) for role in picks], dtype=np.int64)
+        known = role_cols >= 0
+        set_feature_cols(vector, tables['pick_cols'][rows[known], role_cols[known]], sign)
+        set_feature_cols(vector, tables['tag_cols'][side], team_tag_counts(rows, tables))
+    set_feature_cols(vector, tables['ban_cols'][hero_rows(blue_bans, tables)], 1)
+    set_feature_cols(vector, tables['ban_cols'][hero_rows(red_bans, tables)], -1)
     if blue_team in all_teams and blue_team in feature_to_idx: vector[feature_to_idx[blue_team]] = 1
     if red_team in all_teams and red_team in feature_to_idx: vector[feature_to_idx[red_team]] = -1
+    return vector
+
+def predict_draft_outcome(blue_picks, red_picks, blue_bans, red_bans, blue_team, red_team, model_assets, HERO_PROFILES):
+    feature_to_idx, all_teams = model_assets['feature_to_idx'], model_assets['all_teams']
+    vector = build_draft_vector(blue_picks, red_picks, blue_bans, red_bans, blue_team, red_team, model_assets, HERO_PROFILES)
     vector_draft_only = vector.copy()
     if blue_team in all_teams and blue_team in feature_to_idx: vector_draft_only[feature_to_idx[blue_team]] = 0
     if red_team in all_teams and red_team in feature_to_idx: vector_draft_only[feature_to_idx[red_team]] = 0
-    prob_overall = model.predict_proba(vector.reshape(1, -1))[0][1]
-    prob_draft_only = model.predict_proba(vector_draft_only.reshape(1, -1))[0][1]
-    return prob_overall, prob_draft_only
+    # Both variants are scored in a single call
+    probs = predict_win_probs(model_assets, np.vstack([vector, vector_draft_only]))
+    return probs[0], probs[1]
+
+def score_candidate_picks(blue_picks, red_picks, blue_bans, red_bans, blue_team, red_team, candidates, side, model_assets, HERO_PROFILES):
+    """
+    Blue's win probability for each candidate hero placed into `side`'s first open role.
+    The base vector is built once; each candidate row only gets its pick and its team's tag counts
+    changed (see candidate_pick_matrix), and the whole matrix is scored with one batched model call.
+    Returns None if `side` has no open role.
+    """
+    team_picks = blue_picks if side == 'blue' else red_picks
+    open_roles = [r for r in ROLES if r not in team_picks]
+    if not open_roles or not candidates:
+        return None
+    tables = get_tag_tables(model_assets, HERO_PROFILES)
+
+    base = build_draft_vector(blue_picks, red_picks, blue_bans, red_bans, blue_team, red_team, model_assets, HERO_PROFILES)
+    team_rows = hero_rows(team_picks.values(), tables)
+    X = candidate_pick_matrix(base[np.newaxis, :], team_rows[np.newaxis, :], hero_rows(candidates, tables), tables['role_to_col'][open_roles[0]], side, tables)
+    return predict_win_probs(model_assets, X)
+
+def candidate_pick_matrix(base, team_rows, cand_rows, role_col, side, tables):
+    """
+    Feature rows for every (draft, candidate) pair: row g * len(cand_rows) + c is draft g with candidate c
+    picked by `side` in role column `role_col`. `base` holds one feature vector per draft and `team_rows`
+    the hero rows already picked by `side` in each draft (padded with the unknown row).
+    """
+    n_drafts, n_cands = len(base), len(cand_rows)
+    X = np.repeat(base, n_cands, axis=0)
+    sign = 1 if side == 'blue' else -1
+
+    # Pick feature of each candidate in the given role
+    pick_cols = np.tile(tables['pick_cols'][cand_rows, role_col], n_drafts)
+    has_pick = pick_cols >= 0
+    X[np.flatnonzero(has_pick), pick_cols[has_pick]] = sign
+
+    # Team tag counts with each candidate added, choosing the build table per row
+    team_rows = np.asarray(team_rows, dtype=np.int64).reshape(n_drafts, -1)
+    has_frontline = tables['frontline'][team_rows].any(axis=1)[:, np.newaxis] | tables['frontline'][cand_rows][np.newaxis, :]
+    team_default = tables['default_tags'][team_rows].sum(axis=1)[:, np.newaxis, :]
+    team_fallback = tables['no_frontline_tags'][team_rows].sum(axis=1)[:, np.newaxis, :]
+    counts = np.where(
+        has_frontline[:, :, np.newaxis],
+        team_default + tables['default_tags'][cand_rows][np.newaxis, :, :],
+        team_fallback + tables['no_frontline_tags'][cand_rows][np.newaxis, :, :],
+    ).reshape(n_drafts * n_cands, -1)
+    tag_cols = tables['tag_cols'][side]
+    X[:, tag_cols[tag_cols >= 0]] = counts[:, tag_cols >= 0]
+    return X
+
+# --- CACHED PREDICTIONS ---
+def draft_state_key(blue_picks, red_picks, blue_bans, red_bans, blue_team, red_team):
+    """Canonical, hashable form of a draft state: picks sorted by role, bans sorted, plus both teams."""
+    return (
+        tuple(sorted(blue_picks.items())), tuple(sorted(red_picks.items())),
+        tuple(sorted(blue_bans)), tuple(sorted(red_bans)),
+        blue_team, red_team,
+    )
+
+@st.cache_data(max_entries=4096, show_spinner=False)
+def _cached_draft_outcome(state_key, model_version, _model_assets, _hero_profiles):
+    blue_p, red_p, blue_b, red_b, blue_t, red_t = state_key
+    return predict_draft_outcome(dict(blue_p), dict(red_p), list(blue_b), list(red_b), blue_t, red_t, _model_assets, _hero_profiles)
+
+@st.cache_data(max_entries=1024, show_spinner=False)
+def _cached_ai_suggestions(state_key, available_heroes, is_blue_turn, phase, model_version, _model_assets, _hero_profiles):
+    your_p, enemy_p, your_b, enemy_b, your_t, enemy_t = state_key
+    return get_ai_suggestions(list(available_heroes), dict(your_p), dict(enemy_p), list(your_b), list(enemy_b), your_t, enemy_t, _model_assets, _hero_profiles, is_blue_turn, phase)
+
+def cached_predict_draft_outcome(blue_picks, red_picks, blue_bans, red_bans, blue_team, red_team, model_assets, HERO_PROFILES):
+    """
+    predict_draft_outcome behind an LRU cache shared by all sessions.
+    Keyed on the canonical draft state and the model version, so reruns and replayed drafts are free.
+    """
+    state_key = draft_state_key(blue_picks, red_picks, blue_bans, red_bans, blue_team, red_team)
+    return _cached_draft_outcome(state_key, model_assets.get('model_version'), model_assets, HERO_PROFILES)
+
+def cached_ai_suggestions(available_heroes, your_picks, enemy_picks, your_bans, enemy_bans, your_team, enemy_team, model_assets, HERO_PROFILES, is_blue_turn, phase):
+    """get_ai_suggestions behind the same shared LRU cache as cached_predict_draft_outcome."""
+    state_key = draft_state_key(your_picks, enemy_picks, your_bans, enemy_bans, your_team, enemy_team)
+    return _cached_ai_suggestions(state_key, tuple(sorted(available_heroes)), is_blue_turn, phase, model_assets.get('model_version'), model_assets, HERO_PROFILES)
 
 def generate_prediction_explanation(blue_picks, red_picks, HERO_PROFILES, HERO_DAMAGE_TYPE):
     def analyze_team(team_picks, damage_types):
@@ -165,47 +484,41 @@ def generate_prediction_explanation(blue_picks, red_picks, HERO_PROFILES, HERO_D
     red_analysis = analyze_team(red_picks, HERO_DAMAGE_TYPE)
     return {'blue': blue_analysis, 'red': red_analysis}
 
+def score_candidate_bans(blue_picks, red_picks, blue_bans, red_bans, blue_team, red_team, candidates, side, model_assets, HERO_PROFILES):
+    """Blue's win probability for each candidate hero added to `side`'s bans, in one batched model call."""
+    if not candidates:
+        return None
+    sign = 1 if side == 'blue' else -1
+    tables = get_tag_tables(model_assets, HERO_PROFILES)
+    base = build_draft_vector(blue_picks, red_picks, blue_bans, red_bans, blue_team, red_team, model_assets, HERO_PROFILES)
+    X = np.repeat(base[np.newaxis, :], len(candidates), axis=0)
+    ban_cols = tables['ban_cols'][hero_rows(candidates, tables)]
+    has_ban = ban_cols >= 0
+    X[np.flatnonzero(has_ban), ban_cols[has_ban]] = sign
+    return predict_win_probs(model_assets, X)
+
 def get_ai_suggestions(available_heroes, your_picks, enemy_picks, your_bans, enemy_bans, your_team, enemy_team, model_assets, HERO_PROFILES, is_blue_turn, phase):
-    suggestions = []
+    """
+    Ranks every available hero for the team on turn. "Your" arguments belong to that team.
+    PICK scores are the team's win probability with the hero added; BAN scores are the threat,
+    i.e. the opponent's win probability if they picked the hero. All candidates are scored in one batch.
+    """
     blue_p, red_p = (your_picks, enemy_picks) if is_blue_turn else (enemy_picks, your_picks)
     blue_b, red_b = (your_bans, enemy_bans) if is_blue_turn else (enemy_bans, your_bans)
     blue_t, red_t = (your_team, enemy_team) if is_blue_turn else (enemy_team, your_team)
+    candidates = list(available_heroes)
+    your_side, enemy_side = ('blue', 'red') if is_blue_turn else ('red', 'blue')
     if phase == "BAN":
-        for hero in available_heroes:
-            hypothetical_enemy_picks = enemy_picks.copy()
-            open_roles = [r for r in ["EXP", "Jungle", "Mid", "Gold", "Roam"] if r not in hypothetical_enemy_picks]
-            if not open_roles: continue
-            hypothetical_enemy_picks[open_roles[0]] = hero
-            win_prob_blue, _ = predict_draft_outcome(blue_p, hypothetical_enemy_picks, blue_b, red_b, blue_t, red_t, model_assets, HERO_PROFILES)
-            threat_score = 1 - win_prob_blue if is_blue_turn else win_prob_blue
-            suggestions.append((hero, threat_score))
+        win_prob_blue = score_candidate_picks(blue_p, red_p, blue_b, red_b, blue_t, red_t, candidates, enemy_side, model_assets, HERO_PROFILES)
     elif phase == "PICK":
-        open_roles = [role for role in ["EXP", "Jungle", "Mid", "Gold", "Roam"] if role not in your_picks]
-        if not open_roles: return []
-        for hero in available_heroes:
-            hypothetical_your_picks = your_picks.copy()
-            hypothetical_your_picks[open_roles[0]] = hero
-            blue_p_sim, red_p_sim = (hypothetical_your_picks, red_p) if is_blue_turn else (blue_p, hypothetical_your_picks)
-            win_prob_blue, _ = predict_draft_outcome(blue_p_sim, red_p_sim, blue_b, red_b, blue_t, red_t, model_assets, HERO_PROFILES)
-            pick_score = win_prob_blue if is_blue_turn else (1 - win_prob_blue)
-            suggestions.append((hero, pick_score))
-    return sorted(suggestions, key=lambda x: x[1], reverse=True)
-
-### --- ADDED --- ###
-def calculate_series_score_probs(p_win_game, series_format=3):
-    """Calculates the probability of each score in a Best-of-X series."""
-    if p_win_game is None or not (0 <= p_win_game <= 1): return {}
-    p, q = p_win_game, 1 - p
-    if series_format == 2: return {"2-0": p**2, "1-1": 2 * p * q, "0-2": q**2}
-    wins_needed = math.ceil((series_format + 1) / 2)
-    results = {}
-    for losses in range(wins_needed):
-        games_played = wins_needed + losses
-        if games_played > series_format: continue
-        combinations = math.comb(games_played - 1, wins_needed - 1)
-        prob_a = combinations * (p ** wins_needed) * (q ** losses)
-        results[f"{wins_needed}-{losses}"] = prob_a
-        prob_b = combinations * (q ** wins_needed) * (p ** losses)
-        results[f"{losses}-{wins_needed}"] = prob_b
-    return dict(sorted(results.items(), key=lambda item: item[1], reverse=True))
-### --- END ADDED --- ###
+        win_prob_blue = score_candidate_picks(blue_p, red_p, blue_b, red_b, blue_t, red_t, candidates, your_side, model_assets, HERO_PROFILES)
+    else:
+        return []
+    if win_prob_blue is None:
+        return []
+    if phase == "BAN":
+        scores = 1 - win_prob_blue if is_blue_turn else win_prob_blue
+    else:
+        scores = win_prob_blue if is_blue_turn else 1 - win_prob_blue
+    return sorted(zip(candidates, scores.tolist()), key=lambda x: x[1], reverse=True)
+
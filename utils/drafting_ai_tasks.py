@@ -3,7 +3,9 @@ import os
 import cloudinary
 import cloudinary.uploader
 from celery_config import app
-from utils.drafting_ai import train_and_save_prediction_model
+import utils.task_status  # noqa: F401 - publishes task completion events to waiting pages
+from utils.drafting_ai import train_model_from_game_table, update_model_from_game_table
+from utils.match_store import build_game_table, load_game_table
 from utils.hero_data import HERO_PROFILES
 
 # Configure Cloudinary using environment variables/secrets
@@ -15,21 +17,45 @@ cloudinary.config(
 )
 
 @app.task(bind=True)
-def train_ai_model_task(self, matches_data):
+def train_ai_model_task(self, dataset, incremental=False, tune=False):
     """
     A Celery task to train the AI model and upload the results to cloud storage.
+    `dataset` is a reference, {'tournaments': [...], 'data_version': ...}; the worker loads the
+    game table from the match store itself. A plain list of matches is still accepted.
+    With incremental=True the worker's existing model is only boosted further on games it has not seen;
+    with tune=True a full retrain first runs the cross-validated hyperparameter search.
     """
     try:
         model_filename = "draft_predictor.json"
         assets_filename = "draft_assets.json"
+        report_filename = "draft_model_report.json"
 
-        # Step 1: Train the model and save files locally (on the worker)
-        feedback = train_and_save_prediction_model(
-            matches=matches_data,
-            hero_profiles=HERO_PROFILES,
-            model_filename=model_filename,
-            assets_filename=assets_filename
-        )
+        # Step 1: Load the match data and train the model locally (on the worker)
+        self.update_state(state='PROGRESS', meta={'status': 'Loading match data...'})
+        if isinstance(dataset, dict):
+            game_table = load_game_table(dataset['tournaments'], dataset['data_version'])
+        else:
+            game_table = build_game_table(dataset)
+        if incremental:
+            feedback = update_model_from_game_table(
+                game_table=game_table,
+                hero_profiles=HERO_PROFILES,
+                model_filename=model_filename,
+                assets_filename=assets_filename
+            )
+        else:
+            if tune:
+                self.update_state(state='PROGRESS', meta={'status': 'Tuning hyperparameters...'})
+                if os.path.exists(report_filename):
+                    os.remove(report_filename)
+            feedback = train_model_from_game_table(
+                game_table=game_table,
+                hero_profiles=HERO_PROFILES,
+                model_filename=model_filename,
+                assets_filename=assets_filename,
+                tune=tune,
+                report_filename=report_filename
+            )
 
         # Step 2: Upload the generated files to Cloudinary
         self.update_state(state='PROGRESS', meta={'status': 'Uploading model files...'})
@@ -50,14 +76,26 @@ def train_ai_model_task(self, matches_data):
             overwrite=True
         )
 
+        download_urls = {
+            'model_url': model_upload_result.get('secure_url'),
+            'assets_url': assets_upload_result.get('secure_url')
+        }
+
+        # Upload the metrics report of a tuned run
+        if tune and not incremental and os.path.exists(report_filename):
+            report_upload_result = cloudinary.uploader.upload(
+                report_filename,
+                resource_type="raw",
+                public_id=report_filename,
+                overwrite=True
+            )
+            download_urls['report_url'] = report_upload_result.get('secure_url')
+
         # Step 3: Return the public URLs for downloading
         return {
             'status': 'Complete!', 
             'result': feedback,
-            'download_urls': {
-                'model_url': model_upload_result.get('secure_url'),
-                'assets_url': assets_upload_result.get('secure_url')
-            }
+            'download_urls': download_urls
         }
     except Exception as e:
         self.update_state(state='FAILURE', meta={'exc_type': type(e).__name__, 'exc_message': str(e)})
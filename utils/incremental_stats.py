@@ -0,0 +1,236 @@
+import json
+import hashlib
+import pandas as pd
+from collections import defaultdict, Counter
+
+def get_match_id(match):
+    """Returns a stable identifier for a match, preferring Liquipedia's match2id."""
+    match_id = match.get("match2id")
+    if match_id:
+        return str(match_id)
+    teams = [opp.get("name", "") for opp in match.get("match2opponents", [])]
+    return f"{match.get('pagename', '')}|{match.get('date', '')}|{'|'.join(teams)}"
+
+def get_match_fingerprint(match):
+    """
+    Hashes the parts of a match that statistics or derived caches depend on (result, teams, games,
+    schedule and stage), so corrections, reschedules and stage moves can be detected.
+    """
+    payload = {
+        "winner": match.get("winner"),
+        "teams": [opp.get("name", "") for opp in match.get("match2opponents", [])],
+        "games": match.get("match2games", []),
+        "date": match.get("date"),
+        "section": match.get("section"),
+        "pagename": match.get("pagename"),
+    }
+    return hashlib.md5(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def compute_match_delta(match):
+    """
+    Computes the counter contributions of a single match.
+    Only games with a recorded winner and two sides are counted.
+    """
+    delta = {
+        "total_games": 0,
+        "heroes": defaultdict(Counter),
+        "counters": defaultdict(Counter),
+        "hero_teams": defaultdict(Counter),
+    }
+    teams_names = [opp.get("name", "").strip() for opp in match.get("match2opponents", [])]
+
+    for game in match.get("match2games", []):
+        winner = str(game.get("winner", ""))
+        if not winner.isdigit():
+            continue
+        delta["total_games"] += 1
+
+        opponents = game.get("opponents", [])
+        if len(opponents) < 2:
+            continue
+
+        extradata = game.get("extradata", {})
+        sides = [extradata.get("team1side", "").lower(), extradata.get("team2side", "").lower()]
+        side_heroes = [
+            [p["champion"] for p in opp.get("players", []) if isinstance(p, dict) and "champion" in p]
+            for opp in opponents[:2]
+        ]
+
+        for idx, heroes in enumerate(side_heroes):
+            is_win = str(idx + 1) == winner
+            side = sides[idx]
+            team_name = teams_names[idx] if idx < len(teams_names) else ""
+            for hero in heroes:
+                stats = delta["heroes"][hero]
+                stats["games"] += 1
+                stats["wins"] += is_win
+                if side in ("blue", "red"):
+                    stats[f"{side}_picks"] += 1
+                    stats[f"{side}_wins"] += is_win
+                delta["hero_teams"][(hero, team_name)]["games"] += 1
+                delta["hero_teams"][(hero, team_name)]["wins"] += is_win
+            for ally in set(heroes):
+                for enemy in set(side_heroes[1 - idx]):
+                    delta["counters"][(ally, enemy)]["games"] += 1
+                    delta["counters"][(ally, enemy)]["wins"] += is_win
+
+        game_bans = set()
+        for i in range(1, 6):
+            for team_n in (1, 2):
+                ban = extradata.get(f"team{team_n}ban{i}")
+                if ban: game_bans.add(ban)
+        for hero in game_bans:
+            delta["heroes"][hero]["bans"] += 1
+
+    return delta
+
+
+def _entry_hash(match_id, fingerprint):
+    return int(hashlib.md5(f"{match_id}:{fingerprint}".encode("utf-8")).hexdigest()[:16], 16)
+
+
+class IncrementalStats:
+    """
+    Running hero, matchup and hero-by-team counters over a pool of matches.
+    Matches are tracked by id and grouped by source (e.g. tournament), so adding a new series or
+    correcting an existing one only applies the difference instead of recomputing every statistic,
+    and a source whose data has not changed since the last sync is skipped without reading it.
+    """
+
+    def __init__(self, matches=None):
+        self.total_games = 0
+        self.heroes = defaultdict(Counter)
+        self.counters = defaultdict(Counter)
+        self.hero_teams = defaultdict(Counter)
+        self.version = 0
+        self._deltas = {}
+        self._fingerprints = {}
+        self._sources = {}  # source -> (source version, match ids)
+        self._digest = 0  # XOR of per-match hashes, updated with each change
+        if matches:
+            self.sync(matches)
+
+    @property
+    def data_version(self):
+        """Content hash of the tracked match pool, usable as a cache key for derived data."""
+        return f"{self._digest:016x}"
+
+    def __contains__(self, match_id):
+        return match_id in self._deltas
+
+    def __len__(self):
+        return len(self._deltas)
+
+    def _apply(self, delta, sign):
+        self.total_games += sign * delta["total_games"]
+        for name in ("heroes", "counters", "hero_teams"):
+            target = getattr(self, name)
+            for key, counts in delta[name].items():
+                entry = target[key]
+                for field, value in counts.items():
+                    entry[field] += sign * value
+                # Drop keys that no longer carry any data so outputs match a fresh build
+                if not any(entry.values()):
+                    del target[key]
+
+    def upsert_match(self, match):
+        """Adds a new match or replaces a corrected one. Returns True if the counters changed."""
+        match_id = get_match_id(match)
+        fingerprint = get_match_fingerprint(match)
+        previous = self._fingerprints.get(match_id)
+        if previous == fingerprint:
+            return False
+        if match_id in self._deltas:
+            self._apply(self._deltas[match_id], -1)
+            self._digest ^= _entry_hash(match_id, previous)
+        delta = compute_match_delta(match)
+        self._apply(delta, 1)
+        self._deltas[match_id] = delta
+        self._fingerprints[match_id] = fingerprint
+        self._digest ^= _entry_hash(match_id, fingerprint)
+        self.version += 1
+        return True
+
+    def remove_match(self, match_id):
+        """Removes a previously added match. Returns True if it was being tracked."""
+        delta = self._deltas.pop(match_id, None)
+        if delta is None:
+            return False
+        self._digest ^= _entry_hash(match_id, self._fingerprints.pop(match_id))
+        self._apply(delta, -1)
+        self.version += 1
+        return True
+
+    def sync(self, matches, source=None, source_version=None):
+        """
+        Brings the counters in line with the matches of one source (all tracked matches if `source`
+        is None). If `source_version` (e.g. the modification time of the source's data file) is the
+        same as at the last sync, the source is skipped without looking at its matches. Otherwise
+        unchanged matches are skipped by fingerprint and matches gone from the source are removed.
+        Returns the number of changed matches.
+        """
+        known_version, known_ids = self._sources.get(source, (None, set(self._deltas) if source is None else set()))
+        if source_version is not None and source_version == known_version:
+            return 0
+        current_ids = set()
+        changed = 0
+        for match in matches:
+            if not isinstance(match, dict):
+                continue
+            current_ids.add(get_match_id(match))
+            changed += self.upsert_match(match)
+        for match_id in known_ids - current_ids:
+            changed += self.remove_match(match_id)
+        self._sources[source] = (source_version, current_ids)
+        return changed
+
+    def drop_source(self, source):
+        """Removes every match of a source (e.g. a tournament that is no longer selected)."""
+        _, match_ids = self._sources.pop(source, (None, set()))
+        return sum(1 for match_id in match_ids if self.remove_match(match_id))
+
+    @property
+    def sources(self):
+        return set(self._sources)
+
+    # --- Outputs ---
+    def hero_stats_df(self):
+        """Hero table for all teams, in the same layout as calculate_hero_stats_for_team."""
+        total_games = self.total_games
+        if total_games == 0:
+            return pd.DataFrame()
+        df_rows = []
+        for hero, stats in self.heroes.items():
+            games, bans, wins = stats["games"], stats["bans"], stats["wins"]
+            blue_picks, red_picks = stats["blue_picks"], stats["red_picks"]
+            blue_wins, red_wins = stats["blue_wins"], stats["red_wins"]
+            df_rows.append({
+                "Hero": hero, "Picks": games, "Bans": bans, "Wins": wins,
+                "Pick Rate (%)": round((games / total_games) * 100, 2),
+                "Ban Rate (%)": round((bans / total_games) * 100, 2),
+                "Presence (%)": round(((games + bans) / total_games) * 100, 2),
+                "Win Rate (%)": round((wins / games) * 100, 2) if games > 0 else 0,
+                "Blue Picks": blue_picks, "Blue Wins": blue_wins,
+                "Blue Win Rate (%)": round((blue_wins / blue_picks) * 100, 2) if blue_picks > 0 else 0,
+                "Red Picks": red_picks, "Red Wins": red_wins,
+                "Red Win Rate (%)": round((red_wins / red_picks) * 100, 2) if red_picks > 0 else 0,
+            })
+        return pd.DataFrame(df_rows)
+
+    def hero_drilldown_data(self):
+        """(heroes, {hero: {"per_team_df", "matchups_df"}}) for all picked heroes, as process_hero_drilldown_data."""
+        heroes = sorted(hero for hero, stats in self.heroes.items() if stats["games"])
+        team_rows, matchup_rows = defaultdict(list), defaultdict(list)
+        for (hero, team), s in self.hero_teams.items():
+            team_rows[hero].append({"Team": team, "Games": s["games"], "Wins": s["wins"],
+                                    "Win Rate (%)": f"{(s['wins'] / s['games'] * 100) if s['games'] > 0 else 0:.2f}%"})
+        for (ally, enemy), s in sorted(self.counters.items(), key=lambda item: item[1]["games"], reverse=True):
+            matchup_rows[ally].append({"Opposing Hero": enemy, "Times Faced": s["games"],
+                                       "Win Rate vs Them (%)": f"{(s['wins'] / s['games'] * 100) if s['games'] > 0 else 0:.2f}%"})
+        hero_stats_map = {}
+        for hero in heroes:
+            per_team_df = pd.DataFrame(team_rows[hero])
+            if not per_team_df.empty:
+                per_team_df = per_team_df.sort_values("Games", ascending=False)
+            hero_stats_map[hero] = {"per_team_df": per_team_df, "matchups_df": pd.DataFrame(matchup_rows[hero])}
+        return heroes, hero_stats_map
@@ -0,0 +1,177 @@
+import io
+import ssl
+import numpy as np
+import redis
+from utils.incremental_stats import get_match_id
+
+# Game tables are shared between the app and the Celery workers through Redis, keyed by data version
+STORE_KEY_PREFIX = "match_store"
+STORE_TTL_SECONDS = 7 * 24 * 3600
+
+# --- GAME TABLE ---
+def build_game_table(matches):
+    """
+    Flattens matches into a compact columnar table with one row per finished game that has a draft.
+    Hero and team names are dictionary-encoded; missing picks/bans are -1. Columns:
+    match_id, date, game_no (index within the series), team1, team2, winner (1/2), blue_team (the
+    team on the blue side, 1/2; team 1 if no side is recorded), picks and bans (games x 10, team 1
+    slots first; picks are in role order, not pick order), plus the 'heroes' and 'teams' vocabularies.
+    """
+    hero_codes, team_codes = {}, {}
+    def code(vocab, name):
+        if not name: return -1
+        return vocab.setdefault(name, len(vocab))
+
+    match_ids, dates, game_nos, team1, team2, winners, blue_teams, picks, bans = [], [], [], [], [], [], [], [], []
+    for match in matches:
+        if not isinstance(match, dict): continue
+        match_teams = [o.get('name') for o in match.get('match2opponents', [])]
+        if len(match_teams) != 2: continue
+        match_id = get_match_id(match)
+        for game_no, game in enumerate(match.get('match2games', [])):
+            extradata = game.get('extradata', {})
+            if len(game.get('opponents', [])) != 2 or game.get('winner') not in ['1', '2'] or not extradata: continue
+            match_ids.append(match_id)
+            dates.append(str(match.get('date') or ''))
+            game_nos.append(game_no)
+            team1.append(code(team_codes, match_teams[0]))
+            team2.append(code(team_codes, match_teams[1]))
+            winners.append(int(game['winner']))
+            blue_teams.append(2 if str(extradata.get('team1side', 'blue')).lower() == 'red' else 1)
+            picks.append([code(hero_codes, extradata.get(f'team{t}champion{i}')) for t in (1, 2) for i in range(1, 6)])
+            bans.append([code(hero_codes, extradata.get(f'team{t}ban{i}')) for t in (1, 2) for i in range(1, 6)])
+
+    return {
+        'match_id': np.array(match_ids, dtype=str),
+        'date': np.array(dates, dtype=str),
+        'game_no': np.array(game_nos, dtype=np.int16),
+        'team1': np.array(team1, dtype=np.int32),
+        'team2': np.array(team2, dtype=np.int32),
+        'winner': np.array(winners, dtype=np.int8),
+        'blue_team': np.array(blue_teams, dtype=np.int8),
+        'picks': np.array(picks, dtype=np.int16).reshape(-1, 10),
+        'bans': np.array(bans, dtype=np.int16).reshape(-1, 10),
+        'heroes': np.array(list(hero_codes), dtype=str),
+        'teams': np.array(list(team_codes), dtype=str),
+    }
+
+def game_keys(game_table):
+    """Stable per-game keys, "<match id>#<game number>"."""
+    return [f"{m}#{g}" for m, g in zip(game_table['match_id'].tolist(), game_table['game_no'].tolist())]
+
+def training_mark(game_table, mark=None):
+    """
+    Compact record of the games a model has been trained on: the latest match date in the table
+    (or in `mark`, if it is later) plus the keys of the games on that date, {'date': ..., 'games': [...]}.
+    """
+    if len(game_table['date']) == 0:
+        return mark
+    last_date = max(game_table['date'].tolist())
+    if mark is not None and mark['date'] > last_date:
+        return mark
+    keys = np.array(game_keys(game_table), dtype=str)
+    on_last_date = set(keys[game_table['date'] == last_date].tolist())
+    if mark is not None and mark['date'] == last_date:
+        on_last_date |= set(mark['games'])
+    return {'date': str(last_date), 'games': sorted(on_last_date)}
+
+def games_after_mark(game_table, mark):
+    """
+    Mask of the games not covered by a training mark: later matches, and new games (e.g. of a
+    running series) on the mark's date. Games added to matches before that date are treated as seen.
+    """
+    if mark is None:
+        return np.ones(len(game_table['date']), dtype=bool)
+    on_mark_date = game_table['date'] == mark['date']
+    seen = set(mark['games'])
+    unseen_on_date = np.array([key not in seen for key in game_keys(game_table)], dtype=bool)
+    return (game_table['date'] > mark['date']) | (on_mark_date & unseen_on_date)
+
+def select_games(game_table, mask):
+    """Returns the table restricted to the rows where `mask` is True; vocabularies are kept as is."""
+    mask = np.asarray(mask, dtype=bool)
+    return {k: (v if k in ('heroes', 'teams') else v[mask]) for k, v in game_table.items()}
+
+def orient_by_side(game_table):
+    """
+    Returns the table with the blue side in the team 1 columns and slots: games where team 2 was blue
+    get their teams, picks, bans and winner swapped. Tables without 'blue_team' are returned as is.
+    """
+    if 'blue_team' not in game_table:
+        return game_table
+    swap = game_table['blue_team'] == 2
+    def swap_halves(slots):
+        return np.where(swap[:, np.newaxis], np.roll(slots, 5, axis=1), slots)
+    return {
+        **game_table,
+        'team1': np.where(swap, game_table['team2'], game_table['team1']),
+        'team2': np.where(swap, game_table['team1'], game_table['team2']),
+        'winner': np.where(swap, 3 - game_table['winner'], game_table['winner']).astype(game_table['winner'].dtype),
+        'blue_team': np.ones_like(game_table['blue_team']),
+        'picks': swap_halves(game_table['picks']),
+        'bans': swap_halves(game_table['bans']),
+    }
+
+def drafted_heroes(game_table):
+    """Names of all heroes picked at least once in the table."""
+    used = np.unique(game_table['picks'])
+    return [game_table['heroes'][c] for c in used.tolist() if c >= 0]
+
+def table_teams(game_table):
+    """Names of all teams that played at least one game in the table (games with an unnamed opponent have code -1)."""
+    used = np.unique(np.concatenate([game_table['team1'], game_table['team2']]))
+    return list(dict.fromkeys(game_table['teams'][c] for c in used.tolist() if c >= 0))
+
+def serialize_game_table(game_table):
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **game_table)
+    return buffer.getvalue()
+
+def deserialize_game_table(payload):
+    with np.load(io.BytesIO(payload), allow_pickle=False) as data:
+        return {k: data[k] for k in data.files}
+
+# --- SHARED STORE ---
+def get_store_client():
+    """Redis client for the match store, using the same server and SSL settings as Celery."""
+    from celery_config import REDIS_URL
+    if REDIS_URL.startswith("rediss://"):
+        return redis.Redis.from_url(REDIS_URL, ssl_cert_reqs=ssl.CERT_NONE)
+    return redis.Redis.from_url(REDIS_URL)
+
+def store_key(data_version):
+    return f"{STORE_KEY_PREFIX}:{data_version}"
+
+def publish_game_table(data_version, matches, client=None):
+    """Writes the game table for `matches` under `data_version` unless it is already stored. Returns the key."""
+    if client is None:
+        client = get_store_client()
+    key = store_key(data_version)
+    if client.exists(key):
+        client.expire(key, STORE_TTL_SECONDS)
+    else:
+        client.set(key, serialize_game_table(build_game_table(matches)), ex=STORE_TTL_SECONDS)
+    return key
+
+def fetch_game_table(data_version, client=None):
+    """Reads a stored game table, or returns None if it is missing or expired."""
+    if client is None:
+        client = get_store_client()
+    payload = client.get(store_key(data_version))
+    return deserialize_game_table(payload) if payload else None
+
+def load_game_table(tournaments, data_version, client=None):
+    """
+    Worker-side loader for a dataset reference. Returns the stored table for `data_version`.
+    The worker does not reload the tournaments itself: their current data may differ from the
+    version the app published, so a missing table is an error and the app has to publish again.
+    """
+    if client is None:
+        client = get_store_client()
+    game_table = fetch_game_table(data_version, client)
+    if game_table is None:
+        raise LookupError(
+            f"No stored game table for data version {data_version} ({', '.join(tournaments)}); "
+            "it has expired or was never published. Reload the data in the app and start the task again."
+        )
+    return game_table
@@ -0,0 +1,123 @@
+import itertools
+import numpy as np
+import xgboost as xgb
+from joblib import Parallel, delayed
+from sklearn.metrics import log_loss, roc_auc_score, brier_score_loss
+
+# --- SEARCH SPACE ---
+BASE_MODEL_PARAMS = {'eval_metric': 'logloss', 'colsample_bytree': 0.8}
+DEFAULT_MODEL_PARAMS = {'n_estimators': 200, 'max_depth': 6, 'learning_rate': 0.05}
+DEFAULT_PARAM_GRID = {
+    'max_depth': [3, 4, 6],
+    'learning_rate': [0.03, 0.05, 0.1],
+    'min_child_weight': [1, 5],
+}
+
+# --- FOLDS & METRICS ---
+def time_ordered_folds(game_table, n_folds=4, min_train_fraction=0.4, stopping_fraction=0.15):
+    """
+    Expanding-window splits over the games of a game table in chronological order.
+    Fold k trains on everything before its validation block; the last `stopping_fraction` of that
+    training window is held out for early stopping, so the scored block never picks the round count.
+    Edges are moved to series boundaries so games of one series never end up on two sides.
+    Returns [(fit_idx, stopping_idx, valid_idx)].
+    """
+    n_games = len(game_table['winner'])
+    dates = game_table['date'] if 'date' in game_table else np.full(n_games, '')
+    order = np.lexsort((game_table['game_no'], game_table['match_id'], dates))
+    ids = game_table['match_id'][order]
+    series_starts = np.append(np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]]), n_games)
+
+    def series_edge(position):
+        return int(series_starts[np.searchsorted(series_starts, position)])
+
+    fractions = np.linspace(min_train_fraction, 1.0, n_folds + 1)
+    edges = [series_edge(f * n_games) for f in fractions[:-1]] + [n_games]
+    folds = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        if start == 0 or end <= start:
+            continue
+        cut = series_edge((1 - stopping_fraction) * start)
+        if cut >= start:
+            # Keep at least the last series before the validation block for early stopping
+            cut = int(series_starts[np.searchsorted(series_starts, start) - 1])
+        if cut > 0:
+            folds.append((order[:cut], order[cut:start], order[start:end]))
+    return folds
+
+def expected_calibration_error(y_true, y_prob, n_bins=10):
+    """Mean gap between predicted and observed win rate, weighted by the share of games in each probability bin."""
+    bins = np.minimum((np.asarray(y_prob) * n_bins).astype(int), n_bins - 1)
+    ece = 0.0
+    for b in np.unique(bins):
+        in_bin = bins == b
+        ece += in_bin.mean() * abs(y_prob[in_bin].mean() - y_true[in_bin].mean())
+    return float(ece)
+
+def classification_metrics(y_true, y_prob):
+    y_true, y_prob = np.asarray(y_true), np.asarray(y_prob, dtype=float)
+    return {
+        'games': int(len(y_true)),
+        'log_loss': float(log_loss(y_true, y_prob, labels=[0, 1])),
+        'auc': float(roc_auc_score(y_true, y_prob)) if len(np.unique(y_true)) == 2 else None,
+        'brier': float(brier_score_loss(y_true, y_prob)),
+        'ece': expected_calibration_error(y_true, y_prob),
+    }
+
+# --- SEARCH ---
+def _evaluate_fold(params, X, y, fold, max_rounds, early_stopping_rounds):
+    fit_idx, stopping_idx, valid_idx = fold
+    params = {'n_estimators': max_rounds, **params}
+    if early_stopping_rounds:
+        model = xgb.XGBClassifier(**BASE_MODEL_PARAMS, **params, early_stopping_rounds=early_stopping_rounds, n_jobs=1)
+        model.fit(X[fit_idx], y[fit_idx], eval_set=[(X[stopping_idx], y[stopping_idx])], verbose=False)
+    else:
+        # Without early stopping the held-out slice is just part of the training window
+        train_idx = np.concatenate([fit_idx, stopping_idx])
+        model = xgb.XGBClassifier(**BASE_MODEL_PARAMS, **params, n_jobs=1)
+        model.fit(X[train_idx], y[train_idx], verbose=False)
+    # predict_proba uses the best iteration found by early stopping
+    metrics = classification_metrics(y[valid_idx], model.predict_proba(X[valid_idx])[:, 1])
+    metrics['best_rounds'] = int(model.best_iteration) + 1 if early_stopping_rounds else params['n_estimators']
+    return metrics
+
+def _summarize(params, fold_metrics):
+    aucs = [m['auc'] for m in fold_metrics if m['auc'] is not None]
+    return {
+        'params': params,
+        'mean_log_loss': float(np.mean([m['log_loss'] for m in fold_metrics])),
+        'mean_auc': float(np.mean(aucs)) if aucs else None,
+        'mean_ece': float(np.mean([m['ece'] for m in fold_metrics])),
+        'rounds': int(round(np.mean([m['best_rounds'] for m in fold_metrics]))),
+        'folds': fold_metrics,
+    }
+
+def tune_model_params(X, y, folds, param_grid=None, max_rounds=1000, early_stopping_rounds=30, n_jobs=-1, baseline_params=DEFAULT_MODEL_PARAMS):
+    """
+    Grid search over `param_grid` on time-ordered folds from time_ordered_folds, early stopping on
+    each fold's held-out stopping slice. Every (candidate, fold) pair is fitted in parallel across
+    cores. Candidates are ranked by mean validation log-loss; the number of boosting rounds for the
+    final model is the mean best round of the winning candidate. `baseline_params` are scored on
+    the same folds, without early stopping, for comparison. Returns (best_params, report).
+    """
+    param_grid = param_grid or DEFAULT_PARAM_GRID
+    names = sorted(param_grid)
+    candidates = [dict(zip(names, values)) for values in itertools.product(*(param_grid[n] for n in names))]
+    jobs = [(c, f, early_stopping_rounds) for c in range(len(candidates)) for f in range(len(folds))]
+    if baseline_params:
+        candidates.append(dict(baseline_params))
+        jobs += [(len(candidates) - 1, f, None) for f in range(len(folds))]
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_evaluate_fold)(candidates[c], X, y, folds[f], max_rounds, stopping)
+        for c, f, stopping in jobs
+    )
+
+    per_candidate = [[] for _ in candidates]
+    for (c, _, _), metrics in zip(jobs, results):
+        per_candidate[c].append(metrics)
+    baseline = _summarize(candidates.pop(), per_candidate.pop()) if baseline_params else None
+    summary = sorted((_summarize(p, m) for p, m in zip(candidates, per_candidate)), key=lambda s: s['mean_log_loss'])
+    best = summary[0]
+    best_params = {**best['params'], 'n_estimators': best['rounds']}
+    report = {'best_params': best_params, 'n_folds': len(folds), 'baseline': baseline, 'candidates': summary}
+    return best_params, report
@@ -1,7 +1,8 @@
 import streamlit as st
 from utils.tournaments import ALL_TOURNAMENTS
-from utils.api_handler import load_tournament_data, clear_cache_for_live_tournaments
+from utils.api_handler import load_tournament_data, get_tournament_data_version, clear_cache_for_live_tournaments
 from utils.data_processing import parse_matches
+from utils.incremental_stats import IncrementalStats
 import os
 import base64
 from collections import defaultdict
@@ -145,16 +146,31 @@ def build_sidebar():
                 st.session_state['parsed_matches'] = None
                 st.session_state['selected_tournaments'] = selected_tournaments
                 
-                all_matches_raw = []
+                # Stats are kept per tournament: unchanged data files are skipped and only the
+                # changed matches of a reloaded tournament (e.g. a live refresh) are applied
+                match_stats = st.session_state.get('match_stats')
+                if match_stats is None:
+                    match_stats = IncrementalStats()
+                for name in match_stats.sources - set(selected_tournaments):
+                    match_stats.drop_source(name)
+
+                all_matches_raw, parsed_matches = [], []
                 with st.spinner("Loading tournament data..."):
                     for name in selected_tournaments:
                         matches = load_tournament_data(name)
                         if matches:
                             all_matches_raw.extend(matches)
+                            parsed = parse_matches(matches)
+                            parsed_matches.extend(parsed)
+                            match_stats.sync(parsed, source=name, source_version=get_tournament_data_version(name))
+                        else:
+                            match_stats.drop_source(name)
                 
                 if all_matches_raw:
                     st.session_state['pooled_matches'] = all_matches_raw
-                    st.session_state['parsed_matches'] = parse_matches(all_matches_raw)
+                    st.session_state['parsed_matches'] = parsed_matches
+                    st.session_state['match_stats'] = match_stats
+                    st.session_state['data_version'] = match_stats.data_version
                     st.success(f"Loaded data for {len(selected_tournaments)} tournament(s).")
                 else:
                     st.error("Could not load any match data.")
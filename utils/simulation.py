@@ -1,12 +1,10 @@
 import pandas as pd
 import numpy as np
-import random
 import json
 import os
-from collections import defaultdict, Counter
+from collections import defaultdict
 import math
 from math import comb
-from itertools import groupby
 
 # --- [UNCHANGED CODE FROM get_permanent_config_path to build_week_blocks] ---
 def get_permanent_config_path(tournament_name):
@@ -29,7 +27,8 @@ def load_unified_config(tournament_name):
         "tournament_name": tournament_name,
         "format": None,
         "groups": {},
-        "brackets": []
+        "brackets": [],
+        "playoffs": {}
     }
 
     # 1. Load from permanent file first to establish a base
@@ -58,7 +57,9 @@ def load_unified_config(tournament_name):
     if os.path.exists(session_bracket_file):
         try:
             with open(session_bracket_file, 'r') as f:
-                config['brackets'] = json.load(f).get('brackets', [])
+                bracket_config = json.load(f)
+            config['brackets'] = bracket_config.get('brackets', [])
+            config['playoffs'] = bracket_config.get('playoffs', config['playoffs'])
         except (json.JSONDecodeError, IOError):
             pass
 
@@ -73,6 +74,8 @@ def load_unified_config(tournament_name):
             {"start": 7, "end": 9, "name": "Eliminated"}
         ]
 
+    config['playoffs'] = {**DEFAULT_PLAYOFFS, **(config.get('playoffs') or {})}
+
     return config
 
 # The old individual save/load functions are kept for session-specific operations
@@ -82,9 +85,9 @@ def get_bracket_cache_key(tournament_name):
     return f".playoff_config_{tournament_name.replace(' ', '_')}.json"
 
 def load_bracket_config(tournament_name):
-    """Load a saved bracket configuration."""
+    """Load a saved bracket configuration (the brackets and the playoff format)."""
     config = load_unified_config(tournament_name)
-    return {"brackets": config['brackets']}
+    return {"brackets": config['brackets'], "playoffs": config['playoffs']}
 
 
 def save_bracket_config(tournament_name, config):
@@ -159,24 +162,91 @@ def get_series_outcome_options(teamA, teamB, bestof):
         return [("Random", "random")]
     return options
 
+# --- RANDOM STREAMS ---
+def resolve_simulation_seed(seed=None):
+    """Returns `seed`, or fresh OS entropy if it is None, as an int that can be stored with the results."""
+    return int(np.random.SeedSequence(seed).entropy)
+
+def spawn_simulation_rngs(seed, n_streams):
+    """Independent numpy Generators derived from one seed (one per stream, chunk or worker)."""
+    return [np.random.default_rng(child) for child in np.random.SeedSequence(seed).spawn(n_streams)]
+
+def series_score_matrix(p_win, n_games):
+    """
+    Score distribution of a best-of-`n_games` series for every per-game win probability of team A in `p_win`.
+    Returns (scores, probs): scores is the list of (A games, B games) final scores, A wins first, and
+    probs has one row per fixture and one column per score. Odd formats end once a team reaches
+    the required wins; even formats (Bo2) play every game.
+    """
+    p = np.clip(np.asarray(p_win, dtype=float).reshape(-1, 1), 0, 1)
+    n_games = int(n_games)
+    if n_games % 2 == 0:
+        scores = [(a, n_games - a) for a in range(n_games, -1, -1)]
+        coeffs = [comb(n_games, a) for a, _ in scores]
+    else:
+        games_to_win = (n_games // 2) + 1
+        scores = [(games_to_win, lost) for lost in range(games_to_win)] + [(won, games_to_win) for won in range(games_to_win)]
+        coeffs = [comb(a + b - 1, games_to_win - 1) for a, b in scores]
+    a_games, b_games = np.array(scores).T
+    return scores, np.array(coeffs, dtype=float) * p ** a_games * (1 - p) ** b_games
+
 def calculate_series_score_probs(p_win, n_games):
+    """Score probabilities of one series as {"A-B": probability}; empty for an invalid probability."""
     if p_win is None or not (0 <= p_win <= 1): return {}
-    p_lose = 1 - p_win
-    games_to_win = (n_games // 2) + 1
-    probs = {}
-    for games_lost in range(games_to_win):
-        total_games_played = games_to_win + games_lost
-        if total_games_played > n_games: continue
-        combinations = comb(total_games_played - 1, games_to_win - 1)
-        probability = combinations * (p_win ** games_to_win) * (p_lose ** games_lost)
-        probs[f"{games_to_win}-{games_lost}"] = probability
-    for games_won in range(games_to_win):
-        total_games_played = games_to_win + games_won
-        if total_games_played > n_games: continue
-        combinations = comb(total_games_played - 1, games_to_win - 1)
-        probability = combinations * (p_lose ** games_to_win) * (p_win ** games_won)
-        probs[f"{games_won}-{games_to_win}"] = probability
-    return probs
+    scores, probs = series_score_matrix([p_win], n_games)
+    return {f"{a}-{b}": float(prob) for (a, b), prob in zip(scores, probs[0])}
+
+def series_outcome_code(a_games, b_games):
+    """Outcome code (as in get_series_outcome_options) of a final series score."""
+    if a_games == b_games: return "DRAW"
+    return f"A{a_games}{b_games}" if a_games > b_games else f"B{b_games}{a_games}"
+
+def series_outcome_table(unplayed_matches, forced_outcomes, game_win_probs=None):
+    """
+    Possible outcome codes and their probabilities for every unplayed fixture, one row per fixture
+    (padded with None / 0). Forced outcomes have probability 1. Fixtures with a per-game win
+    probability for team A in `game_win_probs` (keyed like `forced_outcomes`) follow
+    series_score_matrix, computed for all fixtures of a format at once; the rest are a uniform
+    choice over the possible scores.
+    """
+    game_win_probs = game_win_probs or {}
+    rows = [None] * len(unplayed_matches)
+    rated = defaultdict(list)
+    for i, (a, b, dt, bo) in enumerate(unplayed_matches):
+        code = forced_outcomes.get((a, b, dt), "random")
+        if code != "random":
+            rows[i] = ([code], [1.0])
+        elif (a, b, dt) in game_win_probs:
+            rated[int(bo)].append(i)
+        else:
+            options = [c for _, c in get_series_outcome_options(a, b, bo) if c != "random"]
+            rows[i] = (options, [1.0 / len(options)] * len(options)) if options else ([None], [1.0])
+
+    for bo, fixtures in rated.items():
+        key = lambda i: tuple(unplayed_matches[i][:3])
+        scores, probs = series_score_matrix([game_win_probs[key(i)] for i in fixtures], bo)
+        codes = [series_outcome_code(a, b) for a, b in scores]
+        for i, row in zip(fixtures, probs):
+            rows[i] = (codes, row.tolist())
+
+    width = max((len(codes) for codes, _ in rows), default=1)
+    codes = np.full((len(rows), width), None, dtype=object)
+    probs = np.zeros((len(rows), width))
+    for i, (row_codes, row_probs) in enumerate(rows):
+        codes[i, :len(row_codes)] = row_codes
+        probs[i, :len(row_probs)] = row_probs
+    return codes, probs
+
+def draw_series_outcomes(codes, probs, n_sim, rng=None):
+    """Samples an outcome code for every (simulation, fixture) pair at once; returns an (n_sim x fixtures) array."""
+    rng = rng if rng is not None else np.random.default_rng()
+    if codes.shape[0] == 0:
+        return np.empty((n_sim, 0), dtype=object)
+    cumulative = np.cumsum(probs, axis=1)
+    cumulative /= cumulative[:, -1:]
+    u = rng.random((n_sim, len(codes), 1))
+    picked = np.minimum((u >= cumulative[np.newaxis, :, :]).sum(axis=2), codes.shape[1] - 1)
+    return codes[np.arange(len(codes))[np.newaxis, :], picked]
 
 def build_week_blocks(dates_str):
     if not dates_str: return []
@@ -198,185 +268,415 @@ def build_week_blocks(dates_str):
 
 # --- MODIFIED: Tie-breaker functions now follow the new 4-step logic ---
 
-def resolve_ties_h2h_gamediff(tied_teams, all_matches_data):
+# --- STANDINGS ENGINE ---
+# Shared by the standings table and the simulators: results are tallied into per-team arrays and
+# ranked with one lexsort, optionally for a whole batch of simulated tables at once.
+RANKING_CHUNK_CELLS = 4_000_000  # H2H matrix cells per simulated batch
+
+def tally_results(n_teams, team_a, team_b, a_won, games_a, games_b, decided=None):
     """
-    Resolves ties between a group of teams based on the game difference
-    from their head-to-head matches.
+    Standings arrays from match results given as parallel arrays: team indices (-1 = not in the
+    table) and, per match, whether team A won and the games of each side. Result arrays may have
+    leading dimensions (e.g. one row per simulation), which are kept. Returns wins, losses,
+    games_won, games_lost and diff of shape (..., n_teams) and the H2H game difference matrix
+    h2h[..., i, j] of team i against team j.
     """
-    if len(tied_teams) <= 1:
-        return tied_teams
-
-    h2h_diff = Counter()
-    for match in all_matches_data:
-        teamA, teamB, _, sA, sB = match
-        if teamA in tied_teams and teamB in tied_teams:
-            h2h_diff[teamA] += sA - sB
-            h2h_diff[teamB] += sB - sA
-    
-    # Sort the group by their H2H game difference.
-    # A random element is added as a final, definitive tie-breaker if H2H diff is also identical.
-    return sorted(tied_teams, key=lambda t: (h2h_diff[t], random.random()), reverse=True)
-
+    team_a, team_b = np.asarray(team_a, dtype=np.int64), np.asarray(team_b, dtype=np.int64)
+    valid = (team_a >= 0) & (team_b >= 0)
+    team_a, team_b = team_a[valid], team_b[valid]
+    a_won = np.asarray(a_won, dtype=bool)[..., valid]
+    games_a = np.asarray(games_a, dtype=float)[..., valid]
+    games_b = np.asarray(games_b, dtype=float)[..., valid]
+    decided = np.ones(a_won.shape, dtype=bool) if decided is None else np.asarray(decided, dtype=bool)[..., valid]
+    games_a, games_b = games_a * decided, games_b * decided
+
+    n_matches = len(team_a)
+    onehot_a = np.zeros((n_matches, n_teams)); onehot_a[np.arange(n_matches), team_a] = 1
+    onehot_b = np.zeros((n_matches, n_teams)); onehot_b[np.arange(n_matches), team_b] = 1
+    pairs = np.zeros((n_matches, n_teams * n_teams))
+    np.add.at(pairs, (np.arange(n_matches), team_a * n_teams + team_b), 1)
+    np.add.at(pairs, (np.arange(n_matches), team_b * n_teams + team_a), -1)
+
+    a_wins, b_wins = (a_won & decided).astype(float), (~a_won & decided).astype(float)
+    as_int = lambda x: np.rint(x).astype(np.int64)
+    wins = as_int(a_wins @ onehot_a + b_wins @ onehot_b)
+    losses = as_int(b_wins @ onehot_a + a_wins @ onehot_b)
+    games_won = as_int(games_a @ onehot_a + games_b @ onehot_b)
+    games_lost = as_int(games_b @ onehot_a + games_a @ onehot_b)
+    h2h = as_int((games_a - games_b) @ pairs).reshape(*a_won.shape[:-1], n_teams, n_teams)
+    return {'wins': wins, 'losses': losses, 'games_won': games_won, 'games_lost': games_lost, 'diff': games_won - games_lost, 'h2h': h2h}
+
+def rank_standings(wins, diff, h2h, tie_break=None):
+    """
+    Team order (indices, best first) along the last axis: match wins, then game difference, then
+    the H2H game difference among the teams still level on both, then `tie_break` (higher first;
+    the input order if None). Works on one table or on a batch of tables with leading dimensions.
+    """
+    wins, diff = np.asarray(wins), np.asarray(diff)
+    level = (wins[..., :, np.newaxis] == wins[..., np.newaxis, :]) & (diff[..., :, np.newaxis] == diff[..., np.newaxis, :])
+    h2h_level = (np.asarray(h2h) * level).sum(axis=-1)
+    keys = [-h2h_level, -diff, -wins]
+    if tie_break is not None:
+        keys.insert(0, -np.asarray(tie_break))
+    return np.lexsort(keys, axis=-1)
 
 def build_standings_table(teams, matches):
-    standings_data = {t: {"Matches W": 0, "Matches L": 0, "Games W": 0, "Games L": 0} for t in teams}
-    all_matches_simple = []
-
+    """Standings of `teams` from finished matches, ranked like the simulators (ties in the input order)."""
+    teams = list(teams)
+    team_index = {t: i for i, t in enumerate(teams)}
+    results = []
     for m in matches:
         opps = m.get("match2opponents", [])
         if len(opps) < 2 or m.get("winner") not in ("1", "2"): continue
         tA, tB = opps[0].get('name'), opps[1].get('name')
-        if not tA or not tB or tA not in teams or tB not in teams: continue
-
-        winner, loser = (tA, tB) if m["winner"] == "1" else (tB, tA)
-        standings_data[winner]["Matches W"] += 1
-        standings_data[loser]["Matches L"] += 1
-        
-        sA, sB = 0, 0
-        for g in m.get("match2games", []):
-            if str(g.get('winner')) == '1': sA += 1
-            elif str(g.get('winner')) == '2': sB += 1
-        standings_data[tA]["Games W"] += sA; standings_data[tA]["Games L"] += sB
-        standings_data[tB]["Games W"] += sB; standings_data[tB]["Games L"] += sA
-        all_matches_simple.append((tA, tB, winner, sA, sB))
-
-    # Step 1 & 2: Sort by Series Wins, then Overall Game Diff
-    sorted_teams = sorted(teams, key=lambda t: (
-        standings_data[t]["Matches W"], 
-        standings_data[t]["Games W"] - standings_data[t]["Games L"]
-    ), reverse=True)
-    
-    final_ranked_order = []
-    # Group by the first two tie-breakers
-    for _, g in groupby(sorted_teams, key=lambda t: (standings_data[t]["Matches W"], standings_data[t]["Games W"] - standings_data[t]["Games L"])):
-        group = list(g)
-        if len(group) > 1:
-            # Step 3: If a tie remains, resolve it with H2H Game Diff
-            resolved_group = resolve_ties_h2h_gamediff(group, all_matches_simple)
-            final_ranked_order.extend(resolved_group)
-        else:
-            final_ranked_order.extend(group)
-
-    df = pd.DataFrame.from_dict(standings_data, orient='index')
-    df["Diff"] = df["Games W"] - df["Games L"]
-    df = df.reindex(final_ranked_order)
-    df["Matches (W-L)"] = df.apply(lambda r: f"{r['Matches W']}-{r['Matches L']}", axis=1)
-    df["Games (W-L)"] = df.apply(lambda r: f"{r['Games W']}-{r['Games L']}", axis=1)
-    df = df[["Matches (W-L)", "Games (W-L)", "Diff"]].reset_index().rename(columns={"index": "Team"})
-    df.insert(0, 'Rank', np.arange(1, len(df) + 1))
-    return df
-
-def run_monte_carlo_simulation(teams, played_matches, current_wins, current_diff, unplayed_matches, forced_outcomes, brackets, n_sim, team_to_track=None):
-    finish_counter = {t: {b["name"]: 0 for b in brackets} for t in teams}
-    best_rank, worst_rank = len(teams), 1
-
+        if tA not in team_index or tB not in team_index: continue
+        games = [str(g.get('winner')) for g in m.get("match2games", [])]
+        results.append((team_index[tA], team_index[tB], m["winner"] == "1", games.count('1'), games.count('2')))
+
+    team_a, team_b, a_won, games_a, games_b = (np.array(col) for col in zip(*results)) if results else ([],) * 5
+    table = tally_results(len(teams), team_a, team_b, a_won, games_a, games_b)
+    order = rank_standings(table['wins'], table['diff'], table['h2h'])
+    ranked = lambda key: pd.Series(table[key][order])
+    return pd.DataFrame({
+        'Rank': np.arange(1, len(teams) + 1),
+        'Team': pd.Series(teams, dtype=object)[order].to_numpy(),
+        'Matches (W-L)': ranked('wins').astype(str) + "-" + ranked('losses').astype(str),
+        'Games (W-L)': ranked('games_won').astype(str) + "-" + ranked('games_lost').astype(str),
+        'Diff': ranked('diff'),
+    })
+
+def simplify_played_matches(played_matches):
+    """
+    Reduces finished matches to (team A, team B, winner, A games, B games), all the simulators need from them.
+    Results that are already in that form (e.g. from TournamentState.simulation_inputs) are kept as they are.
+    """
     played_matches_simple = []
     for m in played_matches:
+        if isinstance(m, (list, tuple)):
+            played_matches_simple.append(tuple(m)); continue
         opps = m.get("match2opponents", [])
         if len(opps) < 2 or m.get("winner") not in ("1", "2"): continue
         tA, tB = opps[0].get('name'), opps[1].get('name')
         winner = tA if m["winner"] == "1" else tB
-        sA, sB = 0,0 
+        sA, sB = 0,0
         for g in m.get("match2games", []):
             if str(g.get('winner')) == '1': sA += 1
             elif str(g.get('winner')) == '2': sB += 1
         played_matches_simple.append((tA, tB, winner, sA, sB))
-
-    for _ in range(n_sim):
-        sim_wins, sim_diff = defaultdict(int, current_wins), defaultdict(int, current_diff)
-        simulated_matches = []
-        for a, b, dt, bo in unplayed_matches:
-            code = forced_outcomes.get((a, b, dt), "random")
-            outcome = random.choice([c for _, c in get_series_outcome_options(a, b, bo) if c != "random"]) if code == "random" else code
-            if not outcome or outcome == "DRAW": continue
-            winner, loser = (a, b) if outcome.startswith("A") else (b, a)
-            w, l = int(outcome[1]), int(outcome[2])
-            sim_wins[winner] += 1; sim_diff[winner] += w - l; sim_diff[loser] += l - w
-            simulated_matches.append((a, b, winner, w, l))
-        
-        all_sim_matches = played_matches_simple + simulated_matches
-
-        sorted_teams = sorted(teams, key=lambda t: (sim_wins.get(t, 0), sim_diff.get(t, 0)), reverse=True)
-        final_ranked_teams = []
-        for _, g in groupby(sorted_teams, key=lambda t: (sim_wins.get(t, 0), sim_diff.get(t, 0))):
-            group = list(g)
-            if len(group) > 1:
-                final_ranked_teams.extend(resolve_ties_h2h_gamediff(group, all_sim_matches))
+    return played_matches_simple
+
+def decode_series_outcomes(outcomes):
+    """(decided, A won, A games, B games) arrays for an array of outcome codes such as "A21", "B20", "DRAW" or None."""
+    outcomes = np.asarray(outcomes, dtype=object)
+    codes, inverse = np.unique(outcomes.astype(str), return_inverse=True)
+    table = np.zeros((len(codes), 4), dtype=np.int64)
+    for k, code in enumerate(codes):
+        if len(code) == 3 and code[0] in "AB" and code[1:].isdigit():
+            w, l = int(code[1]), int(code[2])
+            table[k] = (1, 1, w, l) if code[0] == "A" else (1, 0, l, w)
+    decoded = table[inverse.reshape(outcomes.shape)]
+    return decoded[..., 0].astype(bool), decoded[..., 1].astype(bool), decoded[..., 2], decoded[..., 3]
+
+def simulated_rankings(teams, played_matches, current_wins, current_diff, unplayed_matches, outcomes, tie_rng=None, groups=None):
+    """
+    1-based rank of every team (columns, ordered like `teams`) in every simulated season (rows of
+    `outcomes`, as drawn by draw_series_outcomes). Current wins and game differences plus the
+    simulated results are ranked with rank_standings, using the H2H record of played and simulated
+    matches; remaining ties are broken with `tie_rng`. `groups` (lists of team indices) are ranked
+    separately; by default all teams form one table. Simulations are ranked in batches.
+    """
+    tie_rng = tie_rng if tie_rng is not None else np.random.default_rng()
+    n_teams = len(teams)
+    team_index = {t: i for i, t in enumerate(teams)}
+    groups = [np.arange(n_teams)] if groups is None else [np.asarray(g, dtype=np.int64) for g in groups]
+    base_wins = np.array([current_wins.get(t, 0) for t in teams], dtype=np.int64)
+    base_diff = np.array([current_diff.get(t, 0) for t in teams], dtype=np.int64)
+
+    played = simplify_played_matches(played_matches)
+    base_h2h = tally_results(
+        n_teams, [team_index.get(p[0], -1) for p in played], [team_index.get(p[1], -1) for p in played],
+        [p[2] == p[0] for p in played], [p[3] for p in played], [p[4] for p in played]
+    )['h2h']
+
+    fixture_a = [team_index.get(f[0], -1) for f in unplayed_matches]
+    fixture_b = [team_index.get(f[1], -1) for f in unplayed_matches]
+    decided, a_won, games_a, games_b = decode_series_outcomes(outcomes)
+
+    n_sim = len(decided)
+    ranks = np.zeros((n_sim, n_teams), dtype=np.int64)
+    chunk = max(1, RANKING_CHUNK_CELLS // max(1, n_teams * n_teams))
+    for start in range(0, n_sim, chunk):
+        rows = slice(start, min(start + chunk, n_sim))
+        sim = tally_results(n_teams, fixture_a, fixture_b, a_won[rows], games_a[rows], games_b[rows], decided[rows])
+        wins, diff, h2h = base_wins + sim['wins'], base_diff + sim['diff'], base_h2h + sim['h2h']
+        tie_break = tie_rng.random(wins.shape)
+        for members in groups:
+            order = rank_standings(wins[:, members], diff[:, members], h2h[:, members][:, :, members], tie_break[:, members])
+            ranks[rows, members] = np.argsort(order, axis=-1) + 1
+    return ranks
+
+def bracket_of_rank(brackets, n_teams, max_rank=None):
+    """
+    Index of the bracket each 1-based rank finishes in (position 0 is unused): the first bracket that
+    covers the rank, or len(brackets) if none does. A bracket without an end runs to `n_teams`.
+    """
+    return np.array([len(brackets)] + [
+        next((k for k, b in enumerate(brackets) if b["start"] <= rank <= (b.get("end") or n_teams)), len(brackets))
+        for rank in range(1, max(n_teams, max_rank or 0) + 1)
+    ], dtype=np.int64)
+
+def bracket_finish_counts(ranks, brackets, n_teams):
+    """How often each team (rows) finished in each bracket (columns), from simulated ranks."""
+    lookup = bracket_of_rank(brackets, n_teams, int(ranks.max(initial=0)))
+    n_cols = len(brackets) + 1
+    cells = np.arange(ranks.shape[1]) * n_cols + lookup[ranks]
+    return np.bincount(cells.ravel(), minlength=ranks.shape[1] * n_cols).reshape(ranks.shape[1], n_cols)[:, :len(brackets)]
+
+# --- PLAYOFF BRACKETS ---
+# Teams in the qualifying brackets are seeded into a single- or double-elimination bracket, which is
+# played out for all simulations at once, one round (a vector of series per simulation) at a time.
+PLAYOFF_FORMATS = {"none": "No playoff bracket", "single": "Single elimination", "double": "Double elimination"}
+DEFAULT_PLAYOFFS = {"format": "none", "bestof": 5, "final_bestof": 7}
+
+def is_qualifying_bracket(name):
+    """Whether finishing in a bracket means qualifying (for the playoffs) rather than being eliminated."""
+    return not any(word in name.lower() for word in ("unqualified", "relegation", "eliminated"))
+
+def bracket_seed_order(size):
+    """Seed (0-based) in each slot of a bracket of `size` (a power of two): 1 meets `size` first and the top seeds meet last."""
+    order = [0]
+    while len(order) < size:
+        order = [s for seed in order for s in (seed, 2 * len(order) - 1 - seed)]
+    return np.array(order, dtype=np.int64)
+
+def playoff_seeds(ranks, brackets, groups=None):
+    """
+    Seeded playoff teams (columns, seed 1 first) in every simulation (rows): teams whose rank falls in a
+    qualifying bracket, by rank. With `groups` (lists of team indices), the group winners come first
+    (in group order), then the runners-up, and so on.
+    """
+    n_teams = ranks.shape[1]
+    groups = [np.arange(n_teams)] if groups is None else [np.asarray(g, dtype=np.int64) for g in groups]
+    lookup = bracket_of_rank(brackets, n_teams, int(ranks.max(initial=0)))
+    qualifying = [rank for rank in range(1, len(lookup)) if lookup[rank] < len(brackets) and is_qualifying_bracket(brackets[lookup[rank]]["name"])]
+    by_rank = [members[np.argsort(ranks[:, members], axis=1)] for members in groups]
+    columns = [ordered[:, rank - 1] for rank in qualifying for ordered in by_rank if rank <= ordered.shape[1]]
+    return np.stack(columns, axis=1) if columns else np.empty((len(ranks), 0), dtype=np.int64)
+
+def series_win_matrix(pair_game_probs, bestof):
+    """Probability that team i wins a best-of series against team j, from per-game win probabilities [i, j]."""
+    pair_game_probs = np.asarray(pair_game_probs, dtype=float)
+    scores, probs = series_score_matrix(pair_game_probs.ravel(), bestof)
+    a_wins = np.array([a > b for a, b in scores])
+    return probs[:, a_wins].sum(axis=1).reshape(pair_game_probs.shape)
+
+def simulate_playoff_bracket(seeds, n_teams, bracket_format="single", bestof=5, final_bestof=7, rng=None, pair_game_probs=None):
+    """
+    Plays out a seeded elimination bracket for every simulation (rows of `seeds`) and returns each team's
+    placement (n_sim x n_teams; 1 = champion, 0 = not in the playoffs). Teams eliminated in the same round
+    share the best placement of that round (e.g. 3 for both semi-final losers). Brackets are padded to a
+    power of two with byes for the top seeds. Double elimination drops upper-bracket losers into the lower
+    bracket and ends with a grand final without a reset. Series are even unless `pair_game_probs` gives
+    per-game win probabilities [i, j]; `final_bestof` applies to the (grand) final.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    n_sim, n_seeds = seeds.shape
+    places = np.zeros((n_sim, n_teams), dtype=np.int64)
+    if n_seeds < 2:
+        places[np.arange(n_sim)[:, np.newaxis], seeds] = 1
+        return places
+    series_probs = {}
+
+    def play(a, b, bo):
+        """Winners and losers of one series per column; a bye (-1) loses to anyone."""
+        if pair_game_probs is None:
+            p = 0.5
+        else:
+            if bo not in series_probs:
+                series_probs[bo] = series_win_matrix(pair_game_probs, bo)
+            p = series_probs[bo][np.maximum(a, 0), np.maximum(b, 0)]
+        a_wins = np.where(b < 0, True, np.where(a < 0, False, rng.random(a.shape) < p))
+        return np.where(a_wins, a, b), np.where(a_wins, b, a)
+
+    def eliminate(losers, *still_alive):
+        remaining = sum((alive >= 0).sum(axis=1) for alive in still_alive)
+        rows, cols = np.nonzero(losers >= 0)
+        places[rows, losers[rows, cols]] = remaining[rows] + 1
+
+    size = 1 << (n_seeds - 1).bit_length()
+    upper = np.full((n_sim, size), -1, dtype=np.int64)
+    upper[:, :n_seeds] = seeds
+    upper = upper[:, bracket_seed_order(size)]
+
+    if bracket_format == "double":
+        lower = None
+        while upper.shape[1] > 1:
+            upper, dropped = play(upper[:, 0::2], upper[:, 1::2], bestof)
+            if lower is None:
+                lower = dropped
             else:
-                final_ranked_teams.extend(group)
-
-        for pos, team in enumerate(final_ranked_teams):
-            rank = pos + 1
-            for bracket in brackets:
-                if bracket["start"] <= rank <= (bracket.get("end") or len(teams)):
-                    finish_counter[team][bracket["name"]] += 1; break
-            if team == team_to_track:
-                best_rank, worst_rank = min(best_rank, rank), max(worst_rank, rank)
-
-    rows = [{"Team": t, **{f"{b['name']} (%)": (finish_counter[t].get(b["name"], 0) / n_sim) * 100 for b in brackets}} for t in teams]
-    return {"probs_df": pd.DataFrame(rows).round(2), "best_rank": best_rank, "worst_rank": worst_rank}
-
-
-def run_monte_carlo_simulation_groups(groups, played_matches, current_wins, current_diff, unplayed_matches, forced_outcomes, brackets, n_sim, team_to_track=None):
+                # Dropped teams meet the lower bracket in reverse order, to avoid immediate rematches
+                lower, out = play(lower, dropped[:, ::-1], bestof)
+                eliminate(out, upper, lower)
+            if lower.shape[1] > 1:
+                lower, out = play(lower[:, 0::2], lower[:, 1::2], bestof)
+                eliminate(out, upper, lower)
+        upper = np.concatenate([upper, lower], axis=1)
+
+    while upper.shape[1] > 1:
+        upper, out = play(upper[:, 0::2], upper[:, 1::2], final_bestof if upper.shape[1] == 2 else bestof)
+        eliminate(out, upper)
+    places[np.arange(n_sim), upper[:, 0]] = 1
+    return places
+
+def _ordinal(n):
+    return f"{n}{'th' if 11 <= n % 100 <= 13 else {1: 'st', 2: 'nd', 3: 'rd'}.get(n % 10, 'th')}"
+
+def playoff_placement_frame(teams, places, team_columns=None):
+    """
+    Playoff odds per team: qualification, championship and each placement (shared placements as
+    ranges, e.g. "5th-6th"), in percent of simulations. `team_columns` adds columns such as the group.
+    """
+    n_sim = max(len(places), 1)
+    # The bracket is the same in every simulation, so each placement is shared by the same number of teams
+    shared = {1: 1, **{int(p): int(c) // n_sim for p, c in zip(*np.unique(places[places > 0], return_counts=True))}}
+    labels = {1: "Champion", 2: "Runner-up"}
+    rows = []
+    for i, team in enumerate(teams):
+        row = {"Team": team, **{k: v[i] for k, v in (team_columns or {}).items()}}
+        row["Playoffs (%)"] = (places[:, i] > 0).sum() / n_sim * 100
+        for p, width in shared.items():
+            label = labels.get(p, _ordinal(p)) if width <= 1 else f"{_ordinal(p)}-{_ordinal(p + width - 1)}"
+            row[f"{label} (%)"] = (places[:, i] == p).sum() / n_sim * 100
+        rows.append(row)
+    return pd.DataFrame(rows).round(2)
+
+def group_layout(groups):
+    """All teams of a group stage in group order, each team's group name and each group's team indices."""
     all_teams = [t for g in groups.values() for t in g]
-    finish_counter = {t: {b["name"]: 0 for b in brackets} for t in all_teams}
-    best_ranks, worst_ranks = defaultdict(lambda: 99), defaultdict(int)
+    group_of_team = [g for g, ts in groups.items() for _ in ts]
+    group_members, start = [], 0
+    for group_teams in groups.values():
+        group_members.append(np.arange(start, start + len(group_teams))); start += len(group_teams)
+    return all_teams, group_of_team, group_members
 
-    played_matches_simple = []
-    for m in played_matches:
-        opps = m.get("match2opponents", [])
-        if len(opps) < 2 or m.get("winner") not in ("1", "2"): continue
-        tA, tB = opps[0].get('name'), opps[1].get('name')
-        winner = tA if m["winner"] == "1" else tB
-        sA, sB = 0,0
-        for g in m.get("match2games", []):
-            if str(g.get('winner')) == '1': sA += 1
-            elif str(g.get('winner')) == '2': sB += 1
-        played_matches_simple.append((tA, tB, winner, sA, sB))
+def simulate_season(teams, played_matches, current_wins, current_diff, unplayed_matches, forced_outcomes, n_sim, game_win_probs=None, seed=None, groups=None):
+    """
+    One batch of simulated seasons: the outcome of every unplayed fixture (n_sim x fixtures) and every
+    team's rank (n_sim x teams, within its group if `groups` lists team indices). Also returns the
+    resolved seed and the stream reserved for the playoff stage. The same seed gives the same batch.
+    """
+    # Separate streams for outcomes, tie-breaks and the playoffs, so each is reproducible from the seed on its own
+    seed = resolve_simulation_seed(seed)
+    outcome_rng, tie_rng, playoff_rng = spawn_simulation_rngs(seed, 3)
+    outcomes = draw_series_outcomes(*series_outcome_table(unplayed_matches, forced_outcomes, game_win_probs), n_sim, outcome_rng)
+    ranks = simulated_rankings(teams, played_matches, current_wins, current_diff, unplayed_matches, outcomes, tie_rng, groups=groups)
+    return {"seed": seed, "outcomes": outcomes, "ranks": ranks, "playoff_rng": playoff_rng}
+
+def run_monte_carlo_simulation(teams, played_matches, current_wins, current_diff, unplayed_matches, forced_outcomes, brackets, n_sim, team_to_track=None, game_win_probs=None, seed=None, playoffs=None):
+    teams = list(teams)
+    season = simulate_season(teams, played_matches, current_wins, current_diff, unplayed_matches, forced_outcomes, n_sim, game_win_probs, seed)
+    ranks, seed = season["ranks"], season["seed"]
+    finish_counts = bracket_finish_counts(ranks, brackets, len(teams))
 
-    for _ in range(n_sim):
-        sim_wins, sim_diff = defaultdict(int, current_wins), defaultdict(int, current_diff)
-        simulated_matches = []
-        for a, b, dt, bo in unplayed_matches:
-            code = forced_outcomes.get((a, b, dt), "random")
-            outcome = random.choice([c for _, c in get_series_outcome_options(a, b, bo) if c != "random"]) if code == "random" else code
-            if not outcome or outcome == "DRAW": continue
-            winner, loser = (a, b) if outcome.startswith("A") else (b, a)
-            w, l = int(outcome[1]), int(outcome[2])
-            sim_wins[winner] += 1; sim_diff[winner] += w - l; sim_diff[loser] += l - w
-            simulated_matches.append((a, b, winner, w, l))
-        
-        all_sim_matches = played_matches_simple + simulated_matches
-        
-        final_standings = {}
-        for group_name, group_teams in groups.items():
-            sorted_teams = sorted(group_teams, key=lambda t: (sim_wins.get(t, 0), sim_diff.get(t, 0)), reverse=True)
-            group_standings = []
-            for _, g in groupby(sorted_teams, key=lambda t: (sim_wins.get(t, 0), sim_diff.get(t, 0))):
-                group = list(g)
-                if len(group) > 1:
-                    group_standings.extend(resolve_ties_h2h_gamediff(group, all_sim_matches))
-                else:
-                    group_standings.extend(group)
-            
-            for rank, team in enumerate(group_standings, 1):
-                final_standings[team] = (rank, group_name)
-                if team == team_to_track:
-                    best_ranks[team], worst_ranks[team] = min(best_ranks[team], rank), max(worst_ranks[team], rank)
-
-        for team, (rank, _) in final_standings.items():
-            for bracket in brackets:
-                if bracket['start'] <= rank <= (bracket.get('end') or len(all_teams)):
-                    finish_counter[team][bracket["name"]] += 1; break
-    
-    rows = [{"Team": t, "Group": next((g for g, ts in groups.items() if t in ts), "N/A"), **{f"{b['name']} (%)": (finish_counter[t].get(b["name"], 0) / n_sim) * 100 for b in brackets}} for t in all_teams]
-    return {"probs_df": pd.DataFrame(rows).round(2), "best_rank": best_ranks.get(team_to_track), "worst_rank": worst_ranks.get(team_to_track)}
+    best_rank, worst_rank = len(teams), 1
+    if team_to_track in teams and n_sim:
+        tracked = ranks[:, teams.index(team_to_track)]
+        best_rank, worst_rank = min(best_rank, int(tracked.min())), max(worst_rank, int(tracked.max()))
+
+    rows = [{"Team": t, **{f"{b['name']} (%)": (finish_counts[i, k] / n_sim) * 100 for k, b in enumerate(brackets)}} for i, t in enumerate(teams)]
+    results = {"probs_df": pd.DataFrame(rows).round(2), "best_rank": best_rank, "worst_rank": worst_rank, "seed": seed}
+    if playoffs and playoffs.get("format") in ("single", "double"):
+        places = simulate_playoff_bracket(
+            playoff_seeds(ranks, brackets), len(teams), playoffs["format"],
+            playoffs.get("bestof", 5), playoffs.get("final_bestof", 7), season["playoff_rng"]
+        )
+        results["playoff_df"] = playoff_placement_frame(teams, places)
+    return results
+
+
+def run_monte_carlo_simulation_groups(groups, played_matches, current_wins, current_diff, unplayed_matches, forced_outcomes, brackets, n_sim, team_to_track=None, game_win_probs=None, seed=None, playoffs=None):
+    all_teams, group_of_team, group_members = group_layout(groups)
+    season = simulate_season(all_teams, played_matches, current_wins, current_diff, unplayed_matches, forced_outcomes, n_sim, game_win_probs, seed, groups=group_members)
+    ranks, seed = season["ranks"], season["seed"]
+    finish_counts = bracket_finish_counts(ranks, brackets, len(all_teams))
+
+    best_rank = worst_rank = None
+    if team_to_track in all_teams and n_sim:
+        tracked = ranks[:, all_teams.index(team_to_track)]
+        best_rank, worst_rank = int(tracked.min()), int(tracked.max())
+
+    rows = [{"Team": t, "Group": group_of_team[i], **{f"{b['name']} (%)": (finish_counts[i, k] / n_sim) * 100 for k, b in enumerate(brackets)}} for i, t in enumerate(all_teams)]
+    results = {"probs_df": pd.DataFrame(rows).round(2), "best_rank": best_rank, "worst_rank": worst_rank, "seed": seed}
+    if playoffs and playoffs.get("format") in ("single", "double"):
+        places = simulate_playoff_bracket(
+            playoff_seeds(ranks, brackets, group_members), len(all_teams), playoffs["format"],
+            playoffs.get("bestof", 5), playoffs.get("final_bestof", 7), season["playoff_rng"]
+        )
+        results["playoff_df"] = playoff_placement_frame(all_teams, places, {"Group": group_of_team})
+    return results
+
+# --- MATCH LEVERAGE ---
+# How much each remaining result matters is read from one batch of simulated seasons by grouping the
+# simulations on each fixture's outcome, instead of re-simulating with every result forced.
+LEVERAGE_CHUNK_SIMS = 2000
+LEVERAGE_MIN_SAMPLES = 50  # Outcomes seen in fewer simulations are too noisy to compare
+
+def outcome_finish_counts(outcomes, ranks, brackets, n_teams):
+    """
+    Grouped counts from one batch of simulated seasons. Returns (codes, n, finishes): the outcome codes
+    seen in the batch, n[f, u] = simulations in which fixture f ended with codes[u], and
+    finishes[f, u, t, k] = how many of those had team t finish in bracket k (k = len(brackets): none).
+    """
+    n_sim, n_fixtures = outcomes.shape
+    n_cols = len(brackets) + 1
+    finish = bracket_of_rank(brackets, n_teams, int(ranks.max(initial=0)))[ranks]
+    codes, inverse = np.unique(np.asarray(outcomes, dtype=object).astype(str), return_inverse=True)
+    inverse = inverse.reshape(outcomes.shape)
+
+    n = np.zeros((n_fixtures, len(codes)))
+    finishes = np.zeros((n_fixtures * len(codes), ranks.shape[1] * n_cols))
+    for start in range(0, n_sim, LEVERAGE_CHUNK_SIMS):
+        rows = slice(start, start + LEVERAGE_CHUNK_SIMS)
+        by_outcome = (inverse[rows, :, np.newaxis] == np.arange(len(codes))).astype(float)
+        by_finish = (finish[rows, :, np.newaxis] == np.arange(n_cols)).astype(float)
+        n += by_outcome.sum(axis=0)
+        finishes += by_outcome.reshape(len(by_outcome), -1).T @ by_finish.reshape(len(by_finish), -1)
+    return codes.tolist(), n, finishes.reshape(n_fixtures, len(codes), ranks.shape[1], n_cols)
+
+def conditional_finish_probs(n, finishes, fixture, outcome_mask):
+    """
+    Finish probabilities (teams x brackets, in percent) in the simulations where `fixture` ended with one
+    of the outcomes in `outcome_mask`, with the number of those simulations.
+    """
+    count = n[fixture, outcome_mask].sum()
+    totals = finishes[fixture, outcome_mask].sum(axis=0)
+    return (totals / count * 100 if count else np.full(totals.shape, np.nan)), int(count)
+
+def match_leverage(codes, n, finishes, qualifying, min_samples=LEVERAGE_MIN_SAMPLES):
+    """
+    Team x fixture leverage: each team's probability (in percent) of finishing in one of the `qualifying`
+    brackets when team A wins the fixture minus when team B wins it. NaN where either side was seen in
+    fewer than `min_samples` simulations (e.g. forced results).
+    """
+    a_side = np.array([c.startswith("A") for c in codes], dtype=bool)
+    b_side = np.array([c.startswith("B") for c in codes], dtype=bool)
+    qualified = finishes[..., qualifying].sum(axis=-1)
+    n_a, n_b = n[:, a_side].sum(axis=1), n[:, b_side].sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        p_a = qualified[:, a_side].sum(axis=1) / n_a[:, np.newaxis]
+        p_b = qualified[:, b_side].sum(axis=1) / n_b[:, np.newaxis]
+    leverage = (p_a - p_b) * 100
+    leverage[(n_a < min_samples) | (n_b < min_samples)] = np.nan
+    return leverage.T
 
 # --- [UNCHANGED CODE FROM _run_single_simulation_instance to the end of the file] ---
-def _run_single_simulation_instance(teams, initial_wins, initial_diff, unplayed_matches, forced_outcomes):
+def _run_single_simulation_instance(teams, initial_wins, initial_diff, unplayed_matches, forced_outcomes, rng=None):
     """
     Simulates one possible future for a single table format and returns the ranked teams.
+    `rng` is the numpy Generator used for outcomes and tie-breaks.
     """
+    rng = rng if rng is not None else np.random.default_rng()
     sim_wins = defaultdict(int, initial_wins)
     sim_diff = defaultdict(int, initial_diff)
 
@@ -386,7 +686,7 @@ def _run_single_simulation_instance(teams, initial_wins, initial_diff, unplayed_
         if code == "random":
             # Generate possible outcomes (e.g., "A20", "A21", "B21", "B20")
             options = [c for _, c in get_series_outcome_options(a, b, bo) if c != "random"]
-            outcome = random.choice(options)
+            outcome = options[rng.integers(len(options))]
         else:
             outcome = code
         
@@ -405,7 +705,8 @@ def _run_single_simulation_instance(teams, initial_wins, initial_diff, unplayed_
         sim_diff[loser] += l_score - w_score
         
     # Rank teams by wins, then diff, with a random tie-breaker
-    ranked = sorted(teams, key=lambda t: (sim_wins.get(t, 0), sim_diff.get(t, 0), random.random()), reverse=True)
+    tie_break = dict(zip(teams, rng.random(len(teams))))
+    ranked = sorted(teams, key=lambda t: (sim_wins.get(t, 0), sim_diff.get(t, 0), tie_break[t]), reverse=True)
     return ranked
 
 CONFIG_DIR = "configs"
@@ -0,0 +1,53 @@
+import json
+import hashlib
+import redis
+from utils.match_store import get_store_client
+
+# Finished simulation results are kept in Redis (the Celery backend), keyed by a hash of their inputs.
+# Played results are part of the key, so a new match result simply leads to a different key.
+CACHE_KEY_PREFIX = "sim_cache"
+CACHE_TTL_SECONDS = 6 * 3600
+CACHE_VERSION = 2  # Bump when the simulation logic changes, so old results are not served
+
+def _canonical(value):
+    """Nested structure with deterministic ordering: dicts become sorted [key, value] pairs, tuples become lists."""
+    if isinstance(value, dict):
+        return sorted(([_canonical(k), _canonical(v)] for k, v in value.items()), key=lambda kv: json.dumps(kv[0], default=str))
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    return value
+
+def scenario_key(kind, **inputs):
+    """Cache key of one simulation scenario; the same inputs give the same key regardless of dict or argument order."""
+    payload = json.dumps([CACHE_VERSION, kind, _canonical(inputs)], sort_keys=True, default=str, separators=(",", ":"))
+    return f"{CACHE_KEY_PREFIX}:{kind}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+def simulation_result_to_json(result):
+    """Makes a simulator result JSON-serializable (the probability DataFrames become dicts)."""
+    result = dict(result)
+    for key in ('probs_df', 'playoff_df'):
+        if hasattr(result.get(key), 'to_dict'):
+            result[key] = result[key].to_dict()
+    return result
+
+def cached_simulation(key, run, client=None):
+    """
+    Returns the stored result for `key`, or calls `run()`, stores its JSON-ready result with a TTL and returns it.
+    The cache is best effort: if Redis is unavailable the simulation simply runs.
+    """
+    try:
+        if client is None:
+            client = get_store_client()
+        payload = client.get(key)
+        if payload:
+            return {**json.loads(payload), 'cached': True}
+    except redis.RedisError:
+        client = None
+
+    result = simulation_result_to_json(run())
+    if client is not None:
+        try:
+            client.set(key, json.dumps(result), ex=CACHE_TTL_SECONDS)
+        except redis.RedisError:
+            pass
+    return result
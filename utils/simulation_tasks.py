@@ -1,188 +1,214 @@
 # beruangbatubata/barubarubaru/barubarubaru-c62b52c86038cecedd2dda40e096dca331cad981/utils/simulation_tasks.py
-import json
+import numpy as np
 import pandas as pd
 from celery_config import app
+import utils.task_status  # noqa: F401 - publishes task completion events to waiting pages
 from utils.simulation import (
     run_monte_carlo_simulation,
     run_monte_carlo_simulation_groups,
-    get_series_outcome_options
+    get_series_outcome_options,
+    series_outcome_code,
+    resolve_simulation_seed,
+    simulate_season,
+    group_layout,
+    is_qualifying_bracket,
+    bracket_finish_counts,
+    outcome_finish_counts,
+    conditional_finish_probs,
+    match_leverage,
+    LEVERAGE_MIN_SAMPLES
 )
-
-# Helper function to extract team names from a match dictionary.
-def get_teams_from_match(match):
-    opps = match.get("match2opponents", [])
-    teamA = opps[0].get('name', 'Team A') if len(opps) > 0 else 'Team A'
-    teamB = opps[1].get('name', 'Team B') if len(opps) > 1 else 'Team B'
-    return teamA, teamB
+from utils.simulation_cache import scenario_key, cached_simulation
+
+def forced_outcomes_dict(forced_outcomes):
+    """Forced outcomes arrive as ((team A, team B, date), code) pairs; JSON turns the key tuples into lists."""
+    return {tuple(key): code for key, code in forced_outcomes}
+
+def unpack_state(state):
+    """Teams, played results, current wins/diffs and unplayed fixtures from TournamentState.simulation_inputs (after JSON transport)."""
+    return (
+        list(state['teams']),
+        [tuple(p) for p in state['played']],
+        dict(state['current_wins']),
+        dict(state['current_diff']),
+        [tuple(f) for f in state['unplayed']],
+    )
 
 @app.task
-def run_single_table_simulation_task(teams, played_matches_json, current_wins, current_diff, unplayed_matches_tuples, forced_outcomes, brackets, n_sim, team_to_track=None):
+def run_single_table_simulation_task(state, forced_outcomes, brackets, n_sim, team_to_track=None, seed=None, playoffs=None):
     """
     Celery task wrapper for the single table Monte Carlo simulation.
-    All complex objects are passed as JSON-serializable types.
+    `state` is TournamentState.simulation_inputs for the chosen cutoff week; all complex objects
+    are passed as JSON-serializable types. `playoffs` (format and series lengths) adds the playoff
+    bracket stage. Repeated scenarios are answered from the simulation cache.
     """
-    played_matches = [json.loads(m) for m in played_matches_json]
+    teams, played, current_wins, current_diff, unplayed = unpack_state(state)
 
     # Convert brackets from tuple of tuples back to list of dicts
     unhashed_brackets = [dict(b) for b in brackets]
+    forced = forced_outcomes_dict(forced_outcomes)
 
-    return run_monte_carlo_simulation(
-        list(teams),
-        played_matches,
-        dict(current_wins),
-        dict(current_diff),
-        list(unplayed_matches_tuples),
-        dict(forced_outcomes),
+    key = scenario_key(
+        'single', state=state, forced=forced, brackets=unhashed_brackets,
+        n_sim=n_sim, team_to_track=team_to_track, seed=seed, playoffs=playoffs
+    )
+    return cached_simulation(key, lambda: run_monte_carlo_simulation(
+        teams, played, current_wins, current_diff, unplayed, forced,
         unhashed_brackets, # Use the corrected list
         n_sim,
-        team_to_track=team_to_track
-    )
+        team_to_track=team_to_track,
+        seed=seed,
+        playoffs=playoffs
+    ))
 
-# beruangbatubata/barubarubaru/barubarubaru-c62b52c86038cecedd2dda40e096dca331cad981/utils/simulation_tasks.py
 @app.task
-def run_group_simulation_task(groups, played_matches_json, current_wins, current_diff, unplayed_matches_tuples, forced_outcomes, brackets, n_sim, team_to_track=None):
+def run_group_simulation_task(groups, state, forced_outcomes, brackets, n_sim, team_to_track=None, seed=None, playoffs=None):
     """
     Celery task wrapper for the group stage Monte Carlo simulation.
+    Repeated scenarios are answered from the simulation cache.
     """
-    played_matches = [json.loads(m) for m in played_matches_json]
+    _, played, current_wins, current_diff, unplayed = unpack_state(state)
 
     # Convert brackets from tuple of tuples back to list of dicts
     unhashed_brackets = [dict(b) for b in brackets]
+    forced = forced_outcomes_dict(forced_outcomes)
 
-    return run_monte_carlo_simulation_groups(
-        groups,
-        played_matches,
-        dict(current_wins),
-        dict(current_diff),
-        list(unplayed_matches_tuples),
-        dict(forced_outcomes),
+    key = scenario_key(
+        'group', groups=groups, state=state, forced=forced, brackets=unhashed_brackets,
+        n_sim=n_sim, team_to_track=team_to_track, seed=seed, playoffs=playoffs
+    )
+    return cached_simulation(key, lambda: run_monte_carlo_simulation_groups(
+        groups, played, current_wins, current_diff, unplayed, forced,
         unhashed_brackets, # Use the corrected list
         n_sim,
-        team_to_track=team_to_track
-    )
+        team_to_track=team_to_track,
+        seed=seed,
+        playoffs=playoffs
+    ))
 
 # --- NEW TASK ADDED BELOW ---
+def fixture_labels(fixtures):
+    """Unique "A vs B (date)" labels for unplayed fixtures; repeated pairings on one date get a counter."""
+    labels, seen = [], {}
+    for teamA, teamB, date, _ in fixtures:
+        label = f"{teamA} vs {teamB}" + (f" ({str(date)[:10]})" if date else "")
+        seen[label] = seen.get(label, 0) + 1
+        labels.append(label if seen[label] == 1 else f"{label} #{seen[label]}")
+    return labels
+
 @app.task(bind=True)
 def run_deeper_analysis_task(
-    self, simulation_type, teams, played_json, current_wins, current_diff, 
-    unplayed_tuples, unplayed_matches_full, forced_outcomes, brackets, 
-    n_sim, selected_team_analysis, base_results_df_dict, groups=None
+    self, simulation_type, state, forced_outcomes, brackets,
+    n_sim, selected_team_analysis, groups=None, seed=None
 ):
     """
     A consolidated Celery task to run all parts of the 'Deeper Analysis'.
-    This is more efficient than dispatching many small, interdependent tasks.
+    The base scenario is simulated once, with the base simulation's seed (when given) so it is the
+    same batch as the base results. The importance of every remaining match, for every team, is read
+    from that batch by grouping the simulations on each match's result; only the "Win and In"
+    scenario needs a second run.
     """
-    results = {}
+    results = {'seed': resolve_simulation_seed(seed)}
+    teams, played, current_wins, current_diff, unplayed_tuples = unpack_state(state)
+    forced_outcomes = forced_outcomes_dict(forced_outcomes)
+    unhashed_brackets = [dict(b) for b in brackets]
+    bracket_names = [b['name'] for b in unhashed_brackets]
+    qualifying = [k for k, name in enumerate(bracket_names) if is_qualifying_bracket(name)]
     total_steps = 3 # Total number of analysis steps
-    
+
     # --- Determine which simulation function to use based on the context ---
     is_group_sim = (simulation_type == 'group')
-    
+    sim_teams, _, group_members = group_layout(groups) if is_group_sim else (teams, None, None)
+
     def run_simulation(forced_scenario_dict):
         """Helper to run the correct simulation type with updated scenarios."""
-        # The 'brackets' argument arrives as a tuple of tuples.
-        # We must convert it back to a list of dicts for the simulation functions.
-        unhashed_brackets = [dict(b) for b in brackets] # <--- CORRECTED LOGIC
-        
         if is_group_sim:
             return run_monte_carlo_simulation_groups(
-                groups, [json.loads(m) for m in played_json], dict(current_wins), dict(current_diff),
-                list(unplayed_tuples), forced_scenario_dict, unhashed_brackets, n_sim
+                groups, played, current_wins, current_diff,
+                unplayed_tuples, forced_scenario_dict, unhashed_brackets, n_sim, seed=results['seed']
             )
         else:
             return run_monte_carlo_simulation(
-                list(teams), [json.loads(m) for m in played_json], dict(current_wins), dict(current_diff),
-                list(unplayed_tuples), forced_scenario_dict, unhashed_brackets, n_sim
+                teams, played, current_wins, current_diff,
+                unplayed_tuples, forced_scenario_dict, unhashed_brackets, n_sim, seed=results['seed']
             )
 
-    # --- 1. "Win and In" Scenario ---
-    self.update_state(state='PROGRESS', meta={'current': 1, 'total': total_steps, 'status': 'Calculating "Win and In" scenario...'})
-    team_unplayed_matches = [m for m in unplayed_matches_full if selected_team_analysis in get_teams_from_match(m)]
-    forced_wins = dict(forced_outcomes).copy()
-    for match in team_unplayed_matches:
-        teamA, teamB = get_teams_from_match(match)
-        match_key = (teamA, teamB, match.get('date'))
-        # Assuming BO3 for simplicity; in a real scenario, you might pass the 'bestof' format
-        if teamA == selected_team_analysis:
-            forced_wins[match_key] = "A20" 
-        else:
-            forced_wins[match_key] = "B20"
-            
+    def finish_df(probs):
+        """Teams x brackets finish probabilities (in percent) in the results' DataFrame layout."""
+        return pd.DataFrame([
+            {"Team": t, **{f"{name} (%)": probs[i, k] for k, name in enumerate(bracket_names)}}
+            for i, t in enumerate(sim_teams)
+        ]).round(2)
+
+    # --- 1. Base batch and the team x match leverage matrix ---
+    self.update_state(state='PROGRESS', meta={'current': 1, 'total': total_steps, 'status': 'Simulating the base scenario and match leverage...'})
+    season = simulate_season(
+        sim_teams, played, current_wins, current_diff, unplayed_tuples, forced_outcomes,
+        n_sim, seed=results['seed'], groups=group_members
+    )
+    codes, counts, finishes = outcome_finish_counts(season['outcomes'], season['ranks'], unhashed_brackets, len(sim_teams))
+    leverage = pd.DataFrame(
+        match_leverage(codes, counts, finishes, qualifying),
+        index=sim_teams, columns=fixture_labels(unplayed_tuples)
+    ).round(2)
+    results['leverage_df'] = leverage.astype(object).where(leverage.notna(), None).to_dict()
+
+    team_idx = sim_teams.index(selected_team_analysis)
+    base_probs = bracket_finish_counts(season['ranks'], unhashed_brackets, len(sim_teams)) / max(n_sim, 1) * 100
+    base_cumulative_prob = base_probs[team_idx, qualifying].sum()
+
+    # --- 2. "Win and In" Scenario ---
+    self.update_state(state='PROGRESS', meta={'current': 2, 'total': total_steps, 'status': 'Calculating "Win and In" scenario...'})
+    forced_wins = dict(forced_outcomes)
+    for teamA, teamB, date, bo in unplayed_tuples:
+        if selected_team_analysis not in (teamA, teamB): continue
+        # A sweep in the fixture's own format (2-0 in a Bo3, 1-0 in a Bo1)
+        sweep = int(bo) // 2 + 1
+        forced_wins[(teamA, teamB, date)] = series_outcome_code(sweep, 0) if teamA == selected_team_analysis else series_outcome_code(0, sweep)
     win_out_data = run_simulation(forced_wins)
     # Serialize DataFrame to dict for the final result
     results['win_and_in_df'] = win_out_data['probs_df'].to_dict()
 
-    # --- 2. "Most Important Match" Analysis ---
-    self.update_state(state='PROGRESS', meta={'current': 2, 'total': total_steps, 'status': 'Finding most important match...'})
-    positive_brackets = [b['name'] for b in brackets if "unqualified" not in b['name'].lower() and "relegation" not in b['name'].lower()]
+    # --- 3. "Most Important Match" and "Who to Root For", from the base batch ---
+    self.update_state(state='PROGRESS', meta={'current': 3, 'total': total_steps, 'status': 'Finding the most important and critical external matches...'})
+    a_side = np.array([c.startswith("A") for c in codes], dtype=bool)
+    b_side = np.array([c.startswith("B") for c in codes], dtype=bool)
     max_swing = -1.0
     most_important_match_info = None
-
-    for match in team_unplayed_matches:
-        teamA, teamB = get_teams_from_match(match)
-        opponent = teamB if teamA == selected_team_analysis else teamA
-        match_key = (teamA, teamB, match.get('date'))
-
-        # Scenario where the selected team wins
-        forced_win_scenario = dict(forced_outcomes).copy()
-        forced_win_scenario[match_key] = "A20" if teamA == selected_team_analysis else "B20"
-        
-        # Scenario where the selected team loses
-        forced_loss_scenario = dict(forced_outcomes).copy()
-        forced_loss_scenario[match_key] = "B20" if teamA == selected_team_analysis else "A20"
-        
-        win_df = run_simulation(forced_win_scenario)['probs_df']
-        loss_df = run_simulation(forced_loss_scenario)['probs_df']
-
-        win_prob_cumulative = sum(win_df.loc[win_df['Team'] == selected_team_analysis, f"{b} (%)"].iloc[0] for b in positive_brackets)
-        loss_prob_cumulative = sum(loss_df.loc[loss_df['Team'] == selected_team_analysis, f"{b} (%)"].iloc[0] for b in positive_brackets)
-        
-        swing = abs(win_prob_cumulative - loss_prob_cumulative)
-
-        if swing > max_swing:
-            max_swing = swing
-            most_important_match_info = {
-                "opponent": opponent, 
-                "win_df": win_df.to_dict(), 
-                "loss_df": loss_df.to_dict()
-            }
-    
-    results['most_important_match'] = most_important_match_info
-    
-    # --- 3. "Who to Root For" (Critical External Matches) ---
-    self.update_state(state='PROGRESS', meta={'current': 3, 'total': total_steps, 'status': 'Finding critical external matches...'})
-    external_matches = [m for m in unplayed_matches_full if selected_team_analysis not in get_teams_from_match(m)]
-    base_df = pd.DataFrame.from_dict(base_results_df_dict)
-    base_cumulative_prob = sum(base_df.loc[base_df['Team'] == selected_team_analysis, f"{b} (%)"].iloc[0] for b in positive_brackets)
-    
     best_impact = 0.01  # Minimum threshold for a result to be considered significant
     best_external_match_info = None
 
-    for match in external_matches:
-        teamA, teamB = get_teams_from_match(match)
-        bo = match.get("bestof", 3)
-        outcomes = get_series_outcome_options(teamA, teamB, bo)
-
-        for outcome_label, outcome_code in outcomes:
-            if outcome_code == "random": continue
-            
-            forced_scenario = dict(forced_outcomes).copy()
-            match_key = (teamA, teamB, match.get('date'))
-            forced_scenario[match_key] = outcome_code
-            
-            scenario_df = run_simulation(forced_scenario)['probs_df']
-            
-            scenario_cumulative_prob = sum(scenario_df.loc[scenario_df['Team'] == selected_team_analysis, f"{b} (%)"].iloc[0] for b in positive_brackets)
-            impact = scenario_cumulative_prob - base_cumulative_prob
-
-            if impact > best_impact:
-                best_impact = impact
-                best_external_match_info = {
-                    "teams": f"{teamA} vs {teamB}", 
-                    "outcome": outcome_label, 
-                    "scenario_df": scenario_df.to_dict()
+    for f, (teamA, teamB, date, bo) in enumerate(unplayed_tuples):
+        if selected_team_analysis in (teamA, teamB):
+            team_wins = a_side if teamA == selected_team_analysis else b_side
+            team_loses = b_side if teamA == selected_team_analysis else a_side
+            win_probs, n_win = conditional_finish_probs(counts, finishes, f, team_wins)
+            loss_probs, n_loss = conditional_finish_probs(counts, finishes, f, team_loses)
+            if min(n_win, n_loss) < LEVERAGE_MIN_SAMPLES: continue
+            swing = abs(win_probs[team_idx, qualifying].sum() - loss_probs[team_idx, qualifying].sum())
+            if swing > max_swing:
+                max_swing = swing
+                most_important_match_info = {
+                    "opponent": teamB if teamA == selected_team_analysis else teamA,
+                    "win_df": finish_df(win_probs).to_dict(),
+                    "loss_df": finish_df(loss_probs).to_dict()
                 }
+        else:
+            outcome_labels = dict((code, label) for label, code in get_series_outcome_options(teamA, teamB, bo))
+            for u, code in enumerate(codes):
+                if code not in outcome_labels: continue
+                scenario_probs, n_scenario = conditional_finish_probs(counts, finishes, f, np.arange(len(codes)) == u)
+                if n_scenario < LEVERAGE_MIN_SAMPLES: continue
+                impact = scenario_probs[team_idx, qualifying].sum() - base_cumulative_prob
+                if impact > best_impact:
+                    best_impact = impact
+                    best_external_match_info = {
+                        "teams": f"{teamA} vs {teamB}",
+                        "outcome": outcome_labels[code],
+                        "scenario_df": finish_df(scenario_probs).to_dict()
+                    }
 
+    results['most_important_match'] = most_important_match_info
     results['best_external_match'] = best_external_match_info
 
     return results
@@ -0,0 +1,105 @@
+import json
+import threading
+import time
+import redis
+import streamlit as st
+from celery.signals import task_postrun
+from utils.match_store import get_store_client
+
+# Workers publish a message on "task_events:<task id>" when a task finishes (after its result is stored).
+# The app keeps one subscriber thread per process, so waiting pages only check an in-memory set.
+TASK_EVENT_PREFIX = "task_events"
+WATCH_TICK_SECONDS = 0.1
+STATUS_BACKOFF_START = 0.5
+STATUS_BACKOFF_MAX = 5.0
+FINISHED_RETENTION_SECONDS = 3600
+
+def task_event_channel(task_id):
+    return f"{TASK_EVENT_PREFIX}:{task_id}"
+
+# --- WORKER SIDE ---
+_publisher = None
+
+@task_postrun.connect
+def _publish_task_finished(task_id=None, state=None, **kwargs):
+    global _publisher
+    try:
+        if _publisher is None:
+            _publisher = get_store_client()
+        _publisher.publish(task_event_channel(task_id), json.dumps({'task_id': task_id, 'state': state}))
+    except redis.RedisError:
+        # Pages fall back to polling the result backend
+        pass
+
+# --- APP SIDE ---
+class TaskEventListener:
+    """
+    Process-wide subscriber to the task completion channel. The background thread is started on
+    first use and reconnects after Redis errors; finished task ids are kept for an hour.
+    """
+
+    def __init__(self):
+        self._finished = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _run(self):
+        while True:
+            try:
+                pubsub = get_store_client().pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(f"{TASK_EVENT_PREFIX}:*")
+                for message in pubsub.listen():
+                    if message.get('type') != 'pmessage': continue
+                    channel = message['channel'].decode() if isinstance(message['channel'], bytes) else message['channel']
+                    self._record(channel.split(":", 1)[1])
+            except redis.RedisError:
+                time.sleep(1)
+
+    def _record(self, task_id):
+        now = time.monotonic()
+        with self._lock:
+            self._finished[task_id] = now
+            if len(self._finished) > 1000:
+                self._finished = {t: ts for t, ts in self._finished.items() if now - ts < FINISHED_RETENTION_SECONDS}
+
+    def ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="task-event-listener", daemon=True)
+                self._thread.start()
+
+    def is_finished(self, task_id):
+        self.ensure_started()
+        return task_id in self._finished
+
+TASK_EVENTS = TaskEventListener()
+
+def watch_task(task_id, celery_app, render_status):
+    """
+    Shows a running task's status in a fragment that re-runs every WATCH_TICK_SECONDS without
+    blocking the script. Each tick checks the in-memory completion set; the task's state and
+    progress are read from the result backend with exponential backoff (which also covers missed
+    notifications). When the task is done the whole page re-runs, so the caller's completion
+    branch picks up the result. `render_status(state, info)` draws the running state.
+    """
+    poll_key = f"_task_poll_{task_id}"
+
+    @st.fragment(run_every=WATCH_TICK_SECONDS)
+    def _task_watcher():
+        poll = st.session_state.setdefault(poll_key, {'next_check': 0.0, 'interval': STATUS_BACKOFF_START, 'result': None})
+        now = time.monotonic()
+        finished = TASK_EVENTS.is_finished(task_id)
+        if finished or poll['result'] is None or now >= poll['next_check']:
+            result = celery_app.AsyncResult(task_id)
+            poll['result'] = (result.state, result.info)
+            poll['next_check'] = now + poll['interval']
+            poll['interval'] = min(poll['interval'] * 2, STATUS_BACKOFF_MAX)
+            if result.ready():
+                st.session_state.pop(poll_key, None)
+                st.rerun(scope="app")
+        state, info = poll['result']
+        render_status(state, info)
+
+    _task_watcher()
@@ -0,0 +1,130 @@
+from collections import defaultdict
+import numpy as np
+import pandas as pd
+from utils.simulation import build_week_blocks, tally_results, rank_standings
+
+class TournamentState:
+    """
+    Snapshot of one tournament stage for the simulator, built once per data version and stage.
+    Every match is parsed once into parallel arrays (team indices, date, week, format, result), so
+    the played/unplayed split at any cutoff week, the standings, the H2H matrix and the fixture
+    lists are array operations. Nothing here is modified after construction, so one instance can be
+    shared across sessions.
+    """
+
+    def __init__(self, matches):
+        self.matches = list(matches)
+        self.teams = sorted(set(
+            opp.get('name', '').strip()
+            for m in self.matches
+            for opp in m.get("match2opponents", [])
+            if opp.get('name')
+        ))
+        self.team_index = {team: i for i, team in enumerate(self.teams)}
+
+        n = len(self.matches)
+        self.team_a = np.full(n, -1, dtype=np.int64)
+        self.team_b = np.full(n, -1, dtype=np.int64)
+        self.team_names = []
+        self.dates, self.date_keys, self.bestof = [], [], []
+        self.winner = np.full(n, -1, dtype=np.int8)  # 0: team A, 1: team B, -1: none
+        self.games_a = np.zeros(n, dtype=np.int64)
+        self.games_b = np.zeros(n, dtype=np.int64)
+        self.finished = np.zeros(n, dtype=bool)
+
+        for i, m in enumerate(self.matches):
+            opps = m.get("match2opponents", [])
+            team_a = opps[0].get('name', 'Team A') if len(opps) > 0 else 'Team A'
+            team_b = opps[1].get('name', 'Team B') if len(opps) > 1 else 'Team B'
+            self.team_names.append((team_a, team_b))
+            self.team_a[i] = self.team_index.get(team_a.strip(), -1)
+            self.team_b[i] = self.team_index.get(team_b.strip(), -1)
+            self.bestof.append(m.get("bestof", 3))
+
+            date = None
+            if m.get("date"):
+                try:
+                    date = pd.to_datetime(m["date"])
+                except (ValueError, TypeError):
+                    date = None
+            self.dates.append(date.date() if date is not None else None)
+            self.date_keys.append(date.strftime('%Y-%m-%d') if date is not None else None)
+
+            if m.get("winner") in ("1", "2"):
+                self.winner[i] = int(m["winner"]) - 1
+            for g in m.get("match2games", []):
+                if str(g.get('winner')) == '1': self.games_a[i] += 1
+                elif str(g.get('winner')) == '2': self.games_b[i] += 1
+            is_bo2_complete = str(m.get("bestof")) == "2" and len(m.get("match2games", [])) == 2
+            self.finished[i] = self.winner[i] >= 0 or is_bo2_complete
+
+        self.week_blocks = build_week_blocks(sorted(set(m["date"] for m in self.matches if "date" in m)))
+        week_of_date = {d: w for w, block in enumerate(self.week_blocks) for d in block}
+        self.week = np.array([week_of_date.get(d, -1) if d is not None else -1 for d in self.dates], dtype=np.int64)
+
+    # --- Played / unplayed ---
+    def played_mask(self, cutoff_week_idx):
+        """Matches with a result played in or before the cutoff week (-1 = pre-season, nothing played)."""
+        if cutoff_week_idx is None or cutoff_week_idx < 0 or not self.week_blocks:
+            return np.zeros(len(self.matches), dtype=bool)
+        return self.finished & (self.week >= 0) & (self.week <= cutoff_week_idx)
+
+    def select(self, mask):
+        return [self.matches[i] for i in np.flatnonzero(mask)]
+
+    # --- Standings ---
+    def standings(self, played_mask):
+        """
+        Per-team arrays (indexed like self.teams) over the played matches: match wins/losses, games
+        won/lost, game difference and the H2H game difference matrix, as tallied by tally_results.
+        """
+        decided = played_mask & (self.winner >= 0)
+        return tally_results(
+            len(self.teams), self.team_a[decided], self.team_b[decided],
+            self.winner[decided] == 0, self.games_a[decided], self.games_b[decided]
+        )
+
+    def h2h_game_diff(self, played_mask):
+        """Matrix [i, j] = game difference of team i against team j over the played matches."""
+        return self.standings(played_mask)['h2h']
+
+    def ranking(self, played_mask):
+        """Team indices in standings order, ranked like the simulators and build_standings_table."""
+        table = self.standings(played_mask)
+        return rank_standings(table['wins'], table['diff'], table['h2h'])
+
+    # --- Fixtures ---
+    def fixtures_by_week(self, mask):
+        """{week index: {date: [match index]}} for the selected matches that have a date, in date order."""
+        grouped = defaultdict(lambda: defaultdict(list))
+        for i in np.flatnonzero(mask & (self.week >= 0)):
+            grouped[int(self.week[i])][self.date_keys[i]].append(int(i))
+        return {w: dict(sorted(by_date.items())) for w, by_date in sorted(grouped.items())}
+
+    def fixture_key(self, i):
+        """(team A, team B, date) key used for forced outcomes."""
+        team_a, team_b = self.team_names[i]
+        return (team_a, team_b, self.matches[i].get("date"))
+
+    def fixture_tuples(self, mask):
+        """(team A, team B, date, best-of) for the selected matches, as the simulators expect."""
+        return [(*self.fixture_key(i), self.bestof[i]) for i in np.flatnonzero(mask)]
+
+    def simulation_inputs(self, cutoff_week_idx):
+        """
+        JSON-serializable inputs for the simulation tasks at a cutoff week: teams, played results as
+        (team A, team B, winner, A games, B games), current wins and game differences, and unplayed fixtures.
+        """
+        played = self.played_mask(cutoff_week_idx)
+        table = self.standings(played)
+        decided = np.flatnonzero(played & (self.winner >= 0))
+        return {
+            'teams': list(self.teams),
+            'played': [
+                [*self.team_names[i], self.team_names[i][self.winner[i]], int(self.games_a[i]), int(self.games_b[i])]
+                for i in decided
+            ],
+            'current_wins': {t: int(table['wins'][k]) for k, t in enumerate(self.teams) if table['wins'][k]},
+            'current_diff': {t: int(table['diff'][k]) for k, t in enumerate(self.teams) if table['diff'][k]},
+            'unplayed': [list(f) for f in self.fixture_tuples(~played)],
+        }